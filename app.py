@@ -1,15 +1,70 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse, JSONResponse, FileResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from io import BytesIO
+from contextlib import asynccontextmanager
+from typing import Optional, List
+import threading
+import json
+import os
 from uvicorn import run as uvicorn_run
 
-from src.exceptions import CustomException
-from src.logger import logging
-from src.pipeline.run_meme_generator_pipeline import run_pipeline, fetch_image_templates  # Assuming your code is in pipeline.py
+from src.exceptions import CustomException, ServiceOverloadedException
+from src.logger import logging, logging_stats
+from src.pipeline.run_meme_generator_pipeline import run_pipeline_with_components, fetch_image_templates, prefetch_templates  # Assuming your code is in pipeline.py
+from src.pipeline.component_registry import component_registry
+from src.pipeline.startup_warmup import StartupWarmup, default_warmup_steps
+from src.pipeline.async_pipeline import AsyncPipelineRunner
+from src.pipeline.run_batch_meme_pipeline import generate_meme_batch, iter_batch_ndjson, build_batch_zip
+from src.pipeline.job_queue import get_job_queue, job_record
+from src.utils.template_cache import template_image_cache
+from src.utils.font_cache import font_cache
+from src.utils.template_layouts import get_layout_index
+from src.utils.template_prefetcher import get_template_prefetcher
+from src.utils.llm_client import ResilientModel
+from src.utils.image_encoder import EncodingOptions, MEDIA_TYPES, negotiate_format, normalize_format
+from src.utils.metrics import metrics, MetricsMiddleware
+from src.utils.job_store import FINISHED_STATUSES
+from src.entity.config_entity import ConfigEntity, PipelineConfigEntity, ServerConfigEntity
 
-app = FastAPI(title="Meme Generator API with Emotion Analysis")
+
+def _prefetch_templates_in_background():
+    try:
+        prefetch_templates()
+    except CustomException as e:
+        logging.error(f"Template prefetch failed: {e}")
+
+
+def _start_pipeline_runner():
+    components = component_registry.get()
+    if components.pipeline_config.prefetch_on_startup:
+        # Warm template_dir in the background so startup isn't blocked on downloads
+        threading.Thread(target=_prefetch_templates_in_background, name="template-prefetch", daemon=True).start()
+    app.state.pipeline_runner = AsyncPipelineRunner(components)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Model client, template index and fonts are warmed before /readyz reports ready
+    pipeline_config = PipelineConfigEntity(config_entity=ConfigEntity())
+    # Jobs are accepted right away; the workers only start running them once warm
+    job_queue = app.state.job_queue = get_job_queue()
+    warmup = app.state.warmup = StartupWarmup(
+        default_warmup_steps() + [("pipeline_runner", _start_pipeline_runner), ("job_queue", job_queue.start)]
+    )
+    if pipeline_config.startup_warmup_background:
+        warmup.start()
+    elif not await run_in_threadpool(warmup.run):
+        raise RuntimeError(f"Startup warm-up failed: {warmup.error}")
+    yield
+    await run_in_threadpool(job_queue.close)
+    if hasattr(app.state, "pipeline_runner"):
+        await app.state.pipeline_runner.aclose()
+
+
+app = FastAPI(title="Meme Generator API with Emotion Analysis", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -18,30 +73,100 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(MetricsMiddleware)
+
+default_encoding = EncodingOptions.from_config()
 
 # Request schema
 class TopicRequest(BaseModel):
     topic_name: str
 
+class BatchTopicsRequest(BaseModel):
+    topics: List[str]
+
+class JobRequest(BaseModel):
+    topic_name: str
+    priority: int = 0
+    format: Optional[str] = None
+    callback_url: Optional[str] = None
+
+
+def _explicit_format(format: Optional[str]) -> Optional[str]:
+    """A requested ?format= as a supported format name; 400 if the server can't produce it."""
+    if format is None:
+        return None
+    normalized = normalize_format(format)
+    if normalized is None:
+        raise HTTPException(status_code=400,
+                            detail=f"Unsupported format '{format}'; supported formats: {', '.join(MEDIA_TYPES)}.")
+    return normalized
+
+
+def _require_ready():
+    """503 with Retry-After while the startup warm-up is still running."""
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is None or not warmup.ready:
+        raise HTTPException(status_code=503, detail="Service is starting up.",
+                            headers={"Retry-After": str(PipelineConfigEntity(config_entity=ConfigEntity()).retry_after_seconds)})
+
+
 @app.get("/")
 def root():
     return {"message": "Welcome to the Meme Generator API!"}
 
 
+@app.get("/healthz")
+def healthz_api():
+    """Liveness: the process is serving requests. Fails only if the startup warm-up failed."""
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is not None and warmup.failed:
+        return JSONResponse(status_code=503, content=warmup.status())
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz_api():
+    """Readiness: 200 once the model client, template index and fonts are warm, 503 until then."""
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is None or not warmup.ready:
+        status = warmup.status() if warmup is not None else {"status": "pending"}
+        return JSONResponse(status_code=503, content=status)
+    return warmup.status()
+
+
 @app.post("/generate-meme/")
-def generate_meme_api(request: TopicRequest):
+async def generate_meme_api(request: TopicRequest, http_request: Request, format: Optional[str] = None):
+    # ?format= (png/jpeg/webp) wins over the Accept header and must be one the server can encode;
+    # the Accept header falls back to OUTPUT_FORMAT
+    format = _explicit_format(format)
+    _require_ready()
     try:
-        result = run_pipeline(request.topic_name)
-
-        # Move pointer to start of BytesIO stream
-        result["image_bytes"].seek(0)
+        encoding = default_encoding.with_format(
+            negotiate_format(http_request.headers.get("accept"), format, default_encoding.format)
+        )
+        components = component_registry.get()
+        if components.pipeline_config.async_pipeline:
+            result = await app.state.pipeline_runner.run(request.topic_name, encoding=encoding)
+        else:
+            result = await run_in_threadpool(
+                run_pipeline_with_components, request.topic_name, components, None, encoding
+            )
 
-        return StreamingResponse(
-            result["image_bytes"],  # Pass the BytesIO object directly
-            media_type="image/png",
-            headers={"X-Emotion": result["emotion"]}
+        return Response(
+            content=result["image_bytes"].getvalue(),
+            media_type=result["media_type"],
+            headers={
+                "X-Emotion": result["emotion"],
+                "X-Encode-Ms": str(result["encode_ms"]),
+                "X-Cache": result["cache"].upper(),
+                "Vary": "Accept",
+            }
         )
+    except ServiceOverloadedException as e:
+        logging.warning(f"Rejected request: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except CustomException as e:
         logging.error(f"CustomException: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -50,14 +175,298 @@ def generate_meme_api(request: TopicRequest):
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+class AdmittedStreamingResponse(StreamingResponse):
+    """Streaming response that holds an admission slot until it is sent, even if its body never starts."""
+
+    def __init__(self, slot, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+
+def _stream_events(topic_name: str, transport: str, format: Optional[str]):
+    if transport not in ("sse", "ndjson"):
+        raise HTTPException(status_code=400, detail="transport must be 'sse' or 'ndjson'.")
+    format = _explicit_format(format)
+    _require_ready()
+    runner = app.state.pipeline_runner
+    try:
+        # The slot is taken now, not when Starlette starts the body, so a burst of streams can't all pass the check
+        slot = runner.admit()
+    except ServiceOverloadedException as e:
+        logging.warning(f"Rejected request: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    encoding = default_encoding.with_format(format) if format else default_encoding
+
+    async def body():
+        try:
+            async for event in runner.stream(topic_name, encoding):
+                if transport == "sse":
+                    yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+                else:
+                    yield json.dumps(event) + "\n"
+        finally:
+            slot.release()
+
+    try:
+        return AdmittedStreamingResponse(
+            slot,
+            body(),
+            media_type="text/event-stream" if transport == "sse" else "application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except Exception:
+        slot.release()
+        raise
+
+
+@app.post("/generate-meme/stream")
+async def generate_meme_stream_api(request: TopicRequest, transport: str = "sse", format: Optional[str] = None):
+    """
+    Stream pipeline stages as they complete: emotion, dialogue deltas, dialogues,
+    template id, then the image (base64). `transport=sse` (default) or `ndjson`.
+    """
+    return _stream_events(request.topic_name, transport, format)
+
+
+@app.get("/generate-meme/stream")
+async def generate_meme_stream_get_api(topic_name: str, transport: str = "sse", format: Optional[str] = None):
+    """GET variant of the streaming endpoint, for browsers' EventSource."""
+    return _stream_events(topic_name, transport, format)
+
+
+@app.post("/generate-memes/batch")
+def generate_memes_batch_api(request: BatchTopicsRequest, output: str = "ndjson", format: Optional[str] = None):
+    """
+    Generate memes for a list of topics. `output=ndjson` (default) streams one JSON
+    line per topic as it finishes (image base64-encoded, or the error), then a
+    summary line; `output=zip` returns the images plus results.json in one archive.
+    """
+    format = _explicit_format(format)
+    _require_ready()
+    components = component_registry.get()
+    max_topics = components.pipeline_config.batch_max_topics
+    if not request.topics:
+        raise HTTPException(status_code=400, detail="No topics given.")
+    if len(request.topics) > max_topics:
+        raise HTTPException(status_code=413, detail=f"At most {max_topics} topics per batch.")
+    if output not in ("ndjson", "zip"):
+        raise HTTPException(status_code=400, detail="output must be 'ndjson' or 'zip'.")
+
+    encoding = default_encoding.with_format(format) if format else default_encoding
+    items = generate_meme_batch(
+        request.topics, components, encoding, render_service=app.state.pipeline_runner.render_service
+    )
+    try:
+        if output == "zip":
+            data, summary = build_batch_zip(items)
+            return Response(
+                content=data,
+                media_type="application/zip",
+                headers={
+                    "Content-Disposition": 'attachment; filename="memes.zip"',
+                    "X-Memes-Per-Sec": str(summary["memes_per_sec"]),
+                    "X-Batch-Failed": str(summary["failed"]),
+                },
+            )
+        return StreamingResponse(iter_batch_ndjson(items), media_type="application/x-ndjson")
+    except CustomException as e:
+        logging.error(f"CustomException: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/jobs", status_code=202)
+def submit_job_api(request: JobRequest):
+    """
+    Queue a meme and return its job id at once. Poll GET /jobs/{job_id}, or
+    pass `callback_url` to have the finished job POSTed there. Higher
+    `priority` runs first; `format` picks the image format.
+    """
+    if request.callback_url:
+        error = app.state.job_queue.callback_url_error(request.callback_url)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+    format = _explicit_format(request.format)
+    try:
+        job = app.state.job_queue.submit(request.topic_name, request.priority, format, request.callback_url)
+    except ServiceOverloadedException as e:
+        logging.warning(f"Rejected job: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except CustomException as e:
+        logging.error(f"Job submission failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return JSONResponse(status_code=202, content=job_record(job), headers={"Location": f"/jobs/{job.job_id}"})
+
+
+def _get_job(job_id: str):
+    job = app.state.job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+def get_job_api(job_id: str):
+    """Status of a job (queued, running, succeeded, failed or cancelled), with its output once finished."""
+    return job_record(_get_job(job_id))
+
+
+@app.get("/jobs/{job_id}/image")
+def get_job_image_api(job_id: str):
+    job = _get_job(job_id)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}.")
+    if not os.path.exists(job.output_path):
+        raise HTTPException(status_code=410, detail="The image is no longer stored.")
+    return FileResponse(job.output_path, media_type=job.media_type, headers={"X-Emotion": job.emotion_name})
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job_api(job_id: str):
+    """Cancel a queued job, or stop a running one before its image is saved."""
+    job = _get_job(job_id)
+    if job.status in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}.")
+    return job_record(app.state.job_queue.cancel(job_id))
+
+
+@app.get("/cache-stats/")
+def cache_stats_api():
+    components = component_registry.get()
+    prefetcher = get_template_prefetcher()
+    return {
+        "template_image_cache": template_image_cache.stats(),
+        "font_cache": font_cache.stats(),
+        "template_layouts": get_layout_index().stats(),
+        "meme_cache": components.meme_cache.stats(),
+        "local_emotion_classifier": (
+            components.emotion_analyzer.local_classifier.stats()
+            if components.emotion_analyzer.local_classifier is not None else None
+        ),
+        "llm_client": (
+            components.emotion_analyzer.model.stats()
+            if isinstance(components.emotion_analyzer.model, ResilientModel) else None
+        ),
+        "single_flight": {
+            "emotion_analysis": components.emotion_analyzer.inflight.stats(),
+            "emotion_analysis_async": components.emotion_analyzer.inflight_async.stats(),
+            "template_downloads": prefetcher.inflight.stats(),
+            "template_downloads_async": prefetcher.inflight_async.stats(),
+        },
+    }
+
+
+def _component_metrics():
+    """Counters the components already keep, read on each /metrics scrape."""
+    components = component_registry.get()
+    template_stats = template_image_cache.stats()
+    meme_stats = components.meme_cache.stats()
+    collected = [
+        ("meme_template_cache_hits_total", "counter", "Decoded template cache hits.",
+         [({}, template_stats["hits"])]),
+        ("meme_template_cache_misses_total", "counter", "Decoded template cache misses.",
+         [({}, template_stats["misses"])]),
+        ("meme_template_cache_evictions_total", "counter", "Decoded templates evicted from the cache.",
+         [({}, template_stats["evictions"])]),
+        ("meme_template_cache_bytes", "gauge", "Bytes of decoded templates held in memory.",
+         [({}, template_stats["bytes"])]),
+        ("meme_template_pack_hits_total", "counter", "Templates served from the memory-mapped pack.",
+         [({}, template_stats["pack_hits"])]),
+        ("meme_result_cache_lookups_total", "counter", "Meme result cache lookups by outcome.",
+         [({"result": "hit"}, meme_stats["hits"]), ({"result": "emotion_hit"}, meme_stats["emotion_hits"]),
+          ({"result": "miss"}, meme_stats["misses"])]),
+    ]
+    log_stats = logging_stats()
+    collected.append(("meme_log_records_dropped_total", "counter", "Log records dropped because the log queue was full.",
+                      [({}, log_stats["dropped"])]))
+    collected.append(("meme_log_records_sampled_out_total", "counter", "INFO records skipped by LOG_INFO_SAMPLE_RATE.",
+                      [({}, log_stats["sampled_out"])]))
+    if hasattr(app.state, "pipeline_runner"):
+        collected.append(("meme_inflight_requests", "gauge", "Requests in the async pipeline.",
+                          [({}, app.state.pipeline_runner.inflight)]))
+    if hasattr(app.state, "job_queue"):
+        job_stats = app.state.job_queue.stats()
+        collected.append(("meme_job_queue_depth", "gauge", "Background jobs waiting to run (shared by all workers with SQLite).",
+                          [({}, job_stats["queued"])]))
+        collected.append(("meme_jobs_running", "gauge", "Background jobs being run.",
+                          [({}, job_stats["running"])]))
+        collected.append(("meme_job_oldest_queued_seconds", "gauge", "How long the oldest queued job has waited.",
+                          [({}, job_stats["oldest_queued_seconds"])]))
+    local_classifier = components.emotion_analyzer.local_classifier
+    if local_classifier is not None:
+        local_stats = local_classifier.stats()
+        collected.append(("meme_local_emotion_predictions_total", "counter", "Local classifier predictions by outcome.",
+                          [({"result": "local"}, local_stats["local_hits"]),
+                           ({"result": "escalated"}, local_stats["escalations"])]))
+    if isinstance(components.emotion_analyzer.model, ResilientModel):
+        llm_stats = components.emotion_analyzer.model.stats()
+        collected.append(("meme_llm_events_total", "counter", "Resilient LLM client events.",
+                          [({"event": name}, llm_stats[name]) for name in
+                           ("calls", "successes", "failures", "retries", "timeouts", "hedges", "short_circuited")]))
+        collected.append(("meme_llm_breaker_open", "gauge", "1 while the LLM circuit breaker is not closed.",
+                          [({}, int(llm_stats["breaker_state"] != "closed"))]))
+    return collected
+
+
+metrics.register_collector(_component_metrics)
+
+
+@app.get("/metrics")
+def metrics_api():
+    """Prometheus text exposition of per-stage latency histograms, fallbacks, errors and cache counters."""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/fetch-templates/")
-def fetch_templates_api():
+def fetch_templates_api(incremental: Optional[bool] = None):
+    """Re-sync the template catalog; `?incremental=true` only reads rows changed since the last sync."""
     try:
-        response = fetch_image_templates()
+        response = fetch_image_templates(incremental=incremental)
         return response
     except CustomException as e:
         logging.error(f"Template fetch failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
-    uvicorn_run("app:app",host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    import argparse
+
+    server_config = ServerConfigEntity(config_entity=ConfigEntity())
+    parser = argparse.ArgumentParser(description="Serve the Meme Generator API.")
+    parser.add_argument("--host", default=server_config.host)
+    parser.add_argument("--port", type=int, default=server_config.port)
+    parser.add_argument("--workers", type=int, default=server_config.workers,
+                        help="worker processes sharing the socket; SIGHUP restarts them one at a time")
+    parser.add_argument("--no-preload", dest="preload", action="store_false", default=server_config.preload,
+                        help="let every worker check template_dir/ on its own startup instead of preparing it once here")
+    parser.add_argument("--graceful-timeout", type=int, default=server_config.graceful_timeout,
+                        help="seconds a stopping worker gets to finish in-flight requests")
+    parser.add_argument("--reload", action="store_true", help="restart on code changes (development, one process)")
+    args = parser.parse_args()
+
+    if args.preload and not args.reload:
+        # Download templates, profile layouts and build the pack once, before any worker starts;
+        # the workers then only map what is on disk
+        try:
+            logging.info(f"Preloading templates before starting {args.workers} worker(s)...")
+            prefetch_templates()
+            os.environ["PREFETCH_ON_STARTUP"] = "false"
+        except CustomException as e:
+            logging.error(f"Template preload failed; workers will prefetch on startup: {e}")
+    if args.workers > 1:
+        # Workers share encoded memes through artifacts/ instead of each keeping its own copy
+        os.environ.setdefault("MEME_IMAGE_CACHE_BACKEND", "disk")
+
+    uvicorn_run(
+        "app:app",
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else args.workers,
+        reload=args.reload,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+Batch generation vs. looping over topics one request at a time.
+
+Both modes run against the stub model and one fixed local template, so the
+numbers reflect model-call count, concurrency and rendering only. Reports
+model calls and memes/sec for each.
+
+Run from the repo root:
+    python -m benchmarks.bench_batch_generation --topics 100 --call-ms 300 --workers 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("PREFETCH_ON_STARTUP", "false")
+
+from benchmarks.load_test_generate_meme import make_template, install_stubs
+from benchmarks.stubs import StubGenerativeModel
+
+
+def run(topic_count, call_ms, workers, template_size):
+    from src.pipeline.component_registry import ComponentRegistry
+    from src.pipeline.run_meme_generator_pipeline import run_pipeline_with_components
+    from src.pipeline.run_batch_meme_pipeline import generate_meme_batch, batch_summary
+
+    topics = [f"exam results day {i}" for i in range(topic_count)]
+    model = StubGenerativeModel(call_delay=call_ms / 1000)
+    components = ComponentRegistry(model_factory=lambda: model).get()
+
+    with tempfile.TemporaryDirectory() as directory:
+        install_stubs(components, make_template(directory, size=template_size))
+
+        start = time.perf_counter()
+        for topic in topics:
+            run_pipeline_with_components(topic, components, fused=False)
+        loop_seconds = time.perf_counter() - start
+        loop_calls, model.calls = model.calls, 0
+
+        start = time.perf_counter()
+        items = list(generate_meme_batch(topics, components, workers=workers))
+        summary = batch_summary(items, time.perf_counter() - start)
+
+    return {
+        "benchmark": "batch_generation",
+        "params": {"topics": topic_count, "call_ms": call_ms, "workers": workers, "template_size": template_size},
+        "sequential_loop": {
+            "model_calls": loop_calls,
+            "seconds": round(loop_seconds, 3),
+            "memes_per_sec": round(topic_count / loop_seconds, 2),
+        },
+        "batch": {"model_calls": model.calls, **summary},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--topics", type=int, default=100)
+    parser.add_argument("--call-ms", type=float, default=300)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--template-size", type=int, default=480)
+    args = parser.parse_args()
+    print(json.dumps(run(args.topics, args.call_ms, args.workers, args.template_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
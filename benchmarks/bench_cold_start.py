@@ -0,0 +1,140 @@
+"""
+Cold start: import time, time to ready and time to first meme.
+
+Every round starts a fresh interpreter (so nothing is cached in-process) and
+measures, from the top of the child script:
+- import: `import app`;
+- listening: the lifespan has started and /healthz answers;
+- ready: /readyz answers 200;
+- first_meme: the first POST /generate-meme/ has returned,
+plus the latency of the first and second requests on their own (their
+difference is what the first user pays for anything left cold).
+
+Two start-ups are compared:
+- eager: the previous behaviour, with pandas, the Supabase client and the
+  Gemini SDK imported with the app and only the model client built before
+  serving, so the first request pays for fonts and Pillow plugins;
+- lazy: the catalog path and the SDK imported on demand, and the full
+  warm-up (model client, template index, fonts, codecs) run in the
+  background behind /readyz.
+The model is the stub (the real SDK is still imported), the result cache is
+off, and the meme is drawn on the first template in --template-dir.
+
+Run from the repo root:
+    python -m benchmarks.bench_cold_start --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stubs import summarize
+
+
+def child(mode, template_dir):
+    started = time.perf_counter()
+    os.environ["PREFETCH_ON_STARTUP"] = "false"
+    os.environ["MEME_CACHE_MODE"] = "off"
+    os.environ["STARTUP_WARMUP_BACKGROUND"] = "true" if mode == "lazy" else "false"
+    if mode == "eager":
+        import pandas  # noqa: F401
+        import supabase  # noqa: F401
+        import google.generativeai  # noqa: F401
+
+    import app as app_module
+    import_s = time.perf_counter() - started
+
+    import httpx
+    from benchmarks.load_test_generate_meme import install_stubs, make_template
+    from benchmarks.stubs import StubGenerativeModel
+    from src.pipeline.component_registry import component_registry
+    from src.pipeline.startup_warmup import warm_model_client
+
+    def stub_model_factory():
+        # The SDK import is part of building the real client
+        import google.generativeai  # noqa: F401
+        return StubGenerativeModel()
+
+    component_registry._model_factory = stub_model_factory
+    if mode == "eager":
+        app_module.default_warmup_steps = lambda: [("model_client", warm_model_client)]
+
+    templates = sorted(name for name in os.listdir(template_dir) if name.lower().endswith(".jpg")) \
+        if os.path.isdir(template_dir) else []
+    template_path = os.path.join(template_dir, templates[0]) if templates else make_template(tempfile.mkdtemp(), 1024)
+
+    async def run():
+        app = app_module.app
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                         timeout=None) as client:
+                (await client.get("/healthz")).raise_for_status()
+                listening_s = time.perf_counter() - started
+                while (await client.get("/readyz")).status_code != 200:
+                    await asyncio.sleep(0.005)
+                ready_s = time.perf_counter() - started
+
+                install_stubs(component_registry.get(), template_path)
+                request_started = time.perf_counter()
+                (await client.post("/generate-meme/", json={"topic_name": "exam results day"})).raise_for_status()
+                first_meme_s = time.perf_counter() - started
+                first_request_s = first_meme_s - (request_started - started)
+
+                request_started = time.perf_counter()
+                (await client.post("/generate-meme/", json={"topic_name": "exam results tomorrow"})).raise_for_status()
+                return {
+                    "import": import_s,
+                    "listening": listening_s,
+                    "ready": ready_s,
+                    "first_meme": first_meme_s,
+                    "first_request": first_request_s,
+                    "second_request": time.perf_counter() - request_started,
+                    "heavy_modules_after_import": heavy_modules,
+                }
+
+    heavy_modules = [name for name in ("pandas", "supabase", "google.generativeai") if name in sys.modules]
+    print(json.dumps(asyncio.run(run())))
+
+
+def run_mode(mode, rounds, template_dir):
+    samples = []
+    for _ in range(rounds):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_cold_start", "--child", mode, "--template-dir", template_dir],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    result = {
+        key: summarize([sample[key] for sample in samples])
+        for key in ("import", "listening", "ready", "first_meme", "first_request", "second_request")
+    }
+    result["heavy_modules_after_import"] = samples[0]["heavy_modules_after_import"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--template-dir", default="template_dir")
+    parser.add_argument("--child", choices=("eager", "lazy"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.template_dir)
+        return
+
+    results = {mode: run_mode(mode, args.rounds, args.template_dir) for mode in ("eager", "lazy")}
+    print(json.dumps({
+        "benchmark": "cold_start",
+        "params": {"rounds": args.rounds, "template_dir": args.template_dir},
+        "modes": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Per-request component construction vs. shared registry instances.
+
+Run from the repo root:
+    python -m benchmarks.bench_component_registry --iterations 200 --client-setup-ms 5
+"""
+import argparse
+import json
+import time
+
+from benchmarks.stubs import patch_genai, summarize
+
+
+def run(iterations, client_setup_ms, call_ms):
+    undo = patch_genai(init_delay=client_setup_ms / 1000, call_delay=call_ms / 1000)
+    try:
+        from src.components.topic_ingestion import TopicIngestion
+        from src.components.emotion_analyzer import EmotionAnalyzer
+        from src.components.memes_generator import MemesGenerator
+        from src.pipeline.component_registry import ComponentRegistry
+
+        def llm_stages(topic_ingestion, emotion_analyzer, memes_generator):
+            topic = topic_ingestion.initiate_topic_ingestion("exam failed").topic_name
+            emotion = emotion_analyzer.analyze_emotion(topic).emotion_name
+            memes_generator.generate_meme_dialogues(topic, emotion)
+
+        per_request = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            llm_stages(TopicIngestion(), EmotionAnalyzer(), MemesGenerator())
+            per_request.append(time.perf_counter() - start)
+
+        registry = ComponentRegistry()
+        registry.get()
+        shared = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            components = registry.get()
+            llm_stages(components.topic_ingestion, components.emotion_analyzer, components.memes_generator)
+            shared.append(time.perf_counter() - start)
+    finally:
+        undo()
+
+    return {
+        "benchmark": "component_registry",
+        "params": {"iterations": iterations, "client_setup_ms": client_setup_ms, "call_ms": call_ms},
+        "per_request_construction": summarize(per_request),
+        "shared_registry": summarize(shared),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--client-setup-ms", type=float, default=5.0,
+                        help="simulated cost of building one model client")
+    parser.add_argument("--call-ms", type=float, default=0.0, help="simulated latency of each model call")
+    args = parser.parse_args()
+    print(json.dumps(run(args.iterations, args.client_setup_ms, args.call_ms), indent=2))
+
+
+if __name__ == "__main__":
+    main()
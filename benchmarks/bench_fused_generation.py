@@ -0,0 +1,58 @@
+"""
+Two-call (emotion, then dialogues) vs. fused single-call content generation.
+
+Run from the repo root:
+    python -m benchmarks.bench_fused_generation --call-ms 400 --iterations 20
+"""
+import argparse
+import json
+import time
+
+from benchmarks.stubs import StubGenerativeModel, patch_genai, summarize
+
+
+def run(iterations, call_ms):
+    undo = patch_genai()
+    try:
+        from src.pipeline.component_registry import ComponentRegistry
+        from src.pipeline.run_meme_generator_pipeline import generate_meme_content
+
+        results = {}
+        scenarios = {
+            "two_call": (False, {}),
+            "fused": (True, {}),
+            # Unparseable fused output: pays for the fused call plus the two-call fallback
+            "fused_with_fallback": (True, {"fused": "not json"}),
+        }
+        for name, (fused, model_kwargs) in scenarios.items():
+            model = StubGenerativeModel(call_delay=call_ms / 1000, **model_kwargs)
+            components = ComponentRegistry(model_factory=lambda: model).get()
+
+            samples = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                generate_meme_content("exam failed", components, fused)
+                samples.append(time.perf_counter() - start)
+
+            results[name] = summarize(samples)
+            results[name]["model_calls_per_request"] = model.calls / iterations
+    finally:
+        undo()
+
+    return {
+        "benchmark": "fused_generation",
+        "params": {"iterations": iterations, "call_ms": call_ms},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--call-ms", type=float, default=400.0, help="simulated latency of each model call")
+    args = parser.parse_args()
+    print(json.dumps(run(args.iterations, args.call_ms), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Background jobs vs. synchronous requests under a burst, and the job stores.
+
+burst: --burst clients arrive at once against the stub model (--call-ms per
+model call), through the ASGI app:
+- sync: each POST /generate-meme/ holds its connection for the whole
+  pipeline; `over_timeout` counts requests slower than --lb-timeout-s, the
+  ones a load balancer would cut off;
+- jobs: each POST /jobs returns as soon as the job is stored; --job-workers
+  threads run them while clients poll GET /jobs/{id}. The last --high jobs
+  are submitted with priority 10 and overtake the backlog.
+
+stores: submit + claim + finish per second for the SQLite and in-memory
+stores, and --processes processes claiming the same SQLite queue at once
+(every job must be claimed exactly once).
+
+Run from the repo root:
+    python -m benchmarks.bench_job_queue --burst 200 --call-ms 300 --job-workers 16
+"""
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+os.environ.setdefault("PREFETCH_ON_STARTUP", "false")
+# The lifespan returns only once warm, so the job workers are running as soon as it is entered
+os.environ.setdefault("STARTUP_WARMUP_BACKGROUND", "false")
+
+from benchmarks.load_test_generate_meme import make_template, install_stubs
+from benchmarks.stubs import StubGenerativeModel, summarize
+
+
+async def burst(burst_size, call_ms, job_workers, high, lb_timeout, tmp):
+    import httpx
+    from app import app
+    from src.entity.config_entity import ConfigEntity, JobQueueConfigEntity
+    from src.pipeline import job_queue as job_queue_module
+    from src.pipeline.component_registry import component_registry
+    from src.utils.job_store import SQLiteJobStore
+
+    model = StubGenerativeModel(call_delay=call_ms / 1000)
+    component_registry._model_factory = lambda: model
+    component_registry.reset()
+    config = JobQueueConfigEntity(config_entity=ConfigEntity())
+    config.output_dir = os.path.join(tmp, "memes")
+    config.workers = job_workers
+    config.max_depth = max(config.max_depth, burst_size)
+    job_queue_module._job_queue = job_queue_module.JobQueue(
+        store=SQLiteJobStore(os.path.join(tmp, "jobs.sqlite3")), config=config,
+    )
+    template_path = make_template(tmp, 640)
+
+    async with app.router.lifespan_context(app):
+        install_stubs(component_registry.get(), template_path)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                     timeout=None) as client:
+            async def sync_one(i):
+                start = time.perf_counter()
+                response = await client.post("/generate-meme/", json={"topic_name": f"exam results day {i}"})
+                return response.status_code, time.perf_counter() - start
+
+            start = time.perf_counter()
+            results = await asyncio.gather(*(sync_one(i) for i in range(burst_size)))
+            sync_seconds = time.perf_counter() - start
+            held = [seconds for _, seconds in results]
+
+            async def submit_one(i):
+                started = time.perf_counter()
+                response = await client.post("/jobs", json={
+                    "topic_name": f"exam results night {i}", "priority": 10 if i >= burst_size - high else 0,
+                })
+                return response.status_code, time.perf_counter() - started, response.json().get("job_id")
+
+            start = time.perf_counter()
+            submitted = await asyncio.gather(*(submit_one(i) for i in range(burst_size)))
+            pending = {job_id for status, _, job_id in submitted if status == 202}
+            records = {}
+            while pending:
+                await asyncio.sleep(0.05)
+                for job_id in list(pending):
+                    record = (await client.get(f"/jobs/{job_id}")).json()
+                    if record["status"] in ("succeeded", "failed", "cancelled"):
+                        records[job_id] = record
+                        pending.discard(job_id)
+            jobs_seconds = time.perf_counter() - start
+
+    high_ids = {job_id for _, _, job_id in submitted[burst_size - high:]}
+    waits = collections.defaultdict(list)
+    for job_id, record in records.items():
+        waits["high" if job_id in high_ids else "normal"].append(record["wait_ms"] / 1000)
+    return {
+        "sync": {
+            "statuses": dict(collections.Counter(status for status, _ in results)),
+            "connection_held": summarize(held),
+            "over_timeout": sum(seconds > lb_timeout for seconds in held),
+            "seconds": round(sync_seconds, 2),
+        },
+        "jobs": {
+            "statuses": dict(collections.Counter(record["status"] for record in records.values())),
+            "connection_held": summarize([seconds for _, seconds, _ in submitted]),
+            "over_timeout": sum(seconds > lb_timeout for _, seconds, _ in submitted),
+            "queue_wait": summarize(waits["normal"]),
+            "queue_wait_high_priority": summarize(waits["high"]),
+            "seconds": round(jobs_seconds, 2),
+            "memes_per_sec": round(len(records) / jobs_seconds, 2),
+        },
+    }
+
+
+def store_throughput(store, jobs):
+    from src.entity.artifact_entity import MemeJobArtifact
+
+    start = time.perf_counter()
+    for i in range(jobs):
+        store.add(MemeJobArtifact(job_id=f"job-{i}", topic="exam", status="queued", priority=i % 3,
+                                  created_at=time.time()))
+    added = time.perf_counter()
+    for _ in range(jobs):
+        job = store.claim("bench/0")
+        store.finish(job.job_id, "bench/0", "succeeded", output_path="meme.png")
+    done = time.perf_counter()
+    return {"submit_per_sec": round(jobs / (added - start)), "claim_finish_per_sec": round(jobs / (done - added))}
+
+
+def _claim_all(path, barrier, results):
+    from src.utils.job_store import SQLiteJobStore
+
+    store = SQLiteJobStore(path)
+    worker = f"{os.getpid()}/bench"
+    claimed = []
+    barrier.wait()
+    while True:
+        job = store.claim(worker)
+        if job is None:
+            break
+        claimed.append(job.job_id)
+        store.finish(job.job_id, worker, "succeeded")
+    results.put(claimed)
+
+
+def shared_claims(path, processes, jobs):
+    from src.entity.artifact_entity import MemeJobArtifact
+    from src.utils.job_store import SQLiteJobStore
+
+    store = SQLiteJobStore(path)
+    for i in range(jobs):
+        store.add(MemeJobArtifact(job_id=f"shared-{i}", topic="exam", status="queued", created_at=time.time()))
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(processes), context.Queue()
+    workers = [context.Process(target=_claim_all, args=(path, barrier, results)) for _ in range(processes)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    claimed = [results.get(timeout=300) for _ in workers]
+    elapsed = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+    all_claims = [job_id for per_process in claimed for job_id in per_process]
+    return {
+        "processes": processes,
+        "jobs": jobs,
+        "claimed_per_process": [len(per_process) for per_process in claimed],
+        "duplicates": len(all_claims) - len(set(all_claims)),
+        "unclaimed": jobs - len(set(all_claims)),
+        "claims_per_sec": round(jobs / elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--call-ms", type=float, default=300)
+    parser.add_argument("--job-workers", type=int, default=16)
+    parser.add_argument("--high", type=int, default=10, help="last jobs of the burst submitted with priority 10")
+    parser.add_argument("--lb-timeout-s", type=float, default=5.0)
+    parser.add_argument("--store-jobs", type=int, default=2000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    from src.utils.job_store import SQLiteJobStore, MemoryJobStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(burst(args.burst, args.call_ms, args.job_workers, args.high, args.lb_timeout_s, tmp))
+        stores = {
+            "sqlite": store_throughput(SQLiteJobStore(os.path.join(tmp, "throughput.sqlite3")), args.store_jobs),
+            "memory": store_throughput(MemoryJobStore(), args.store_jobs),
+            "sqlite_shared": shared_claims(os.path.join(tmp, "shared.sqlite3"), args.processes, args.store_jobs),
+        }
+
+    print(json.dumps({
+        "benchmark": "job_queue",
+        "params": vars(args),
+        "burst": results,
+        "stores": stores,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
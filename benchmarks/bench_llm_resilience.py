@@ -0,0 +1,119 @@
+"""
+Tail latency and failure handling of the resilient LLM client.
+
+A seeded FaultyGenerativeModel makes a share of calls slow and a share fail.
+The same call sequence is run against the bare model, the resilient client
+(per-attempt timeout + jittered retries) and the resilient client with hedged
+requests. A second scenario takes the model down completely and measures how
+quickly EmotionAnalyzer and MemesGenerator fall back once the circuit opens.
+
+Run from the repo root:
+    python -m benchmarks.bench_llm_resilience --calls 300 --concurrency 16
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import FaultyGenerativeModel, summarize
+
+
+def client_config(timeout, hedge, retries=2, breaker_failures=5, breaker_reset=30.0):
+    from src.entity.config_entity import ConfigEntity, LLMClientConfigEntity
+
+    config = LLMClientConfigEntity(config_entity=ConfigEntity())
+    config.timeout_seconds = timeout
+    config.deadline_seconds = timeout * (retries + 2)
+    config.max_retries = retries
+    config.backoff_base_seconds = 0.05
+    config.backoff_max_seconds = 0.2
+    config.breaker_failures = breaker_failures
+    config.breaker_reset_seconds = breaker_reset
+    config.hedge = hedge
+    config.hedge_min_samples = 20
+    return config
+
+
+def drive(model, calls, concurrency):
+    def one(_):
+        start = time.perf_counter()
+        try:
+            model.generate_content("Return ONLY the emotion as a single word.")
+            ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(calls)))
+    stats = summarize([seconds for seconds, _ in results])
+    stats["error_rate"] = round(sum(not ok for _, ok in results) / calls, 4)
+    return stats
+
+
+def tail_latency(calls, concurrency, call_ms, slow_rate, slow_ms, error_rate, timeout):
+    from src.utils.llm_client import ResilientModel
+
+    def faulty():
+        return FaultyGenerativeModel(call_delay=call_ms / 1000, slow_rate=slow_rate,
+                                     slow_delay=slow_ms / 1000, error_rate=error_rate, seed=7)
+
+    results = {"bare_model": drive(faulty(), calls, concurrency)}
+    for label, hedge in (("timeout_retry", False), ("timeout_retry_hedge", True)):
+        # A high breaker threshold keeps this scenario about latency, not fail-fast
+        client = ResilientModel(faulty(), client_config(timeout, hedge, breaker_failures=10_000))
+        results[label] = drive(client, calls, concurrency)
+        results[label]["client"] = client.stats()
+    return results
+
+
+def outage(calls, call_ms):
+    from src.utils.llm_client import ResilientModel
+    from src.components.emotion_analyzer import EmotionAnalyzer
+    from src.components.memes_generator import MemesGenerator
+
+    model = ResilientModel(
+        FaultyGenerativeModel(call_delay=call_ms / 1000, error_rate=1.0),
+        client_config(timeout=1.0, hedge=False, breaker_failures=3, breaker_reset=60.0),
+    )
+    analyzer = EmotionAnalyzer(model=model)
+    generator = MemesGenerator(model=model)
+
+    timings, emotions, dialogues = [], set(), set()
+    for i in range(calls):
+        start = time.perf_counter()
+        emotions.add(analyzer._analyze_emotion(f"topic {i}").emotion_name)
+        dialogues.add(generator.generate_meme_dialogues(f"topic {i}", "neutral"))
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "first_request": summarize(timings[:1]),
+        "after_breaker_opened": summarize(timings[5:]),
+        "emotions_returned": sorted(emotions),
+        "dialogues_returned": sorted(dialogues),
+        "client": model.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--call-ms", type=float, default=50)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=3000)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=0.5, help="per-attempt timeout in seconds")
+    args = parser.parse_args()
+
+    print(json.dumps({
+        "benchmark": "llm_resilience",
+        "params": vars(args),
+        "tail_latency": tail_latency(args.calls, args.concurrency, args.call_ms, args.slow_rate,
+                                     args.slow_ms, args.error_rate, args.timeout),
+        "outage": outage(30, args.call_ms),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
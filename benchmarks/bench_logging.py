@@ -0,0 +1,113 @@
+"""
+Caller-side cost of a log call: synchronous file handler vs. the queued logger.
+
+The "sync" logger writes through a FileHandler in the calling thread (what
+src/logger did before). The "queued" logger is built like src/logger:
+a non-blocking QueueHandler in front of a QueueListener that owns a
+RotatingFileHandler, optionally with INFO sampling. N threads log M records
+each; the per-call latency seen by those threads is reported. --write-delay-us
+adds a per-record delay inside the file handler to stand in for a slow or
+contended disk.
+
+Run from the repo root:
+    python -m benchmarks.bench_logging --threads 8 --records 5000 --write-delay-us 0 200
+"""
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import summarize
+
+
+class SlowFileHandler(logging.handlers.RotatingFileHandler):
+    write_delay = 0.0
+
+    def emit(self, record):
+        if self.write_delay:
+            time.sleep(self.write_delay)
+        super().emit(record)
+
+
+def build_logger(kind, path, write_delay, sample_rate):
+    from src.logger import NonBlockingQueueHandler, InfoSampler, TEXT_FORMAT, RequestContextFilter
+
+    logger = logging.Logger(f"bench_{kind}", logging.INFO)
+    handler = SlowFileHandler(path, maxBytes=20 * 1024 * 1024, backupCount=2)
+    handler.write_delay = write_delay
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    if kind == "sync":
+        handler.addFilter(RequestContextFilter())
+        logger.addHandler(handler)
+        return logger, handler.close
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=10000))
+    queue_handler.addFilter(InfoSampler(sample_rate))
+    queue_handler.addFilter(RequestContextFilter())
+    logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(queue_handler.queue, handler)
+    listener.start()
+
+    def close():
+        listener.stop()
+        handler.close()
+
+    logger.dropped = lambda: queue_handler.dropped
+    return logger, close
+
+
+def run_case(kind, threads, records, write_delay, sample_rate):
+    with tempfile.TemporaryDirectory() as directory:
+        logger, close = build_logger(kind, os.path.join(directory, "bench.log"), write_delay, sample_rate)
+
+        def worker(index):
+            latencies = []
+            for i in range(records):
+                start = time.perf_counter()
+                logger.info("Generating meme dialogues for topic='%s', emotion='%s'", f"topic {index}-{i}", "sad")
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            latencies = [value for chunk in executor.map(worker, range(threads)) for value in chunk]
+        caller_seconds = time.perf_counter() - start
+        close()
+        drained_seconds = time.perf_counter() - start
+        result = {
+            "caller_latency": summarize(latencies),
+            "caller_seconds": round(caller_seconds, 3),
+            "seconds_until_flushed": round(drained_seconds, 3),
+        }
+        if hasattr(logger, "dropped"):
+            result["dropped"] = logger.dropped()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--records", type=int, default=5000, help="records per thread")
+    parser.add_argument("--write-delay-us", type=float, nargs="+", default=[0, 200])
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="INFO sample rate for the sampled case")
+    args = parser.parse_args()
+
+    results = {}
+    for delay_us in args.write_delay_us:
+        delay = delay_us / 1e6
+        results[f"write_delay_{delay_us:g}us"] = {
+            "sync_file_handler": run_case("sync", args.threads, args.records, delay, 1.0),
+            "queued": run_case("queued", args.threads, args.records, delay, 1.0),
+            f"queued_sampled_{args.sample_rate:g}": run_case("queued", args.threads, args.records, delay,
+                                                             args.sample_rate),
+        }
+    print(json.dumps({"benchmark": "logging", "params": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
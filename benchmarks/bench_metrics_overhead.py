@@ -0,0 +1,94 @@
+"""
+Cost of the metrics layer on the hot path.
+
+Times the instrumentation primitives on their own (a tracked stage, a
+histogram observation, a counter increment), then runs the whole pipeline
+against a zero-latency stub model with metrics enabled and disabled, so the
+difference is the per-request overhead. Prints a sample of the /metrics
+exposition at the end.
+
+Run from the repo root:
+    python -m benchmarks.bench_metrics_overhead --iterations 200000 --requests 300
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("PREFETCH_ON_STARTUP", "false")
+
+from benchmarks.load_test_generate_meme import make_template, install_stubs
+from benchmarks.stubs import StubGenerativeModel, summarize
+
+
+def per_call_ns(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) / iterations * 1e9, 1)
+
+
+def primitives(iterations):
+    from src.utils.metrics import track_stage, STAGE_SECONDS, FALLBACKS
+
+    def tracked():
+        with track_stage("bench"):
+            pass
+
+    return {
+        "track_stage_ns": per_call_ns(tracked, iterations),
+        "histogram_observe_ns": per_call_ns(lambda: STAGE_SECONDS.observe(0.01, stage="bench"), iterations),
+        "counter_inc_ns": per_call_ns(lambda: FALLBACKS.inc(kind="bench"), iterations),
+    }
+
+
+def pipeline(requests, template_size):
+    from src.pipeline.component_registry import ComponentRegistry
+    from src.pipeline.run_meme_generator_pipeline import run_pipeline_with_components
+    from src.utils.metrics import metrics
+
+    components = ComponentRegistry(model_factory=lambda: StubGenerativeModel(call_delay=0)).get()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        install_stubs(components, make_template(directory, size=template_size))
+        run_pipeline_with_components("warm up", components, fused=False)
+        # Alternate the two modes so drift (thermal, GC) hits both equally
+        samples = {"metrics_enabled": [], "metrics_disabled": []}
+        for i in range(requests * 2):
+            label = "metrics_enabled" if i % 2 == 0 else "metrics_disabled"
+            metrics.enabled = label == "metrics_enabled"
+            start = time.perf_counter()
+            run_pipeline_with_components(f"topic {i}", components, fused=False)
+            samples[label].append(time.perf_counter() - start)
+        metrics.enabled = True
+    for label, timings in samples.items():
+        results[label] = summarize(timings)
+    enabled, disabled = results["metrics_enabled"]["mean_ms"], results["metrics_disabled"]["mean_ms"]
+    results["overhead_ms_per_request"] = round(enabled - disabled, 4)
+    results["overhead_pct"] = round((enabled - disabled) / disabled * 100, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--template-size", type=int, default=240)
+    args = parser.parse_args()
+
+    from src.utils.metrics import metrics
+
+    result = {
+        "benchmark": "metrics_overhead",
+        "params": vars(args),
+        "primitives": primitives(args.iterations),
+        "pipeline": pipeline(args.requests, args.template_size),
+    }
+    result["exposition_sample"] = [line for line in metrics.render().splitlines()
+                                   if line.startswith("meme_stage_duration_seconds_count")]
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Encode latency and payload size per output format over the shipped templates.
+
+Each template is captioned once, then encoded with every format/setting, at
+full size and (optionally) downscaled to --max-dimension.
+
+Run from the repo root:
+    python -m benchmarks.bench_output_encoding --max-dimension 1024
+"""
+import argparse
+import glob
+import json
+import os
+
+from benchmarks.stubs import summarize
+
+
+UPPER = "Results vachayi ra mama"
+LOWER = "Naa marks choosi calculator kuda navvindi"
+
+
+def run(template_dir, font_path, max_dimensions):
+    from src.utils.template_cache import TemplateImageCache
+    from src.utils.meme_renderer import draw_meme_text
+    from src.utils.image_encoder import EncodingOptions, encode_image
+
+    paths = sorted(glob.glob(os.path.join(template_dir, "*.jpg")))
+    if not paths:
+        raise SystemExit(f"No templates found in {template_dir}")
+
+    variants = {
+        "png": EncodingOptions(format="png"),
+        "png_fast": EncodingOptions(format="png", png_compress_level=1),
+        "png_optimized": EncodingOptions(format="png", png_optimize=True),
+        "jpeg_q85": EncodingOptions(format="jpeg", jpeg_quality=85),
+        "webp_q80": EncodingOptions(format="webp", webp_quality=80, webp_method=4),
+        "webp_q80_fast": EncodingOptions(format="webp", webp_quality=80, webp_method=0),
+    }
+
+    cache = TemplateImageCache(max_bytes=1024 * 1024 * 1024)
+    results = {}
+    for max_dimension in max_dimensions:
+        rendered = []
+        for path in paths:
+            img = cache.get(path, max_dimension)
+            rendered.append(draw_meme_text(img, UPPER, LOWER, font_path))
+
+        label = f"max_dimension={max_dimension or 'full'}"
+        results[label] = {}
+        for name, options in variants.items():
+            encoded = [encode_image(img, options) for img in rendered]
+            stats = summarize([e.encode_ms / 1000 for e in encoded])
+            stats["mean_bytes"] = int(sum(e.byte_size for e in encoded) / len(encoded))
+            results[label][name] = stats
+
+    return {
+        "benchmark": "output_encoding",
+        "params": {"templates": len(paths), "max_dimensions": max_dimensions},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--template-dir", default="template_dir")
+    parser.add_argument("--font-path", default="fonts/Noto_Sans_Telugu/NotoSansTelugu-Regular.ttf")
+    parser.add_argument("--max-dimension", type=int, default=1024, help="also run downscaled to this size (0 to skip)")
+    args = parser.parse_args()
+    max_dimensions = [0] + ([args.max_dimension] if args.max_dimension else [])
+    print(json.dumps(run(args.template_dir, args.font_path, max_dimensions), indent=2))
+
+
+if __name__ == "__main__":
+    main()
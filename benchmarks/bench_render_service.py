@@ -0,0 +1,77 @@
+"""
+Renders/sec of the process-pool RenderService against the number of workers,
+with the in-process add_text_to_image as the single-core baseline.
+
+Run from the repo root:
+    python -m benchmarks.bench_render_service --jobs 60 --workers 1 2 4
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from benchmarks.stubs import StubGenerativeModel
+
+
+UPPER = "Results vachayi ra mama"
+LOWER = "Naa marks choosi calculator kuda navvindi"
+
+
+def run(jobs, worker_counts, template_dir):
+    from src.components.memes_generator import MemesGenerator
+    from src.components.render_service import RenderService
+
+    paths = sorted(glob.glob(os.path.join(template_dir, "*.jpg")))
+    if not paths:
+        raise SystemExit(f"No templates found in {template_dir}")
+    workload = [paths[i % len(paths)] for i in range(jobs)]
+
+    generator = MemesGenerator(model=StubGenerativeModel())
+    for path in paths:
+        generator.add_text_to_image(path, UPPER, LOWER)
+    start = time.perf_counter()
+    for path in workload:
+        generator.add_text_to_image(path, UPPER, LOWER)
+    baseline = jobs / (time.perf_counter() - start)
+
+    results = []
+    for workers in worker_counts:
+        service = RenderService(workers=workers, warm_templates=True)
+        try:
+            # Let every worker finish its warm-up before timing
+            for future in [service.submit(paths[0], UPPER, LOWER) for _ in range(workers * 2)]:
+                future.result()
+
+            start = time.perf_counter()
+            futures = [service.submit(path, UPPER, LOWER) for path in workload]
+            sizes = [future.result().byte_size for future in futures]
+            elapsed = time.perf_counter() - start
+        finally:
+            service.shutdown()
+
+        results.append({
+            "workers": workers,
+            "renders_per_sec": round(jobs / elapsed, 2),
+            "mean_png_bytes": int(sum(sizes) / len(sizes)),
+        })
+
+    return {
+        "benchmark": "render_service",
+        "params": {"jobs": jobs, "templates": len(paths), "cpu_count": os.cpu_count()},
+        "in_process_renders_per_sec": round(baseline, 2),
+        "process_pool": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=60)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--template-dir", default="template_dir")
+    args = parser.parse_args()
+    print(json.dumps(run(args.jobs, args.workers, args.template_dir), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Multi-worker serving: throughput against worker count, and shared template downloads.
+
+server: for each --workers count, starts the uvicorn multi-worker server the
+way `python app.py --workers N` does (stub model with --call-ms delay, one
+local template of --template-size px, result cache off) and drives
+POST /generate-meme/ over real HTTP at --concurrency. The load generator is
+one process on the same machine, so scaling stops at the free cores
+(reported as cpu_count).
+
+shared_prefetch: --processes processes prefetch the same --templates
+templates into one empty template_dir at the same moment, from a local HTTP
+server that counts requests. With the per-template file locks every
+template is downloaded once, however many processes race for it.
+
+Run from the repo root:
+    python -m benchmarks.bench_server_workers --workers 1 2 4 --requests 400 --concurrency 32
+"""
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stubs import summarize
+
+
+def create_app():
+    """uvicorn factory run in every worker: the real app with a stub model and a fixed local template."""
+    from benchmarks.stubs import StubGenerativeModel
+    from src.components.memes_generator import MemesGenerator
+    from src.pipeline.component_registry import component_registry
+    import app as app_module
+
+    call_delay = float(os.environ["BENCH_CALL_MS"]) / 1000
+    template_path = os.environ["BENCH_TEMPLATE"]
+
+    async def select_template_async(self, emotion, http_client):
+        return template_path
+
+    component_registry._model_factory = lambda: StubGenerativeModel(call_delay=call_delay)
+    MemesGenerator.select_template = lambda self, emotion: template_path
+    MemesGenerator.select_template_async = select_template_async
+    return app_module.app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(workers, port):
+    from uvicorn import run as uvicorn_run
+
+    uvicorn_run("benchmarks.bench_server_workers:create_app", factory=True, host="127.0.0.1", port=port,
+                workers=workers, log_level="warning", access_log=False)
+
+
+async def drive(base_url, total_requests, concurrency, warmup_requests):
+    import httpx
+
+    latencies, statuses = [], collections.Counter()
+    async with httpx.AsyncClient(base_url=base_url, timeout=None,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        deadline = time.monotonic() + 120
+        while True:
+            try:
+                if (await client.get("/readyz")).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("server did not become ready")
+            await asyncio.sleep(0.1)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(record):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/generate-meme/", json={"topic_name": "exam results day"})
+                if record:
+                    latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] += 1
+
+        # Warm every worker (a worker still warming answers 503 and counts nowhere)
+        await asyncio.gather(*(one(False) for _ in range(warmup_requests)))
+        start = time.perf_counter()
+        await asyncio.gather(*(one(True) for _ in range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "latency": summarize(latencies),
+        "statuses": dict(statuses),
+    }
+
+
+def run_server(workers, total_requests, concurrency, call_ms, template_path):
+    port = free_port()
+    env = dict(os.environ, BENCH_CALL_MS=str(call_ms), BENCH_TEMPLATE=template_path,
+               PREFETCH_ON_STARTUP="false", MEME_CACHE_MODE="off", RENDER_WORKERS="1")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_server_workers", "--serve", str(workers), "--port", str(port)],
+        env=env,
+    )
+    try:
+        return asyncio.run(drive(f"http://127.0.0.1:{port}", total_requests, concurrency, warmup_requests=8 * workers))
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def _prefetch(template_dir, emotion_url_map, barrier):
+    from src.utils.template_prefetcher import TemplatePrefetcher
+
+    prefetcher = TemplatePrefetcher(template_dir, os.path.join(template_dir, "manifest.json"),
+                                    max_workers=8, timeout=30, lock_timeout=60)
+    barrier.wait()
+    prefetcher.prefetch(emotion_url_map)
+
+
+def shared_prefetch(processes, templates, template_size):
+    from PIL import Image
+    from benchmarks.local_template_server import serve_directory
+
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as template_dir:
+        for i in range(templates):
+            Image.new("RGB", (template_size, template_size), color=(i % 255, 90, 160)).save(
+                os.path.join(source, f"template_{i}.jpg"), quality=90)
+        counter = collections.Counter()
+        with serve_directory(source, latency=0.02, counter=counter) as base_url:
+            emotion_url_map = {"sad": [f"{base_url}/template_{i}.jpg" for i in range(templates)]}
+            context = multiprocessing.get_context("spawn")
+            barrier = context.Barrier(processes)
+            workers = [context.Process(target=_prefetch, args=(template_dir, emotion_url_map, barrier))
+                       for _ in range(processes)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+        files = [name for name in os.listdir(template_dir) if name.endswith(".jpg")]
+        return {
+            "processes": processes,
+            "templates": templates,
+            "downloads": counter["GET"],
+            "head_requests": counter["HEAD"],
+            "files": len(files),
+            "seconds": round(elapsed, 2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--call-ms", type=float, default=20)
+    parser.add_argument("--template-size", type=int, default=640)
+    parser.add_argument("--processes", type=int, default=4, help="processes racing in shared_prefetch")
+    parser.add_argument("--templates", type=int, default=50)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    from benchmarks.load_test_generate_meme import make_template
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template_path = make_template(tmp, args.template_size)
+        server = {
+            str(workers): run_server(workers, args.requests, args.concurrency, args.call_ms, template_path)
+            for workers in args.workers
+        }
+    base = server[str(args.workers[0])]["throughput_rps"]
+    for result in server.values():
+        result["speedup"] = round(result["throughput_rps"] / base, 2)
+
+    print(json.dumps({
+        "benchmark": "server_workers",
+        "params": {**{k: v for k, v in vars(args).items() if k not in ("serve", "port")}, "cpu_count": os.cpu_count()},
+        "server": server,
+        "shared_prefetch": shared_prefetch(args.processes, args.templates, args.template_size),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
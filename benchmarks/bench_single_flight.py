@@ -0,0 +1,139 @@
+"""
+Request coalescing for identical in-flight work.
+
+Fires N concurrent identical emotion analyses (threads and asyncio, against
+the stub model) and N concurrent downloads of the same missing template
+(against the local storage stand-in), with and without the single-flight
+layer, and counts the upstream calls each one makes. Also checks that an
+upstream error reaches every waiter and that waiters honour the timeout.
+
+Run from the repo root:
+    python -m benchmarks.bench_single_flight --concurrency 50 --call-ms 200
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.local_template_server import serve_directory
+from benchmarks.stubs import StubGenerativeModel
+
+
+TOPIC = "Exam failed"
+
+
+class FailingModel(StubGenerativeModel):
+    def generate_content(self, prompt, **kwargs):
+        super().generate_content(prompt, **kwargs)
+        raise RuntimeError("upstream unavailable")
+
+
+def threaded(concurrency, fn, *args):
+    """Run `fn(*args)` from `concurrency` threads at once; returns (results or exceptions, seconds)."""
+    def call(_):
+        try:
+            return fn(*args)
+        except Exception as e:
+            return e
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+def gathered(concurrency, make_coro):
+    async def main():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(make_coro() for _ in range(concurrency)), return_exceptions=True)
+        return results, time.perf_counter() - start
+    return asyncio.run(main())
+
+
+def emotion_analysis(concurrency, call_ms):
+    from src.components.emotion_analyzer import EmotionAnalyzer
+
+    results = {}
+    for label, coalesced in (("direct", False), ("single_flight", True)):
+        model = StubGenerativeModel(call_delay=call_ms / 1000)
+        analyzer = EmotionAnalyzer(model=model)
+        fn = analyzer.analyze_emotion if coalesced else analyzer._analyze_emotion
+        _, seconds = threaded(concurrency, fn, TOPIC)
+        threaded_calls = model.calls
+
+        model.calls = 0
+        async_fn = analyzer.analyze_emotion_async if coalesced else analyzer._analyze_emotion_async
+        _, async_seconds = gathered(concurrency, lambda: async_fn(TOPIC))
+        results[label] = {
+            "threads": {"model_calls": threaded_calls, "seconds": round(seconds, 3)},
+            "asyncio": {"model_calls": model.calls, "seconds": round(async_seconds, 3)},
+        }
+    return results
+
+
+def template_downloads(concurrency, latency_ms, template_dir):
+    from src.utils.template_prefetcher import TemplatePrefetcher
+
+    name = sorted(os.listdir(template_dir))[0]
+    counter = collections.Counter()
+    results = {}
+    with serve_directory(template_dir, latency=latency_ms / 1000, counter=counter) as base_url:
+        url = f"{base_url}/{name}"
+        for label, coalesced in (("direct", False), ("single_flight", True)):
+            with tempfile.TemporaryDirectory() as target_dir:
+                prefetcher = TemplatePrefetcher(
+                    template_dir=target_dir,
+                    manifest_path=os.path.join(target_dir, "manifest.json"),
+                    max_workers=concurrency,
+                    timeout=10,
+                )
+                fn = prefetcher.download if coalesced else prefetcher._download
+                counter.clear()
+                outcomes, seconds = threaded(concurrency, fn, url, prefetcher.resolve_path(url))
+                failures = sum(isinstance(outcome, Exception) for outcome in outcomes)
+                results[label] = {"http_gets": counter["GET"], "failures": failures, "seconds": round(seconds, 3)}
+    return results
+
+
+def error_and_timeout_checks(concurrency, call_ms):
+    from src.components.emotion_analyzer import EmotionAnalyzer
+    from src.utils.single_flight import SingleFlight
+
+    failing = FailingModel(call_delay=call_ms / 1000)
+    analyzer = EmotionAnalyzer(model=failing)
+    outcomes, _ = threaded(concurrency, analyzer.analyze_emotion, TOPIC)
+    errors_propagated = all("upstream unavailable" in str(outcome) for outcome in outcomes)
+
+    flight = SingleFlight(timeout=call_ms / 4000)
+    outcomes, _ = threaded(concurrency, flight.do, "slow", time.sleep, call_ms / 1000)
+    timed_out = sum(isinstance(outcome, TimeoutError) for outcome in outcomes)
+
+    return {
+        "error_propagation": {"model_calls": failing.calls, "all_waiters_got_error": errors_propagated},
+        "waiter_timeout": {"timed_out": timed_out, "expected": concurrency - 1},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--call-ms", type=float, default=200, help="stub model latency")
+    parser.add_argument("--latency-ms", type=float, default=200, help="storage stand-in latency")
+    parser.add_argument("--template-dir", default="template_dir")
+    args = parser.parse_args()
+
+    print(json.dumps({
+        "benchmark": "single_flight",
+        "params": vars(args),
+        "emotion_analysis": emotion_analysis(args.concurrency, args.call_ms),
+        "template_downloads": template_downloads(args.concurrency, args.latency_ms, args.template_dir),
+        "checks": error_and_timeout_checks(args.concurrency, args.call_ms),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Time to first useful byte: streaming endpoint vs. the one-shot endpoint.
+
+Drives POST /generate-meme/ and POST /generate-meme/stream (SSE) through the
+ASGI app against the stub model, which streams its dialogue response in
+chunks. For the stream, each stage's time comes from the `elapsed_ms` the
+server stamps on its event (the in-process transport delivers the body in
+one piece, so client-side arrival times would all look the same); for the
+one-shot endpoint it is the full request latency.
+
+Run from the repo root:
+    python -m benchmarks.bench_streaming_response --requests 20 --call-ms 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("PREFETCH_ON_STARTUP", "false")
+# The lifespan returns only once warm, so the runner is there as soon as it is entered
+os.environ.setdefault("STARTUP_WARMUP_BACKGROUND", "false")
+
+from benchmarks.load_test_generate_meme import make_template, install_stubs
+from benchmarks.stubs import StubGenerativeModel, summarize
+
+
+def parse_sse(body: str) -> list:
+    events = []
+    for frame in body.split("\n\n"):
+        for line in frame.splitlines():
+            if line.startswith("data: "):
+                events.append(json.loads(line[len("data: "):]))
+    return events
+
+
+async def run(total_requests, call_ms, template_size):
+    import httpx
+    from app import app
+    from src.pipeline.component_registry import component_registry
+
+    model = StubGenerativeModel(call_delay=call_ms / 1000)
+    component_registry._model_factory = lambda: model
+    component_registry.reset()
+
+    one_shot, stages = [], {}
+    with tempfile.TemporaryDirectory() as tmp:
+        template_path = make_template(tmp, template_size)
+        async with app.router.lifespan_context(app):
+            components = component_registry.get()
+            install_stubs(components, template_path)
+            components.pipeline_config.async_pipeline = True
+
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                         timeout=None) as client:
+                for i in range(total_requests):
+                    payload = {"topic_name": f"exam results day {i}"}
+
+                    start = time.perf_counter()
+                    response = await client.post("/generate-meme/", json=payload)
+                    response.raise_for_status()
+                    one_shot.append(time.perf_counter() - start)
+
+                    response = await client.post("/generate-meme/stream", json=payload)
+                    response.raise_for_status()
+                    first_delta = None
+                    for event in parse_sse(response.text):
+                        if event["event"] == "error":
+                            raise RuntimeError(event["detail"])
+                        if event["event"] == "dialogue_delta":
+                            first_delta = first_delta or event["elapsed_ms"]
+                            continue
+                        stages.setdefault(event["event"], []).append(event["elapsed_ms"] / 1000)
+                    if first_delta is not None:
+                        stages.setdefault("first_dialogue_delta", []).append(first_delta / 1000)
+
+    order = ("emotion", "first_dialogue_delta", "dialogues", "template", "image", "done")
+    return {
+        "benchmark": "streaming_response",
+        "params": {"requests": total_requests, "call_ms": call_ms, "template_size": template_size},
+        "one_shot_total": summarize(one_shot),
+        "stream_time_to": {name: summarize(stages[name]) for name in order if name in stages},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--call-ms", type=float, default=400.0, help="simulated latency of each model call")
+    parser.add_argument("--template-size", type=int, default=480)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.call_ms, args.template_size)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
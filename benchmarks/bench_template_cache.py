@@ -0,0 +1,79 @@
+"""
+Template decode cost vs. LRU cache hits, and its effect on add_text_to_image.
+
+Run from the repo root:
+    python -m benchmarks.bench_template_cache --rounds 5
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from benchmarks.stubs import StubGenerativeModel, summarize
+
+
+def run(rounds, template_dir):
+    from PIL import Image
+    from src.components.memes_generator import MemesGenerator
+    from src.utils.template_cache import TemplateImageCache, template_image_cache
+
+    paths = sorted(glob.glob(os.path.join(template_dir, "*.jpg")))
+    if not paths:
+        raise SystemExit(f"No templates found in {template_dir}")
+
+    decode, cached = [], []
+    cache = TemplateImageCache(max_bytes=512 * 1024 * 1024)
+    for path in paths:
+        cache.get(path)
+    for _ in range(rounds):
+        for path in paths:
+            start = time.perf_counter()
+            with Image.open(path) as opened:
+                opened.convert("RGB").load()
+            decode.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            cache.get(path)
+            cached.append(time.perf_counter() - start)
+
+    generator = MemesGenerator(model=StubGenerativeModel())
+    upper, lower = "Results vachayi ra mama", "Naa marks choosi calculator kuda navvindi"
+
+    def render_all():
+        samples = []
+        for path in paths:
+            start = time.perf_counter()
+            generator.add_text_to_image(path, upper, lower)
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    cold_render = []
+    for _ in range(rounds):
+        template_image_cache.clear()
+        cold_render.extend(render_all())
+    warm_render = []
+    for _ in range(rounds):
+        warm_render.extend(render_all())
+
+    return {
+        "benchmark": "template_cache",
+        "params": {"rounds": rounds, "templates": len(paths)},
+        "decode": summarize(decode),
+        "cache_hit": summarize(cached),
+        "add_text_to_image_cold": summarize(cold_render),
+        "add_text_to_image_warm": summarize(warm_render),
+        "cache_stats": template_image_cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--template-dir", default="template_dir")
+    args = parser.parse_args()
+    print(json.dumps(run(args.rounds, args.template_dir), indent=2))
+
+
+if __name__ == "__main__":
+    main()
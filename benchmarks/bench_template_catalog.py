@@ -0,0 +1,170 @@
+"""
+Template catalog build (MemeTemplates.get_emotion_images) over large tables.
+
+Synthetic dialogs / memes_dc / emotions tables of 10k-1M dialog rows are
+served by the local FakeSupabaseClient stand-in. Three builds are compared:
+- legacy: the previous implementation, unbounded `select("*")` of every table,
+  a full pandas merge and an `iterrows()` URL loop;
+- full: paginated, column-projected fetches deduplicated page by page, and
+  vectorized URL building;
+- incremental: a re-sync after 1% new dialog rows, reading only rows changed
+  since the previous sync (the state it merges into keeps every dialog row
+  by primary key).
+Each build is timed on its own, then run again under tracemalloc for the peak
+Python memory it allocated. Template prefetching is disabled.
+
+Run from the repo root:
+    python -m benchmarks.bench_template_catalog --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+from benchmarks.stubs import FakeSupabaseClient, patch_supabase, synthetic_catalog_tables
+
+
+class _NoPrefetch:
+    def prefetch(self, emotion_url_map):
+        return {"summary": {}}
+
+
+def legacy_build(meme_templates):
+    """get_emotion_images as it was before paginated fetches, minus the file write and prefetch."""
+    import pandas as pd
+
+    config = meme_templates.meme_templates_config
+    source = meme_templates.supabase.schema("dc")
+    dialogs = pd.DataFrame(source.table("dialogs").select("*").execute().data)
+    emotions = pd.DataFrame(source.table("emotions").select("*").execute().data)
+    memes = pd.DataFrame(source.table("memes_dc").select("*").execute().data)
+    # The legacy merge needs distinct column names besides the join keys
+    memes = memes.drop(columns=["updated_at"])
+    emotions = emotions.drop(columns=["updated_at"])
+
+    merged = dialogs.merge(memes, on="meme_id").merge(emotions, on="emotion_id")
+    emotion_images = merged[["emotion_label", "image_path"]].dropna().drop_duplicates()
+    emotion_to_urls = defaultdict(list)
+    for _, row in emotion_images.iterrows():
+        filename = os.path.basename(row["image_path"])
+        emotion_to_urls[row["emotion_label"]].append(
+            f"{config.supabase_url}/storage/v1/object/public/{config.bucket_path}/{filename}"
+        )
+    return dict(emotion_to_urls)
+
+
+def measure(build):
+    """(seconds, peak traced MB, result): timed untraced, then re-run under tracemalloc."""
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    build()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1024 / 1024, result
+
+
+def run_size(dialog_rows, memes, emotions, page_size, output_dir):
+    from src.utils.image_templates import MemeTemplates
+
+    tables = synthetic_catalog_tables(dialog_rows, memes, emotions)
+    client = FakeSupabaseClient(tables=tables)
+    undo = patch_supabase(client=client)
+    try:
+        meme_templates = MemeTemplates()
+    finally:
+        undo()
+    config = meme_templates.meme_templates_config
+    config.supabase_url = "http://supabase.local"
+    config.bucket_path = "bucket"
+    config.output_dir = output_dir
+    config.catalog_page_size = page_size
+    state_path = os.path.join(output_dir, config.catalog_state_file)
+
+    results = {}
+    seconds, peak_mb, legacy_map = measure(lambda: legacy_build(meme_templates))
+    results["legacy"] = {"seconds": round(seconds, 3), "peak_mb": round(peak_mb, 1)}
+
+    def full(incremental=False):
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return meme_templates.get_emotion_images(incremental=incremental)
+
+    # Warm-up: lets the stand-in build its ordered views outside the measurement
+    full()
+    requests_before = client.requests
+    seconds, peak_mb, artifact = measure(full)
+    results["full"] = {
+        "seconds": round(seconds, 3), "peak_mb": round(peak_mb, 1),
+        "requests": (client.requests - requests_before) // 2, "frame_mb": round(artifact.frame_bytes / 1024 / 1024, 2),
+    }
+    with open(os.path.join(output_dir, config.json_file), encoding="utf-8") as f:
+        new_map = json.load(f)
+    results["same_catalog_as_legacy"] = (
+        {k: sorted(v) for k, v in new_map.items()} == {k: sorted(v) for k, v in legacy_map.items()}
+    )
+
+    # 1% more dialogs, changed after the last sync
+    changed = max(1, dialog_rows // 100)
+    dialogs = tables["dc.dialogs"]
+    base_id = len(dialogs)
+    new_rows = [
+        {"dialog_id": base_id + i, "meme_id": i % memes, "emotion_id": (i * 7) % len(emotions),
+         "dialog": f"new dialogue {i}", "updated_at": "2025-06-01T00:00:00"}
+        for i in range(changed)
+    ]
+
+    full(incremental=True)
+    with open(state_path, encoding="utf-8") as f:
+        saved_state = f.read()
+    dialogs.extend(new_rows)
+    client._shared["views"].clear()
+
+    def incremental():
+        # Each run starts from the state of the full sync
+        with open(state_path, "w", encoding="utf-8") as f:
+            f.write(saved_state)
+        return meme_templates.get_emotion_images(incremental=True)
+
+    incremental()
+    requests_before = client.requests
+    seconds, peak_mb, artifact = measure(incremental)
+    results["incremental"] = {
+        "changed_rows": changed, "rows_fetched": artifact.rows_fetched, "seconds": round(seconds, 3),
+        "peak_mb": round(peak_mb, 1), "requests": (client.requests - requests_before) // 2,
+    }
+    results["speedup_full_vs_legacy"] = round(results["legacy"]["seconds"] / max(results["full"]["seconds"], 1e-9), 2)
+    results["memory_ratio_full_vs_legacy"] = round(results["full"]["peak_mb"] / max(results["legacy"]["peak_mb"], 1e-9), 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="dialog rows")
+    parser.add_argument("--memes", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from src.entity.config_entity import ConfigEntity
+    from src.utils import template_prefetcher
+
+    previous_prefetcher = template_prefetcher._template_prefetcher
+    template_prefetcher._template_prefetcher = _NoPrefetch()
+    emotions = ConfigEntity().emotion_templates
+    results = {}
+    try:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as output_dir:
+                results[str(size)] = run_size(size, args.memes, emotions, args.page_size, output_dir)
+    finally:
+        template_prefetcher._template_prefetcher = previous_prefetcher
+
+    print(json.dumps({"benchmark": "template_catalog", "params": vars(args), "sizes": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
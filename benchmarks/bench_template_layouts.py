@@ -0,0 +1,115 @@
+"""
+Precomputed per-template caption layouts vs. the classic fixed bands.
+
+Profiles every template in --template-dir into a temporary sidecar (cold run,
+then an incremental re-run where nothing changed), then renders the same
+captions on each template with the classic layout and with its profiled layout
+(sidecar lookup included). Placement quality is the image detail (gradient
+magnitude) under the pixels the captions actually cover, relative to the
+template's mean detail: lower means the text sits on calmer background.
+
+Run from the repo root:
+    python -m benchmarks.bench_template_layouts --rounds 3
+"""
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.stubs import summarize
+
+
+UPPER = "Results vachayi ra mama, ippudu emi cheyali"
+LOWER = "Naa marks choosi calculator kuda navvindi"
+
+
+def detail_map(img):
+    pixels = np.asarray(img.convert("L"), dtype=np.float32)
+    detail = np.zeros_like(pixels)
+    detail[:, 1:] += np.abs(np.diff(pixels, axis=1))
+    detail[1:, :] += np.abs(np.diff(pixels, axis=0))
+    return detail
+
+
+def detail_under_captions(template, rendered, detail):
+    covered = np.abs(
+        np.asarray(rendered, dtype=np.int16) - np.asarray(template, dtype=np.int16)
+    ).max(axis=2) > 32
+    if not covered.any():
+        return 0.0
+    return float(detail[covered].mean() / (detail.mean() + 1e-6))
+
+
+def run(rounds, template_dir, font_path):
+    from src.utils.meme_renderer import draw_meme_text
+    from src.utils.template_layouts import CLASSIC_LAYOUT, TemplateLayoutIndex
+
+    paths = sorted(glob.glob(os.path.join(template_dir, "*.jpg")))
+    if not paths:
+        raise SystemExit(f"No templates found in {template_dir}")
+
+    with tempfile.TemporaryDirectory() as root:
+        index = TemplateLayoutIndex(os.path.join(root, "template_layouts.json"), template_dir, check_interval=0)
+        cold = index.profile_dir()
+        warm = index.profile_dir()
+
+        templates = {}
+        for path in paths:
+            with Image.open(path) as opened:
+                templates[path] = opened.convert("RGB")
+
+        classic_times, profiled_times, classic_detail, profiled_detail = [], [], [], []
+        moved = 0
+        for round_number in range(rounds):
+            for path, template in templates.items():
+                classic_img = template.copy()
+                start = time.perf_counter()
+                draw_meme_text(classic_img, UPPER, LOWER, font_path, CLASSIC_LAYOUT)
+                classic_times.append(time.perf_counter() - start)
+
+                profiled_img = template.copy()
+                start = time.perf_counter()
+                layout = index.get(path)
+                draw_meme_text(profiled_img, UPPER, LOWER, font_path, layout)
+                profiled_times.append(time.perf_counter() - start)
+
+                if round_number == 0:
+                    detail = detail_map(template)
+                    classic_detail.append(detail_under_captions(template, classic_img, detail))
+                    profiled_detail.append(detail_under_captions(template, profiled_img, detail))
+                    moved += layout.upper != CLASSIC_LAYOUT.upper or layout.lower != CLASSIC_LAYOUT.lower
+
+    return {
+        "benchmark": "template_layouts",
+        "params": {"rounds": rounds, "templates": len(paths)},
+        "profile": {
+            "cold_ms": cold["elapsed_ms"],
+            "per_template_ms": round(cold["elapsed_ms"] / max(cold["profiled"], 1), 2),
+            "rerun_unchanged_ms": warm["elapsed_ms"],
+        },
+        "draw_classic": summarize(classic_times),
+        "draw_profiled": summarize(profiled_times),
+        "templates_with_moved_captions": moved,
+        "relative_detail_under_captions": {
+            "classic": round(float(np.mean(classic_detail)), 3),
+            "profiled": round(float(np.mean(profiled_detail)), 3),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--template-dir", default="template_dir")
+    parser.add_argument("--font-path", default="fonts/Noto_Sans_Telugu/NotoSansTelugu-Regular.ttf")
+    args = parser.parse_args()
+    print(json.dumps(run(args.rounds, args.template_dir, args.font_path), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Memory-mapped template pack vs. per-process decoded templates.
+
+Builds a pack from --template-dir, then compares:
+- per-request template load: JPEG decode (cold LRU), LRU hit, and pack
+  (RGB copy unpacked from the mapped pages);
+- memory across --processes worker processes that each load every template,
+  once through the per-process LRU and once through the shared pack.
+  Private memory is what each process adds on its own; PSS splits shared
+  pages between the processes that map them (Linux, /proc/self/smaps_rollup).
+
+Run from the repo root:
+    python -m benchmarks.bench_template_pack --processes 4 --max-dimension 0 1024
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.stubs import summarize
+
+
+def memory_kb():
+    """{'pss': ..., 'private': ...} in kB for this process, or {} where smaps_rollup is unavailable."""
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return {}
+
+    def kb(name):
+        return int(fields.get(name, "0 kB").split()[0])
+
+    return {"pss": kb("Pss"), "private": kb("Private_Clean") + kb("Private_Dirty")}
+
+
+def _load_all(paths, pack_path, max_dimension, ready, done):
+    from src.utils.template_cache import TemplateImageCache
+    from src.utils.template_pack import TemplatePack
+
+    cache = TemplateImageCache(max_bytes=4 << 30, pack=TemplatePack(pack_path, 0) if pack_path else None)
+    before = memory_kb()
+    for path in paths:
+        cache.get(path, max_dimension)
+    after = memory_kb()
+    ready.put({
+        "private_kb": after.get("private", 0) - before.get("private", 0),
+        "pss_kb": after.get("pss", 0) - before.get("pss", 0),
+    })
+    # Stay alive until every worker has measured, so shared pages stay shared
+    done.wait()
+
+
+def processes_memory(paths, pack_path, max_dimension, processes):
+    context = multiprocessing.get_context("spawn")
+    ready, done = context.Queue(), context.Event()
+    workers = [
+        context.Process(target=_load_all, args=(paths, pack_path, max_dimension, ready, done))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    results = [ready.get(timeout=300) for _ in workers]
+    done.set()
+    for worker in workers:
+        worker.join()
+    return {
+        "private_mb_per_process": round(sum(r["private_kb"] for r in results) / len(results) / 1024, 1),
+        "total_private_mb": round(sum(r["private_kb"] for r in results) / 1024, 1),
+        "total_pss_mb": round(sum(r["pss_kb"] for r in results) / 1024, 1),
+    }
+
+
+def load_latency(paths, pack_path, max_dimension, rounds):
+    from src.utils.template_cache import TemplateImageCache
+    from src.utils.template_pack import TemplatePack
+
+    decode, lru, packed = [], [], []
+    for _ in range(rounds):
+        for path in paths:
+            cold = TemplateImageCache(max_bytes=4 << 30)
+            start = time.perf_counter()
+            cold.get(path, max_dimension)
+            decode.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            cold.get(path, max_dimension)
+            lru.append(time.perf_counter() - start)
+
+    pack_cache = TemplateImageCache(max_bytes=4 << 30, pack=TemplatePack(pack_path, 0))
+    for _ in range(rounds):
+        for path in paths:
+            start = time.perf_counter()
+            pack_cache.get(path, max_dimension)
+            packed.append(time.perf_counter() - start)
+    assert pack_cache.pack_hits == len(packed), "pack did not serve every template"
+    return {"jpeg_decode": summarize(decode), "lru_hit": summarize(lru), "pack": summarize(packed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--template-dir", default="template_dir")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--max-dimension", type=int, nargs="+", default=[0, 1024])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    from src.utils.template_pack import build_template_pack
+
+    paths = sorted(glob.glob(os.path.join(args.template_dir, "*.jpg")))
+    if not paths:
+        raise SystemExit(f"No templates found in {args.template_dir}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        for max_dimension in args.max_dimension:
+            pack_path = os.path.join(root, f"templates_{max_dimension}.pack")
+            build = build_template_pack(args.template_dir, pack_path, max_dimension, force=True)
+            results[str(max_dimension)] = {
+                "pack": {"mb": round(build["bytes"] / 1024 / 1024, 1), "build_ms": build["elapsed_ms"]},
+                "load_latency": load_latency(paths, pack_path, max_dimension, args.rounds),
+                "memory_decoded_per_process": processes_memory(paths, None, max_dimension, args.processes),
+                "memory_shared_pack": processes_memory(paths, pack_path, max_dimension, args.processes),
+            }
+
+    print(json.dumps({
+        "benchmark": "template_pack",
+        "params": {**vars(args), "templates": len(paths)},
+        "max_dimension": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
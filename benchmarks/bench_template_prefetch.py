@@ -0,0 +1,74 @@
+"""
+Bulk template prefetch against a local HTTP stand-in for Supabase storage.
+
+Each worker count downloads every shipped template into a fresh directory,
+then runs again to show the ETag-based skip path.
+
+Run from the repo root:
+    python -m benchmarks.bench_template_prefetch --latency-ms 50 --workers 1 4 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.local_template_server import serve_directory
+
+
+def run(template_dir, latency_ms, worker_counts):
+    from src.utils.template_prefetcher import TemplatePrefetcher
+
+    names = sorted(os.listdir(template_dir))
+    results = []
+    with serve_directory(template_dir, latency=latency_ms / 1000) as base_url:
+        emotion_url_map = {"benchmark": [f"{base_url}/{name}" for name in names]}
+
+        for workers in worker_counts:
+            with tempfile.TemporaryDirectory() as target_dir:
+                prefetcher = TemplatePrefetcher(
+                    template_dir=target_dir,
+                    manifest_path=os.path.join(target_dir, "manifest.json"),
+                    max_workers=workers,
+                    timeout=10,
+                )
+                start = time.perf_counter()
+                cold = prefetcher.prefetch(emotion_url_map)
+                cold_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                warm = prefetcher.prefetch(emotion_url_map)
+                warm_seconds = time.perf_counter() - start
+
+                mismatched = [
+                    name for name in names
+                    if os.path.getsize(os.path.join(target_dir, name)) != os.path.getsize(os.path.join(template_dir, name))
+                ]
+
+            results.append({
+                "workers": workers,
+                "cold_seconds": round(cold_seconds, 3),
+                "cold_summary": cold["summary"],
+                "warm_seconds": round(warm_seconds, 3),
+                "warm_summary": warm["summary"],
+                "size_mismatches": mismatched,
+            })
+
+    return {
+        "benchmark": "template_prefetch",
+        "params": {"templates": len(names), "latency_ms": latency_ms},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--template-dir", default="template_dir")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="per-request server latency")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+    print(json.dumps(run(args.template_dir, args.latency_ms, args.workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Single-pass stroked captions vs. the original 8-offset outline loop.
+
+Renders every shipped template with both stroke implementations on the same
+(legacy) layout, reports per-render timings, and checks that the output stays
+visually equivalent. Exits non-zero if the pixel difference exceeds the
+thresholds, so it doubles as a regression check for draw_text_block. The full
+draw_meme_text (measured wrapping and font fitting) is timed as well.
+
+Run from the repo root:
+    python -m benchmarks.bench_text_rendering --rounds 2
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import textwrap
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from benchmarks.stubs import summarize
+
+
+UPPER = "Results vachayi ra mama, ippudu emi cheyali"
+LOWER = "Naa marks choosi calculator kuda navvindi"
+
+
+def legacy_layout(img, upper_text, lower_text, font_path):
+    """Original font sizing and character-estimate wrapping: [(lines, font, font_size, band_top)]."""
+    width, height = img.size
+    upper_font_size = min(int(height * 0.06), int(1000 / max(len(upper_text) / 2, 1)))
+    lower_font_size = min(int(height * 0.06), int(1000 / max(len(lower_text) / 2, 1)))
+    upper_font = ImageFont.truetype(font_path, size=upper_font_size)
+    lower_font = ImageFont.truetype(font_path, size=lower_font_size)
+
+    chars_per_line = int(width * 0.8 / (upper_font_size * 0.6))
+    return (
+        (textwrap.wrap(upper_text, width=chars_per_line), upper_font, upper_font_size, 0),
+        (textwrap.wrap(lower_text, width=chars_per_line), lower_font, lower_font_size, height * 0.6),
+    )
+
+
+def legacy_draw_meme_text(img, upper_text, lower_text, font_path):
+    """The pre-text_layout implementation, kept verbatim as the visual reference."""
+    width, height = img.size
+    draw = ImageDraw.Draw(img)
+    for lines, font, font_size, top in legacy_layout(img, upper_text, lower_text, font_path):
+        y_position = top + (height * 0.4 - len(lines) * font.size * 1.2) / 2
+        for line in lines:
+            bbox = draw.textbbox((0, 0), line, font=font)
+            position = ((width - (bbox[2] - bbox[0])) / 2, y_position)
+            outline_thickness = max(2, int(font_size / 10))
+            for offset_x in range(-outline_thickness, outline_thickness + 1, outline_thickness):
+                for offset_y in range(-outline_thickness, outline_thickness + 1, outline_thickness):
+                    if offset_x == 0 and offset_y == 0:
+                        continue
+                    draw.text((position[0] + offset_x, position[1] + offset_y), line, font=font, fill="black")
+            draw.text(position, line, font=font, fill="white")
+            y_position += font.size * 1.2
+    return img
+
+
+def stroked_draw_meme_text(img, upper_text, lower_text, font_path):
+    """Legacy layout drawn with the single-pass draw_text_block."""
+    from src.utils.text_layout import draw_text_block, outline_width
+
+    width, height = img.size
+    draw = ImageDraw.Draw(img)
+    for lines, font, font_size, top in legacy_layout(img, upper_text, lower_text, font_path):
+        draw_text_block(draw, lines, font, width, top, height * 0.4, stroke_width=outline_width(font_size))
+    return img
+
+
+def pixel_diff(a, b):
+    diff = np.abs(np.asarray(a, dtype=np.int16) - np.asarray(b, dtype=np.int16)).max(axis=2)
+    return {
+        "mean_abs_diff": float(diff.mean()),
+        "changed_fraction": float((diff > 64).mean()),
+    }
+
+
+def run(rounds, template_dir, font_path):
+    from src.utils.meme_renderer import draw_meme_text
+
+    paths = sorted(glob.glob(os.path.join(template_dir, "*.jpg")))
+    if not paths:
+        raise SystemExit(f"No templates found in {template_dir}")
+    templates = {}
+    for path in paths:
+        with Image.open(path) as opened:
+            templates[path] = opened.convert("RGB")
+
+    legacy_times, current_times, full_times, diffs = [], [], [], []
+    for _ in range(rounds):
+        for path, template in templates.items():
+            legacy_img = template.copy()
+            start = time.perf_counter()
+            legacy_draw_meme_text(legacy_img, UPPER, LOWER, font_path)
+            legacy_times.append(time.perf_counter() - start)
+
+            current_img = template.copy()
+            start = time.perf_counter()
+            stroked_draw_meme_text(current_img, UPPER, LOWER, font_path)
+            current_times.append(time.perf_counter() - start)
+
+            diffs.append(pixel_diff(legacy_img, current_img))
+
+            full_img = template.copy()
+            start = time.perf_counter()
+            draw_meme_text(full_img, UPPER, LOWER, font_path)
+            full_times.append(time.perf_counter() - start)
+
+    return {
+        "benchmark": "text_rendering",
+        "params": {"rounds": rounds, "templates": len(paths)},
+        "legacy_outline_loop": summarize(legacy_times),
+        "single_pass_stroke": summarize(current_times),
+        "draw_meme_text": summarize(full_times),
+        "max_mean_abs_diff": round(max(d["mean_abs_diff"] for d in diffs), 4),
+        "max_changed_fraction": round(max(d["changed_fraction"] for d in diffs), 5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--template-dir", default="template_dir")
+    parser.add_argument("--font-path", default="fonts/Noto_Sans_Telugu/NotoSansTelugu-Regular.ttf")
+    parser.add_argument("--max-mean-diff", type=float, default=1.0,
+                        help="fail if the mean per-pixel difference (0-255) exceeds this")
+    parser.add_argument("--max-changed-fraction", type=float, default=0.01,
+                        help="fail if more than this fraction of pixels changes noticeably")
+    args = parser.parse_args()
+
+    result = run(args.rounds, args.template_dir, args.font_path)
+    result["passed"] = (result["max_mean_abs_diff"] <= args.max_mean_diff
+                        and result["max_changed_fraction"] <= args.max_changed_fraction)
+    print(json.dumps(result, indent=2))
+    if not result["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
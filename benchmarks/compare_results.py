@@ -0,0 +1,89 @@
+"""
+Compare two benchmark suite results (from benchmarks.run_suite --output).
+
+Every latency (`*_ms`) and throughput (`throughput_rps`) value present in
+both files is compared. A change beyond --threshold percent in a gated
+metric (--metrics, default mean_ms, p50_ms and throughput_rps) counts as
+a regression or an improvement; tail percentiles are reported but not
+gated, since they are noisy on short runs. Exits 1 when anything regressed.
+
+Run from the repo root:
+    python -m benchmarks.compare_results benchmarks/results/base.json benchmarks/results/new.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def flatten(node, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, numeric leaves only."""
+    values = {}
+    if isinstance(node, dict):
+        for key, value in node.items():
+            values.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        values[prefix] = node
+    return values
+
+
+def compare(base: dict, new: dict, threshold: float, gated_metrics) -> dict:
+    base_values, new_values = flatten(base["stages"]), flatten(new["stages"])
+    rows, regressions, improvements = [], [], []
+    for path in sorted(base_values.keys() & new_values.keys()):
+        metric = path.rsplit(".", 1)[-1]
+        if not (metric.endswith("_ms") or metric in HIGHER_IS_BETTER):
+            continue
+        before, after = base_values[path], new_values[path]
+        if not before:
+            continue
+        change = (after - before) / before * 100
+        worse = change < -threshold if metric in HIGHER_IS_BETTER else change > threshold
+        better = change > threshold if metric in HIGHER_IS_BETTER else change < -threshold
+        row = {"metric": path, "base": before, "new": after, "change_pct": round(change, 1)}
+        rows.append(row)
+        if metric in gated_metrics:
+            if worse:
+                regressions.append(row)
+            elif better:
+                improvements.append(row)
+
+    return {
+        "base": {"commit": base.get("git", {}).get("commit"), "params": base.get("params")},
+        "new": {"commit": new.get("git", {}).get("commit"), "params": new.get("params")},
+        "params_match": base.get("params") == new.get("params"),
+        "threshold_pct": threshold,
+        "compared": len(rows),
+        "regressions": regressions,
+        "improvements": improvements,
+        "only_in_base": sorted(base_values.keys() - new_values.keys()),
+        "only_in_new": sorted(new_values.keys() - base_values.keys()),
+        "rows": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change that counts")
+    parser.add_argument("--metrics", nargs="+", default=["mean_ms", "p50_ms", "throughput_rps"])
+    parser.add_argument("--all", action="store_true", help="include every compared value in the output")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    result = compare(base, new, args.threshold, set(args.metrics))
+    if not args.all:
+        del result["rows"]
+    print(json.dumps(result, indent=2))
+    return 1 if result["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
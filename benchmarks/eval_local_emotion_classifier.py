@@ -0,0 +1,103 @@
+"""
+Offline agreement between the local emotion classifier and LLM labels.
+
+Takes a CSV of topics with the emotion Gemini assigned (columns detected like
+the trainer: text/topic/topic_name and emotion/llm_emotion/label), or labels
+the topics with Gemini first (--label-with-gemini, needs GEMINI credentials;
+--save-labels keeps them for later runs). For each confidence threshold it
+reports how many topics would be answered locally (coverage), how often those
+answers agree with the LLM, and how many model calls that saves.
+
+Run from the repo root:
+    python -m benchmarks.eval_local_emotion_classifier --csv llm_labels.csv
+    python -m benchmarks.eval_local_emotion_classifier --csv topics.csv --label-with-gemini --save-labels llm_labels.csv
+"""
+import argparse
+import json
+import time
+
+import pandas as pd
+
+
+def label_with_gemini(texts):
+    from src.components.emotion_analyzer import EmotionAnalyzer
+
+    analyzer = EmotionAnalyzer()
+    return [analyzer._analyze_emotion(text).emotion_name for text in texts]
+
+
+def evaluate(texts, llm_labels, classifier, thresholds):
+    predictions, latencies = [], []
+    for text in texts:
+        start = time.perf_counter()
+        predictions.append(classifier.predict(text))
+        latencies.append(time.perf_counter() - start)
+
+    by_threshold = {}
+    for threshold in thresholds:
+        covered = [(p, label) for p, label in zip(predictions, llm_labels) if p.confidence >= threshold]
+        agreed = sum(p.emotion_name == label for p, label in covered)
+        by_threshold[str(threshold)] = {
+            "coverage": round(len(covered) / len(texts), 4),
+            "agreement_on_covered": round(agreed / len(covered), 4) if covered else None,
+            "llm_calls_saved": len(covered),
+            "disagreements": len(covered) - agreed,
+        }
+
+    confusion = {}
+    for p, label in zip(predictions, llm_labels):
+        if p.confidence >= classifier.threshold:
+            row = confusion.setdefault(label, {})
+            row[p.emotion_name] = row.get(p.emotion_name, 0) + 1
+
+    histogram = [0] * 10
+    for p in predictions:
+        histogram[min(int(p.confidence * 10), 9)] += 1
+
+    return {
+        "topics": len(texts),
+        "agreement_all": round(sum(p.emotion_name == label for p, label in zip(predictions, llm_labels)) / len(texts), 4),
+        "mean_local_latency_us": round(sum(latencies) / len(latencies) * 1e6, 1),
+        "confidence_histogram": {f"{i / 10:.1f}-{(i + 1) / 10:.1f}": n for i, n in enumerate(histogram)},
+        "thresholds": by_threshold,
+        f"confusion_at_{classifier.threshold}": confusion,
+    }
+
+
+def main():
+    from src.components.local_emotion_classifier import LocalEmotionClassifier
+    from src.entity.config_entity import ConfigEntity, LocalEmotionClassifierConfigEntity
+    from src.pipeline.train_emotion_classifier import pick_column, TEXT_COLUMNS, LABEL_COLUMNS
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--csv", required=True)
+    parser.add_argument("--text-column")
+    parser.add_argument("--label-column")
+    parser.add_argument("--label-with-gemini", action="store_true", help="ignore CSV labels and ask Gemini")
+    parser.add_argument("--save-labels", help="write the Gemini labels to this CSV")
+    parser.add_argument("--model", help="trained model file (default: artifacts/emotion_model.npz if present)")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.6, 0.7, 0.8, 0.9, 0.95])
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    texts = df[pick_column(df, TEXT_COLUMNS, args.text_column)].astype(str).tolist()
+    if args.label_with_gemini:
+        llm_labels = label_with_gemini(texts)
+        if args.save_labels:
+            pd.DataFrame({"text": texts, "llm_emotion": llm_labels}).to_csv(args.save_labels, index=False)
+    else:
+        column = pick_column(df, LABEL_COLUMNS, args.label_column)
+        llm_labels = df[column].astype(str).str.strip().str.lower().tolist()
+
+    config = LocalEmotionClassifierConfigEntity(config_entity=ConfigEntity())
+    if args.model:
+        config.model_path = args.model
+    classifier = LocalEmotionClassifier(config)
+
+    result = evaluate(texts, llm_labels, classifier, args.thresholds)
+    result["model_loaded"] = classifier.model is not None
+    print(json.dumps({"benchmark": "local_emotion_classifier", **result}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
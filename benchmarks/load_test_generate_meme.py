@@ -0,0 +1,118 @@
+"""
+In-process load test of POST /generate-meme/ through the ASGI app.
+
+Compares the threadpool (sync) request path with the async pipeline using a
+stub model with a fixed per-call delay and a small local template, so the
+numbers reflect request handling rather than Gemini or the network.
+
+Run from the repo root:
+    python -m benchmarks.load_test_generate_meme --requests 200 --concurrency 100 --call-ms 300
+    python -m benchmarks.load_test_generate_meme --render-queue-depth 8   # observe 503 load shedding
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("PREFETCH_ON_STARTUP", "false")
+# The lifespan returns only once warm, so the runner is there as soon as it is entered
+os.environ.setdefault("STARTUP_WARMUP_BACKGROUND", "false")
+
+from benchmarks.stubs import StubGenerativeModel, summarize
+
+
+def make_template(directory, size=240):
+    from PIL import Image
+
+    path = os.path.join(directory, "load_test_template.jpg")
+    Image.new("RGB", (size, size), color=(90, 120, 160)).save(path, quality=90)
+    return path
+
+
+def install_stubs(components, template_path):
+    """Point the shared components at a fixed local template so no downloads happen."""
+    async def select_template_async(emotion, http_client):
+        return template_path
+
+    components.memes_generator.select_template = lambda emotion: template_path
+    components.memes_generator.select_template_async = select_template_async
+
+
+async def drive(app, total_requests, concurrency, path="/generate-meme/", payload=None, headers=None):
+    """Fire `total_requests` POSTs with at most `concurrency` in flight; returns latency/throughput stats."""
+    import httpx
+
+    payload = payload or {"topic_name": "exam failed"}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                 timeout=None) as client:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(path, json=payload, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "latency": summarize(latencies),
+        "statuses": statuses,
+    }
+
+
+async def run(total_requests, concurrency, call_ms, template_size, render_queue_depth):
+    from app import app
+    from src.pipeline.component_registry import component_registry
+
+    model = StubGenerativeModel(call_delay=call_ms / 1000)
+    component_registry._model_factory = lambda: model
+    component_registry.reset()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        template_path = make_template(tmp, template_size)
+        async with app.router.lifespan_context(app):
+            components = component_registry.get()
+            install_stubs(components, template_path)
+            # Default: admit the whole concurrency level so both modes do the same work
+            app.state.pipeline_runner.render_executor.max_queue = render_queue_depth
+
+            for mode, use_async in (("threadpool", False), ("async", True)):
+                components.pipeline_config.async_pipeline = use_async
+                results[mode] = await drive(app, total_requests, concurrency)
+
+    return {
+        "benchmark": "load_test_generate_meme",
+        "params": {"requests": total_requests, "concurrency": concurrency, "call_ms": call_ms,
+                   "template_size": template_size, "render_queue_depth": render_queue_depth},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--call-ms", type=float, default=300.0, help="simulated latency of each model call")
+    parser.add_argument("--template-size", type=int, default=240, help="edge length of the square test template")
+    parser.add_argument("--render-queue-depth", type=int, default=None,
+                        help="render backlog allowed before 503s (default: the concurrency level)")
+    args = parser.parse_args()
+    queue_depth = args.concurrency if args.render_queue_depth is None else args.render_queue_depth
+    result = asyncio.run(run(args.requests, args.concurrency, args.call_ms, args.template_size, queue_depth))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Local HTTP stand-in for the Supabase storage bucket.
+
+Serves files from a directory with Content-Length and ETag headers (and 304s
+for matching If-None-Match), using the raw request path so URL-encoded names
+like `ee%20nagaraniki%20emaindhi_58.jpg` map to the files as stored.
+"""
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from contextlib import contextmanager
+import functools
+import hashlib
+import os
+import threading
+import time
+
+
+class TemplateRequestHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+    counter = None
+    counter_lock = threading.Lock()
+
+    def translate_path(self, path):
+        name = os.path.basename(path.split("?", 1)[0])
+        return os.path.join(self.directory, name)
+
+    def _etag(self, file_path):
+        stat = os.stat(file_path)
+        return '"' + hashlib.md5(f"{stat.st_size}-{stat.st_mtime_ns}".encode()).hexdigest() + '"'
+
+    def send_head(self):
+        if self.counter is not None:
+            with self.counter_lock:
+                self.counter[self.command] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        file_path = self.translate_path(self.path)
+        if not os.path.isfile(file_path):
+            self.send_error(404, "File not found")
+            return None
+
+        etag = self._etag(file_path)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return None
+
+        f = open(file_path, "rb")
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(file_path))
+        self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        return f
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_directory(directory, latency=0.0, counter=None):
+    """
+    Serve `directory` on an ephemeral localhost port; yields the base URL.
+    If a `collections.Counter` is given, requests are counted per HTTP method.
+    """
+    handler = type("Handler", (TemplateRequestHandler,), {"latency": latency, "counter": counter})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=directory))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,324 @@
+"""
+Reproducible, fully offline benchmark suite for the meme pipeline.
+
+Every external service is replaced:
+- Gemini by the stub model, with a fixed per-call latency.
+- The Supabase tables by JSON files (FakeSupabaseClient).
+- The storage bucket by a local HTTP server over the shipped template_dir.
+
+Stages:
+- fetch_templates: MemeTemplates.get_emotion_images (table reads, merge, prefetch), cold and re-run.
+- select_template: cold (downloads from the local bucket) vs. warm (already on disk).
+- add_text_to_image: by template size x caption length; draw only, and with the PNG encode.
+- png_encode: by template size.
+- end_to_end: POST /generate-meme/ through the ASGI app at each concurrency level.
+
+The output is one JSON document tagged with the git commit, environment and
+parameters. Compare two runs with `python -m benchmarks.compare_results`.
+
+Run from the repo root:
+    python -m benchmarks.run_suite --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.run_suite --quick
+"""
+from contextlib import contextmanager
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("PREFETCH_ON_STARTUP", "false")
+# The lifespan returns only once warm, so the runner is there as soon as it is entered
+os.environ.setdefault("STARTUP_WARMUP_BACKGROUND", "false")
+os.environ.setdefault("MEME_CACHE_MODE", "off")
+
+from benchmarks.local_template_server import serve_directory
+from benchmarks.load_test_generate_meme import drive
+from benchmarks.stubs import (
+    StubGenerativeModel, patch_genai, patch_supabase, write_supabase_tables, summarize,
+)
+
+
+CAPTIONS = {
+    "short": ("Exam ayipoyindi", "Result raledu"),
+    "medium": ("Results vachayi ra mama", "Naa marks choosi calculator kuda navvindi"),
+    "long": (
+        "Monday morning 9 ki meeting ani cheppi boss 11 ki vachadu, adi kuda coffee tho",
+        "Nenu matram 8:55 ki vachi laptop open chesi, wifi password adigi, meeting room vethukuntunna",
+    ),
+}
+TEMPLATE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+class OfflineWorkspace:
+    """
+    Temporary directory holding fake Supabase tables, with the shipped
+    templates served over local HTTP as the storage bucket. Template
+    indexes and prefetchers created here never touch template_dir/ or
+    artifacts/.
+    """
+
+    def __init__(self, root, base_url, template_names):
+        self.root = root
+        self.base_url = base_url
+        self.template_names = template_names
+        self.json_path = os.path.join(root, "emotion_image_urls.json")
+        self._dirs = 0
+
+    def fresh_template_dir(self):
+        """New empty template dir, installed as the process-wide prefetcher's target."""
+        from src.utils import template_prefetcher
+        from src.utils.template_prefetcher import TemplatePrefetcher
+
+        self._dirs += 1
+        template_dir = os.path.join(self.root, f"template_dir_{self._dirs}")
+        os.makedirs(template_dir)
+        template_prefetcher._template_prefetcher = TemplatePrefetcher(
+            template_dir=template_dir,
+            manifest_path=os.path.join(template_dir, "manifest.json"),
+            max_workers=8,
+            timeout=10,
+        )
+        return template_dir
+
+    def fetch_templates(self, template_dir):
+        """MemeTemplates.get_emotion_images against the fake tables, writing into the workspace."""
+        from src.utils.image_templates import MemeTemplates
+
+        meme_templates = MemeTemplates()
+        config = meme_templates.meme_templates_config
+        config.supabase_url = self.base_url
+        config.bucket_path = "bucket"
+        config.output_dir = self.root
+        config.template_dir = template_dir
+        meme_templates.get_emotion_images()
+
+    def index(self, template_dir):
+        from src.utils.template_index import TemplateIndex
+
+        return TemplateIndex(json_path=self.json_path, template_dir=template_dir, check_interval=0)
+
+
+@contextmanager
+def offline_workspace(template_source, latency_ms):
+    """Yield an OfflineWorkspace; restores the patched Supabase client and prefetcher on exit."""
+    from src.entity.config_entity import ConfigEntity
+    from src.utils import template_prefetcher
+
+    names = sorted(n for n in os.listdir(template_source) if n.lower().endswith(TEMPLATE_EXTENSIONS))
+    if not names:
+        raise SystemExit(f"No templates found in {template_source}")
+    previous_prefetcher = template_prefetcher._template_prefetcher
+    with tempfile.TemporaryDirectory() as root, serve_directory(template_source, latency_ms / 1000) as base_url:
+        tables_dir = os.path.join(root, "tables")
+        write_supabase_tables(tables_dir, names, ConfigEntity().emotion_templates)
+        undo = patch_supabase(tables_dir)
+        try:
+            yield OfflineWorkspace(root, base_url, names)
+        finally:
+            undo()
+            template_prefetcher._template_prefetcher = previous_prefetcher
+
+
+def stage_fetch_templates(workspace, rounds):
+    cold, rerun = [], []
+    for _ in range(rounds):
+        template_dir = workspace.fresh_template_dir()
+        start = time.perf_counter()
+        workspace.fetch_templates(template_dir)
+        cold.append(time.perf_counter() - start)
+
+        # Same directory again: every template is already there (ETag revalidation only)
+        start = time.perf_counter()
+        workspace.fetch_templates(template_dir)
+        rerun.append(time.perf_counter() - start)
+    return {"templates": len(workspace.template_names), "cold": summarize(cold), "rerun": summarize(rerun)}
+
+
+def stage_select_template(workspace, calls, seed):
+    from src.components.memes_generator import MemesGenerator
+    from src.entity.config_entity import ConfigEntity
+
+    random.seed(seed)
+    generator = MemesGenerator(model=StubGenerativeModel())
+    template_dir = workspace.fresh_template_dir()
+    generator.template_index = workspace.index(template_dir)
+    emotions = ConfigEntity().emotion_templates
+
+    cold, warm = [], []
+    for i in range(calls):
+        before = len(os.listdir(template_dir))
+        start = time.perf_counter()
+        generator.select_template(emotions[i % len(emotions)])
+        elapsed = time.perf_counter() - start
+        (cold if len(os.listdir(template_dir)) > before else warm).append(elapsed)
+    return {"cold_download": summarize(cold), "warm_local": summarize(warm)}
+
+
+def scaled_templates(source_path, sizes, directory):
+    """The source template resized so its longest edge is each of `sizes`."""
+    from PIL import Image
+
+    paths = {}
+    with Image.open(source_path) as source:
+        source = source.convert("RGB")
+        for size in sizes:
+            scale = size / max(source.size)
+            resized = source.resize((max(1, round(source.width * scale)), max(1, round(source.height * scale))))
+            path = os.path.join(directory, f"template_{size}.jpg")
+            resized.save(path, quality=90)
+            paths[size] = path
+    return paths
+
+
+def stage_rendering(template_source, template_name, sizes, rounds):
+    from src.components.memes_generator import MemesGenerator
+    from src.utils.meme_renderer import draw_meme_text
+    from src.utils.image_encoder import EncodingOptions, encode_image
+    from src.utils.template_cache import template_image_cache
+
+    generator = MemesGenerator(model=StubGenerativeModel())
+    font_path = generator.meme_templates_config.font_path
+    png = EncodingOptions.from_config().with_format("png")
+
+    draw, add_text, encode = {}, {}, {}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = scaled_templates(os.path.join(template_source, template_name), sizes, directory)
+        for size, path in paths.items():
+            template_image_cache.get(path)  # decode once; the stages below measure cached-template work
+            for length, (upper, lower) in CAPTIONS.items():
+                key = f"{size}px_{length}"
+                draw_samples, add_text_samples = [], []
+                for _ in range(rounds):
+                    image = template_image_cache.get(path)
+                    start = time.perf_counter()
+                    draw_meme_text(image, upper, lower, font_path)
+                    draw_samples.append(time.perf_counter() - start)
+
+                    start = time.perf_counter()
+                    generator.add_text_to_image(path, upper, lower)
+                    add_text_samples.append(time.perf_counter() - start)
+                draw[key] = summarize(draw_samples)
+                add_text[key] = summarize(add_text_samples)
+
+            image = template_image_cache.get(path)
+            draw_meme_text(image, *CAPTIONS["medium"], font_path)
+            samples, byte_size = [], 0
+            for _ in range(rounds):
+                start = time.perf_counter()
+                byte_size = encode_image(image, png).byte_size
+                samples.append(time.perf_counter() - start)
+            encode[f"{size}px"] = {**summarize(samples), "bytes": byte_size}
+
+    return {"draw_text": draw, "add_text_to_image": add_text, "png_encode": encode}
+
+
+async def stage_end_to_end(workspace, concurrency_levels, requests, call_ms, pipelines):
+    from app import app
+    from src.pipeline.component_registry import component_registry
+
+    model = StubGenerativeModel(call_delay=call_ms / 1000)
+    component_registry._model_factory = lambda: model
+    component_registry.reset()
+
+    template_dir = workspace.fresh_template_dir()
+    workspace.fetch_templates(template_dir)
+    results = {}
+    async with app.router.lifespan_context(app):
+        components = component_registry.get()
+        components.memes_generator.template_index = workspace.index(template_dir)
+        # Admit every request so each level measures queueing, not rejections
+        app.state.pipeline_runner.render_executor.max_queue = max(concurrency_levels)
+
+        for pipeline in pipelines:
+            components.pipeline_config.async_pipeline = pipeline == "async"
+            for concurrency in concurrency_levels:
+                model.calls = 0
+                result = await drive(app, max(requests, concurrency), concurrency)
+                result["model_calls"] = model.calls
+                results[f"{pipeline}_c{concurrency}"] = result
+    return results
+
+
+def git_revision():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def environment():
+    import PIL
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pillow": PIL.__version__,
+        "env": {name: os.environ.get(name) for name in (
+            "ASYNC_PIPELINE", "RENDER_BACKEND", "RENDER_WORKERS", "MEME_CACHE_MODE", "LOCAL_EMOTION_CLASSIFIER",
+            "FUSED_GENERATION", "OUTPUT_MAX_DIMENSION",
+        )},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--template-dir", default="template_dir", help="templates served as the fake bucket")
+    parser.add_argument("--latency-ms", type=float, default=20, help="local bucket latency per request")
+    parser.add_argument("--call-ms", type=float, default=300, help="stub model latency per call")
+    parser.add_argument("--rounds", type=int, default=5, help="repetitions of each rendering measurement")
+    parser.add_argument("--select-calls", type=int, default=60)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[320, 640, 1280, 1920])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--pipelines", nargs="+", choices=("async", "threadpool"), default=["async", "threadpool"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="small smoke-test sizes")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.rounds, args.select_calls, args.requests = 2, 12, 8
+        args.sizes, args.concurrency, args.pipelines = [320, 960], [1, 8], ["async"]
+
+    patch_genai()
+    started = time.perf_counter()
+    stages = {}
+    with offline_workspace(args.template_dir, args.latency_ms) as workspace:
+        stages["fetch_templates"] = stage_fetch_templates(workspace, max(1, args.rounds // 2))
+        stages["select_template"] = stage_select_template(workspace, args.select_calls, args.seed)
+        stages.update(stage_rendering(args.template_dir, workspace.template_names[0], args.sizes, args.rounds))
+        random.seed(args.seed)
+        stages["end_to_end"] = asyncio.run(stage_end_to_end(
+            workspace, args.concurrency, args.requests, args.call_ms, args.pipelines
+        ))
+
+    result = {
+        "suite": "meme_pipeline",
+        "schema_version": 1,
+        "git": git_revision(),
+        "environment": environment(),
+        "params": {name: value for name, value in vars(args).items() if name != "output"},
+        "duration_seconds": round(time.perf_counter() - started, 1),
+        "stages": stages,
+    }
+    text = json.dumps(result, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
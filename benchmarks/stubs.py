@@ -0,0 +1,326 @@
+"""
+Offline stand-ins for external services used by the benchmarks.
+
+Nothing here talks to the network: the stub model answers from canned text
+after an optional artificial delay, and FakeSupabaseClient reads its tables
+from JSON files, so results only depend on our own code.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+
+DEFAULT_DIALOGUES = "Results vachayi ra mama\nNaa marks choosi calculator kuda navvindi"
+DEFAULT_FUSED = (
+    '{"emotion": "sad", "upper": "Results vachayi ra mama", '
+    '"lower": "Naa marks choosi calculator kuda navvindi"}'
+)
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubAsyncStream:
+    """Async iterable of text chunks, like the SDK's response for `stream=True`."""
+
+    def __init__(self, text, chunk_delay=0.0, chunk_chars=12):
+        self.chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+        self.chunk_delay = chunk_delay
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield StubResponse(chunk)
+
+
+class StubGenerativeModel:
+    """Mimics the parts of `genai.GenerativeModel` the pipeline uses."""
+
+    def __init__(self, model_name=None, call_delay=0.0, init_delay=0.0, emotion="sad",
+                 dialogues=DEFAULT_DIALOGUES, fused=DEFAULT_FUSED, **kwargs):
+        self.model_name = model_name
+        self.call_delay = call_delay
+        self.emotion = emotion
+        self.dialogues = dialogues
+        self.fused = fused
+        self.calls = 0
+        if init_delay:
+            # Stands in for client/channel setup the real SDK does per configure()
+            time.sleep(init_delay)
+
+    def respond(self, prompt):
+        if "Return ONLY the emotion" in prompt:
+            return self.emotion
+        if "Respond with ONLY a JSON object" in prompt:
+            return self.fused
+        if "Respond with ONLY a JSON array" in prompt:
+            return json.dumps([self.emotion] * len(re.findall(r"^\d+\. ", prompt, flags=re.MULTILINE)))
+        return self.dialogues
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        if self.call_delay:
+            time.sleep(self.call_delay)
+        return StubResponse(self.respond(prompt))
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        if stream:
+            # First chunk after a quarter of the call latency, the rest spread over the remainder
+            text = self.respond(prompt)
+            if self.call_delay:
+                await asyncio.sleep(self.call_delay / 4)
+            chunk_count = max(1, -(-len(text) // 12))
+            return StubAsyncStream(text, chunk_delay=self.call_delay * 3 / 4 / chunk_count)
+        if self.call_delay:
+            await asyncio.sleep(self.call_delay)
+        return StubResponse(self.respond(prompt))
+
+
+class FaultyGenerativeModel(StubGenerativeModel):
+    """
+    Stub model that injects tail latency and failures: each call is slow
+    (`slow_delay`) with probability `slow_rate` and raises with probability
+    `error_rate`. Seeded, so runs are repeatable.
+    """
+
+    def __init__(self, model_name=None, slow_rate=0.0, slow_delay=2.0, error_rate=0.0, seed=0, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.errors = 0
+
+    def _fault(self):
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            self.errors += 1
+            return "error", 0.0
+        if roll < self.error_rate + self.slow_rate:
+            return "slow", self.slow_delay
+        return "ok", 0.0
+
+    def generate_content(self, prompt, **kwargs):
+        fault, extra_delay = self._fault()
+        if extra_delay:
+            time.sleep(extra_delay)
+        response = super().generate_content(prompt, **kwargs)
+        if fault == "error":
+            raise ConnectionError("injected upstream failure")
+        return response
+
+    async def generate_content_async(self, prompt, **kwargs):
+        fault, extra_delay = self._fault()
+        if extra_delay:
+            await asyncio.sleep(extra_delay)
+        response = await super().generate_content_async(prompt, **kwargs)
+        if fault == "error":
+            raise ConnectionError("injected upstream failure")
+        return response
+
+
+def patch_genai(**stub_kwargs):
+    """Route every `genai.GenerativeModel(...)` construction to the stub. Returns an undo callable."""
+    import google.generativeai as genai
+
+    original_model = genai.GenerativeModel
+    original_configure = genai.configure
+
+    def factory(model_name=None, **kwargs):
+        return StubGenerativeModel(model_name, **stub_kwargs)
+
+    genai.GenerativeModel = factory
+    genai.configure = lambda **kwargs: None
+
+    def undo():
+        genai.GenerativeModel = original_model
+        genai.configure = original_configure
+
+    return undo
+
+
+class _FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class _FakeQuery:
+    """The subset of the postgrest query builder MemeTemplates uses: select, gte, order, range."""
+
+    def __init__(self, client, key):
+        self.client = client
+        self.key = key
+        self.columns = None
+        self.filters = []
+        self.ordering = []
+        self.bounds = None
+
+    def select(self, columns="*"):
+        self.columns = None if columns == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def gte(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering.append(column)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end + 1)
+        return self
+
+    def execute(self):
+        self.client.requests += 1
+        rows = self.client.rows(self.key, tuple(self.filters), tuple(self.ordering))
+        if self.bounds is not None:
+            rows = rows[self.bounds[0]:self.bounds[1]]
+        # Every response is a fresh copy, as it would be after decoding JSON off the wire
+        if self.columns is None:
+            return _FakeResult([dict(row) for row in rows])
+        columns = self.columns
+        return _FakeResult([{column: row[column] for column in columns} for row in rows])
+
+
+class FakeSupabaseClient:
+    """
+    Local stand-in for the supabase client. `schema(s).table(t)` reads the rows
+    of `tables["<s>.<t>"]`, or else `<tables_dir>/<s>.<t>.json` (loaded once).
+    Filtered/ordered views are kept per query shape, the way an index would
+    serve them, so paging through a large table costs one slice per request.
+    """
+
+    def __init__(self, tables_dir=None, schema="public", tables=None, _shared=None):
+        self.tables_dir = tables_dir
+        self._schema = schema
+        self._shared = _shared if _shared is not None else {"tables": dict(tables or {}), "views": {}, "requests": 0}
+
+    @property
+    def requests(self):
+        return self._shared["requests"]
+
+    @requests.setter
+    def requests(self, value):
+        self._shared["requests"] = value
+
+    def schema(self, name):
+        return FakeSupabaseClient(self.tables_dir, name, _shared=self._shared)
+
+    def table(self, name):
+        return _FakeQuery(self, f"{self._schema}.{name}")
+
+    def rows(self, key, filters=(), ordering=()):
+        tables = self._shared["tables"]
+        if key not in tables:
+            path = os.path.join(self.tables_dir or "", f"{key}.json")
+            rows = []
+            if self.tables_dir and os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    rows = json.load(f)
+            tables[key] = rows
+        if not filters and not ordering:
+            return tables[key]
+        views = self._shared["views"]
+        view_key = (key, filters, ordering)
+        if view_key not in views:
+            rows = [row for row in tables[key] if all(row[column] >= value for column, value in filters)]
+            if ordering:
+                rows.sort(key=lambda row: tuple(row[column] for column in ordering))
+            views[view_key] = rows
+        return views[view_key]
+
+
+def write_supabase_tables(tables_dir, template_names, emotions, schema="dc"):
+    """
+    Write the dialogs / emotions / memes_dc tables MemeTemplates merges, assigning
+    the template files to emotions round-robin.
+    """
+    os.makedirs(tables_dir, exist_ok=True)
+    tables = {
+        "emotions": [{"emotion_id": i, "emotion_label": label} for i, label in enumerate(emotions)],
+        "memes_dc": [{"meme_id": i, "image_path": f"templates/{name}"} for i, name in enumerate(template_names)],
+        "dialogs": [
+            {"dialog_id": i, "meme_id": i, "emotion_id": i % len(emotions), "dialog": f"dialog {i}"}
+            for i in range(len(template_names))
+        ],
+    }
+    for table, rows in tables.items():
+        with open(os.path.join(tables_dir, f"{schema}.{table}.json"), "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+    return tables
+
+
+def synthetic_catalog_tables(dialog_rows, memes, emotions, schema="dc"):
+    """
+    In-memory catalog tables for FakeSupabaseClient(tables=...): `dialog_rows`
+    dialogs (with text, like the real table) spread over `memes` memes and the
+    given emotions. Every row carries an `updated_at` one second after the
+    previous row of its table, starting 2025-01-01.
+    """
+    start = datetime(2025, 1, 1)
+
+    def updated_at(i):
+        return (start + timedelta(seconds=i)).isoformat()
+
+    tables = {
+        f"{schema}.emotions": [
+            {"emotion_id": i, "emotion_label": label, "updated_at": updated_at(i)} for i, label in enumerate(emotions)
+        ],
+        f"{schema}.memes_dc": [
+            {"meme_id": i, "image_path": f"templates/meme_{i}.jpg", "title": f"meme {i}", "updated_at": updated_at(i)}
+            for i in range(memes)
+        ],
+        f"{schema}.dialogs": [
+            {"dialog_id": i, "meme_id": i % memes, "emotion_id": (i // memes) % len(emotions),
+             "dialog": f"Tenglish dialogue number {i} for this template", "updated_at": updated_at(i)}
+            for i in range(dialog_rows)
+        ],
+    }
+    return tables
+
+
+def patch_supabase(tables_dir=None, client=None):
+    """
+    Make MemeTemplates read tables from `tables_dir` (or use `client`) instead
+    of Supabase. Returns an undo callable.
+    """
+    from src.utils import image_templates
+
+    original = image_templates.create_client
+    image_templates.create_client = lambda url, key: client or FakeSupabaseClient(tables_dir)
+
+    def undo():
+        image_templates.create_client = original
+
+    return undo
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    return {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / max(len(samples), 1) * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
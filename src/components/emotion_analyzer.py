@@ -1,45 +1,188 @@
 import os
 import sys
-import google.generativeai as genai
 import io
+import json
+import time
 
-from src.exceptions import CustomException
+from src.exceptions import CustomException, LLMUnavailableException
 from src.logger import logging
-from src.entity.config_entity import ConfigEntity, EmotionAnalyzerConfigEntity
+from src.entity.config_entity import ConfigEntity, EmotionAnalyzerConfigEntity, LocalEmotionClassifierConfigEntity
 from src.entity.artifact_entity import EmotionAnalyzerArtifact
+from src.components.local_emotion_classifier import LocalEmotionClassifier
+from src.utils.single_flight import SingleFlight, AsyncSingleFlight
+from src.utils.llm_client import ResilientModel
+from src.utils.metrics import FALLBACKS
 
 
 class EmotionAnalyzer:
-    def __init__(self):
+    def __init__(self, model=None, local_classifier=None):
+        # A prebuilt model can be passed in so one client is shared across
+        # instances (see src/pipeline/component_registry.py).
         try:
             self.emotion_analyzer_config = EmotionAnalyzerConfigEntity(config_entity=ConfigEntity())
-            genai.configure(api_key=self.emotion_analyzer_config.gemini_api_key)
-            self.model = genai.GenerativeModel(self.emotion_analyzer_config.gemini_model_name)
+            if local_classifier is None and self.emotion_analyzer_config.local_emotion_classifier:
+                local_classifier = LocalEmotionClassifier(LocalEmotionClassifierConfigEntity(config_entity=ConfigEntity()))
+            # Confident local predictions skip the model call entirely
+            self.local_classifier = local_classifier
+            if model is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=self.emotion_analyzer_config.gemini_api_key)
+                model = genai.GenerativeModel(self.emotion_analyzer_config.gemini_model_name)
+                if self.emotion_analyzer_config.llm_resilient:
+                    model = ResilientModel(model)
+            self.model = model
+            # Concurrent requests for the same text share one model call
+            self.inflight = SingleFlight(self.emotion_analyzer_config.single_flight_timeout)
+            self.inflight_async = AsyncSingleFlight(self.emotion_analyzer_config.single_flight_timeout)
         except Exception as e:
             raise CustomException(e, sys)
 
-    def analyze_emotion(self, text: str) -> EmotionAnalyzerArtifact:
+    def _emotion_prompt(self, text: str) -> str:
+        return (
+            "Categorize the emotional tone of the following text into one of the following categories:\n"
+            "happy, sad, angry, surprise, neutral, sarcastic.\n"
+            f"Text: {text}\n"
+            "Return ONLY the emotion as a single word."
+        )
+
+    def _parse_emotion(self, response) -> EmotionAnalyzerArtifact:
+        emotion = getattr(response, "text", "").strip().lower()
+
+        if not emotion:
+            raise ValueError("Gemini returned an empty response.")
+
+        if emotion not in self.emotion_analyzer_config.emotion_templates:
+            emotion = "neutral"
+
+        logging.info(f"Emotion analyzed: {emotion}")
+        return EmotionAnalyzerArtifact(emotion_name=emotion)
+
+    @staticmethod
+    def _inflight_key(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def _classify_locally(self, text: str):
+        if self.local_classifier is None:
+            return None
+        prediction = self.local_classifier.classify(text)
+        return EmotionAnalyzerArtifact(emotion_name=prediction.emotion_name) if prediction else None
+
+    def _record_llm_latency(self, started: float, count: int = 1):
+        if self.local_classifier is not None:
+            self.local_classifier.record_llm_latency(time.perf_counter() - started, count)
+
+    def _fallback_emotion(self, error) -> EmotionAnalyzerArtifact:
+        logging.warning(f"LLM unavailable, using fallback emotion: {error}")
+        FALLBACKS.inc(kind="emotion")
+        return EmotionAnalyzerArtifact(emotion_name=self.emotion_analyzer_config.fallback_emotion)
+
+    def _analyze_emotion(self, text: str) -> EmotionAnalyzerArtifact:
+        logging.info("Analyzing emotion in text...")
+        started = time.perf_counter()
         try:
-            logging.info("Analyzing emotion in text...")
+            response = self.model.generate_content(self._emotion_prompt(text))
+        except LLMUnavailableException as e:
+            return self._fallback_emotion(e)
+        self._record_llm_latency(started)
+        return self._parse_emotion(response)
 
-            prompt = (
-                "Categorize the emotional tone of the following text into one of the following categories:\n"
-                "happy, sad, angry, surprise, neutral, sarcastic.\n"
-                f"Text: {text}\n"
-                "Return ONLY the emotion as a single word."
-            )
+    async def _analyze_emotion_async(self, text: str) -> EmotionAnalyzerArtifact:
+        logging.info("Analyzing emotion in text...")
+        started = time.perf_counter()
+        try:
+            response = await self.model.generate_content_async(self._emotion_prompt(text))
+        except LLMUnavailableException as e:
+            return self._fallback_emotion(e)
+        self._record_llm_latency(started)
+        return self._parse_emotion(response)
 
-            response = self.model.generate_content(prompt)
-            emotion = getattr(response, "text", "").strip().lower()
+    def _batch_emotion_prompt(self, texts) -> str:
+        numbered = "\n".join(f"{i}. {' '.join(text.split())}" for i, text in enumerate(texts, start=1))
+        return (
+            "Categorize the emotional tone of each numbered text below into one of the following categories:\n"
+            "happy, sad, angry, surprise, neutral, sarcastic.\n"
+            f"{numbered}\n"
+            f"Respond with ONLY a JSON array of {len(texts)} emotions (single lowercase words), in the same order."
+        )
 
-            if not emotion:
-                raise ValueError("Gemini returned an empty response.")
+    def _parse_batch_emotions(self, response, count: int) -> list:
+        emotions = json.loads(getattr(response, "text", "") or "null")
+        if not isinstance(emotions, list) or len(emotions) != count:
+            raise ValueError(f"Expected a JSON array of {count} emotions, got: {str(emotions)[:200]}")
 
+        artifacts = []
+        for emotion in emotions:
+            emotion = str(emotion).strip().lower()
             if emotion not in self.emotion_analyzer_config.emotion_templates:
                 emotion = "neutral"
+            artifacts.append(EmotionAnalyzerArtifact(emotion_name=emotion))
+        return artifacts
 
-            logging.info(f"Emotion analyzed: {emotion}")
-            return EmotionAnalyzerArtifact(emotion_name=emotion)
+    def _analyze_emotion_chunk(self, texts) -> list:
+        try:
+            started = time.perf_counter()
+            response = self.model.generate_content(
+                self._batch_emotion_prompt(texts), generation_config={"response_mime_type": "application/json"}
+            )
+            self._record_llm_latency(started, count=len(texts))
+            return self._parse_batch_emotions(response, len(texts))
+        except Exception as e:
+            logging.warning(f"Batch emotion analysis failed, falling back to one call per text: {e}")
+
+        results = []
+        for text in texts:
+            try:
+                results.append(self.analyze_emotion(text))
+            except CustomException as e:
+                results.append(e)
+        return results
+
+    def analyze_emotions_batch(self, texts, executor=None) -> list:
+        """
+        Classify many texts with one model call per EMOTION_BATCH_SIZE distinct texts
+        the local classifier isn't confident about (chunks run concurrently on
+        `executor` when given). Returns one entry per input text: an
+        EmotionAnalyzerArtifact, or the exception for that text if even the
+        per-text fallback failed.
+        """
+        try:
+            by_key = {}
+            distinct = []
+            for key in dict.fromkeys(self._inflight_key(text) for text in texts):
+                local = self._classify_locally(key)
+                if local is not None:
+                    by_key[key] = local
+                else:
+                    distinct.append(key)
+            batch_size = max(1, self.emotion_analyzer_config.emotion_batch_size)
+            chunks = [distinct[start:start + batch_size] for start in range(0, len(distinct), batch_size)]
+            logging.info(f"Analyzing emotions for {len(texts)} texts in {len(chunks)} model call(s)...")
+
+            mapper = executor.map if executor is not None else map
+            for chunk, results in zip(chunks, mapper(self._analyze_emotion_chunk, chunks)):
+                by_key.update(zip(chunk, results))
+            return [by_key[self._inflight_key(text)] for text in texts]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def analyze_emotion(self, text: str) -> EmotionAnalyzerArtifact:
+        try:
+            local = self._classify_locally(text)
+            if local is not None:
+                return local
+            return self.inflight.do(self._inflight_key(text), self._analyze_emotion, text)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    async def analyze_emotion_async(self, text: str) -> EmotionAnalyzerArtifact:
+        try:
+            local = self._classify_locally(text)
+            if local is not None:
+                return local
+            return await self.inflight_async.do(self._inflight_key(text), self._analyze_emotion_async, text)
 
         except Exception as e:
             raise CustomException(e, sys)
@@ -0,0 +1,226 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import LocalEmotionClassifierConfigEntity
+from src.entity.artifact_entity import LocalEmotionPredictionArtifact
+
+import threading
+import zlib
+import math
+import re
+import os
+import sys
+
+import numpy as np
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Keyword -> weight per emotion. Weight 2 marks words that settle the label on
+# their own ("exam failed"), weight 1 words that only lean one way.
+EMOTION_LEXICON = {
+    "happy": {
+        "passed": 2, "pass": 1, "won": 2, "win": 1, "winning": 1, "promotion": 2, "hike": 2, "bonus": 2,
+        "selected": 2, "congratulations": 2, "congrats": 2, "celebration": 2, "party": 1, "vacation": 1,
+        "holiday": 1, "holidays": 1, "birthday": 1, "wedding": 1, "happy": 2, "santosham": 2, "biryani": 1,
+        "placed": 2, "offer letter": 2, "salary credited": 2,
+    },
+    "sad": {
+        "failed": 2, "fail": 2, "failure": 2, "breakup": 2, "rejected": 2, "rejection": 2, "lost": 1,
+        "miss": 1, "missing": 1, "sad": 2, "cry": 2, "crying": 2, "baadha": 2, "alone": 1, "heartbreak": 2,
+        "fired": 2, "layoff": 2, "layoffs": 2, "sick": 1, "backlog": 2, "backlogs": 2, "hostel food": 1,
+    },
+    "angry": {
+        "traffic": 2, "angry": 2, "kopam": 2, "chiraku": 2, "annoying": 2, "irritating": 2, "cheated": 2,
+        "late": 1, "waiting": 1, "queue": 1, "powercut": 2, "power cut": 2, "potholes": 2, "pothole": 2,
+        "spam": 1, "boss": 1, "scolding": 2, "fight": 1,
+    },
+    "surprise": {
+        "suddenly": 2, "unexpected": 2, "surprise": 2, "shock": 2, "shocked": 2, "shocking": 2, "twist": 2,
+        "unbelievable": 2, "omg": 2, "finally": 1, "out of syllabus": 2, "surprise test": 2,
+    },
+    "sarcastic": {
+        "monday": 2, "mondays": 2, "meeting": 1, "meetings": 1, "deadline": 1, "deadlines": 1, "diet": 2,
+        "gym": 1, "wifi": 1, "emi": 1, "resolution": 1, "resolutions": 1, "yeah right": 2, "as if": 2,
+        "work from home": 1, "appraisal": 1,
+    },
+    "neutral": {
+        "weather": 1, "news": 1, "update": 1, "daily": 1, "routine": 1, "commute": 1,
+    },
+}
+
+# Present in a text, these halve the confidence so the LLM decides ("not happy", "happy ledu")
+NEGATIONS = {"not", "no", "never", "dont", "don't", "isn't", "wasn't", "ledu", "kaadu", "kadu", "ledhu"}
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens plus adjacent-word bigrams and trigrams ("power cut")."""
+    words = TOKEN_PATTERN.findall(text.lower())
+    grams = list(words)
+    for n in (2, 3):
+        grams.extend(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+    return grams
+
+
+class BagOfWordsLogisticModel:
+    """
+    Multinomial logistic regression over hashed, L2-normalized bag-of-words
+    counts, trained with full-batch gradient descent. Only NumPy is needed.
+    """
+
+    def __init__(self, labels, n_features: int = 2 ** 14):
+        self.labels = list(labels)
+        self.n_features = n_features
+        self.weights = np.zeros((n_features, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+
+    def featurize(self, texts) -> np.ndarray:
+        features = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for gram in tokenize(text):
+                features[row, zlib.crc32(gram.encode("utf-8")) % self.n_features] += 1.0
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        return features / np.maximum(norms, 1e-6)
+
+    def predict_proba(self, texts) -> np.ndarray:
+        logits = self.featurize(texts) @ self.weights + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def fit(self, texts, labels, epochs: int = 300, learning_rate: float = 0.5, l2: float = 1e-4):
+        features = self.featurize(texts)
+        targets = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        targets[np.arange(len(texts)), [self.labels.index(label) for label in labels]] = 1.0
+
+        for _ in range(epochs):
+            logits = features @ self.weights + self.bias
+            logits -= logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            error = (probs - targets) / len(texts)
+            self.weights -= learning_rate * (features.T @ error + l2 * self.weights)
+            self.bias -= learning_rate * error.sum(axis=0)
+        return self
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, weights=self.weights, bias=self.bias, labels=np.array(self.labels))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            model = cls([str(label) for label in data["labels"]], n_features=data["weights"].shape[0])
+            model.weights = data["weights"]
+            model.bias = data["bias"]
+        return model
+
+
+class LocalEmotionClassifier:
+    """
+    In-process emotion classifier that answers obvious topics without an LLM call.
+
+    A keyword lexicon scores every label; when a trained bag-of-words model is
+    available (EMOTION_MODEL_FILE, see src/pipeline/train_emotion_classifier.py)
+    its probabilities are blended with the lexicon. `classify` returns a
+    prediction only when its confidence reaches LOCAL_EMOTION_THRESHOLD, so the
+    caller escalates everything else to Gemini. Hit rate, the confidence
+    distribution and the LLM latency saved are kept in `stats()`.
+    """
+
+    LEXICON_BLEND = 0.3
+
+    def __init__(self, config: LocalEmotionClassifierConfigEntity):
+        try:
+            self.labels = list(config.emotion_templates)
+            self.threshold = config.confidence_threshold
+            self.model = None
+            if config.model_path and os.path.exists(config.model_path):
+                self.model = BagOfWordsLogisticModel.load(config.model_path)
+                logging.info(f"Loaded local emotion model from {config.model_path}")
+
+            self._lock = threading.Lock()
+            self.predictions = 0
+            self.local_hits = 0
+            self.escalations = 0
+            self.confidence_histogram = [0] * 10
+            self.llm_calls_timed = 0
+            self.llm_seconds = 0.0
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def lexicon_scores(self, text: str) -> np.ndarray:
+        grams = tokenize(text)
+        scores = np.zeros(len(self.labels), dtype=np.float32)
+        for index, label in enumerate(self.labels):
+            keywords = EMOTION_LEXICON.get(label, {})
+            scores[index] = sum(keywords.get(gram, 0) for gram in grams)
+        return scores
+
+    def predict(self, text: str) -> LocalEmotionPredictionArtifact:
+        """Best label and its confidence in [0, 1], whatever the threshold."""
+        scores = self.lexicon_scores(text)
+        total = float(scores.sum())
+
+        if self.model is not None:
+            probs = self.model.predict_proba([text])[0]
+            probs = np.array([probs[self.model.labels.index(label)] if label in self.model.labels else 0.0
+                              for label in self.labels])
+            if total > 0:
+                probs = (1 - self.LEXICON_BLEND) * probs + self.LEXICON_BLEND * scores / total
+            best = int(np.argmax(probs))
+            confidence, source = float(probs[best]), "model"
+        elif total > 0:
+            best = int(np.argmax(scores))
+            top = float(scores[best])
+            # Share of the evidence for the top label, discounted when that evidence is thin
+            confidence, source = (top / total) * (1 - math.exp(-top)), "lexicon"
+        else:
+            return LocalEmotionPredictionArtifact(emotion_name="neutral", confidence=0.0, source="none")
+
+        if NEGATIONS.intersection(TOKEN_PATTERN.findall(text.lower())):
+            confidence /= 2
+        return LocalEmotionPredictionArtifact(
+            emotion_name=self.labels[best], confidence=round(confidence, 4), source=source
+        )
+
+    def classify(self, text: str):
+        """The prediction if it clears the threshold, otherwise None (the caller should ask the LLM)."""
+        prediction = self.predict(text)
+        accepted = prediction.confidence >= self.threshold
+        with self._lock:
+            self.predictions += 1
+            self.confidence_histogram[min(int(prediction.confidence * 10), 9)] += 1
+            if accepted:
+                self.local_hits += 1
+            else:
+                self.escalations += 1
+        if accepted:
+            logging.info(f"Emotion classified locally: {prediction.emotion_name} "
+                         f"({prediction.source}, confidence {prediction.confidence})")
+            return prediction
+        return None
+
+    def record_llm_latency(self, seconds: float, count: int = 1):
+        """Timing of escalated LLM classifications, used to estimate the latency local hits saved."""
+        with self._lock:
+            self.llm_calls_timed += count
+            self.llm_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            mean_llm_ms = self.llm_seconds / self.llm_calls_timed * 1000 if self.llm_calls_timed else None
+            return {
+                "threshold": self.threshold,
+                "model_loaded": self.model is not None,
+                "predictions": self.predictions,
+                "local_hits": self.local_hits,
+                "escalations": self.escalations,
+                "hit_rate": round(self.local_hits / self.predictions, 4) if self.predictions else 0.0,
+                "confidence_histogram": {
+                    f"{i / 10:.1f}-{(i + 1) / 10:.1f}": count for i, count in enumerate(self.confidence_histogram)
+                },
+                "mean_llm_latency_ms": round(mean_llm_ms, 1) if mean_llm_ms is not None else None,
+                "latency_saved_ms": round(self.local_hits * mean_llm_ms, 1) if mean_llm_ms is not None else None,
+            }
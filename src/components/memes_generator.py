@@ -1,38 +1,53 @@
-from src.exceptions import CustomException
+from src.exceptions import CustomException, LLMUnavailableException
 from src.logger import logging
 
-import os, io, sys, json, random, requests
-import google.generativeai as genai
+import os, io, sys, json, asyncio
 
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
-from urllib.parse import urlparse
+from PIL import Image
 
 from src.entity.config_entity import ConfigEntity, EmotionAnalyzerConfigEntity, MemeTemplatesEntity
+from src.entity.artifact_entity import FusedMemeContentArtifact
 from src.utils import generate_unique_filename
+from src.utils.template_cache import template_image_cache
+from src.utils.meme_renderer import draw_meme_text, render_error
+from src.utils.image_encoder import EncodingOptions, encode_image
+from src.entity.artifact_entity import EncodedImageArtifact
+from src.utils.template_index import get_template_index
+from src.utils.template_layouts import get_layout_index
+from src.utils.template_prefetcher import get_template_prefetcher
+from src.utils.shared_files import atomic_file
+from src.utils.llm_client import ResilientModel
+from src.utils.metrics import track_stage, FALLBACKS
 
 from io import BytesIO
 
 
 class MemesGenerator:
-    def __init__(self):
+    def __init__(self, model=None):
         try:
             logging.info("Initializing MemesGenerator...")
             self.emotion_analyzer_config = EmotionAnalyzerConfigEntity(config_entity=ConfigEntity())
             self.meme_templates_config = MemeTemplatesEntity(config_entity=ConfigEntity())
-
-            genai.configure(api_key=self.emotion_analyzer_config.gemini_api_key)
-            self.model = genai.GenerativeModel(self.emotion_analyzer_config.gemini_model_name)
+            self.template_index = get_template_index()
+            self.layout_index = get_layout_index()
+            self.default_encoding = EncodingOptions.from_config()
+
+            # Reuse a shared model when one is provided instead of building a new client.
+            if model is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=self.emotion_analyzer_config.gemini_api_key)
+                model = genai.GenerativeModel(self.emotion_analyzer_config.gemini_model_name)
+                if self.emotion_analyzer_config.llm_resilient:
+                    model = ResilientModel(model)
+            self.model = model
             logging.info("MemesGenerator initialized successfully.")
         except Exception as e:
             logging.error("Error initializing MemesGenerator", exc_info=True)
             raise CustomException(e, sys)
 
-    def generate_meme_dialogues(self, topic, emotion):
-        """Generate two dialogues for the upper and lower parts of a Tenglish meme."""
-        try:
-            logging.info(f"Generating meme dialogues for topic='{topic}', emotion='{emotion}'")
-            prompt = f"""
+    def _dialogue_prompt(self, topic, emotion):
+        return f"""
         You are a hilarious Tenglish (Telugu-English) comedy writer. Create two EXTREMELY FUNNY dialogues for a meme about "{topic}" with {emotion} emotion.
 
         CRITICAL INSTRUCTIONS:
@@ -68,47 +83,168 @@ class MemesGenerator:
         
         RETURN ONLY TWO DIALOGUES - NO EXPLANATIONS, NO FORMATTING:
         """
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
-            lines = [line.strip() for line in text.split("\n") if line.strip()]
-
-            if len(lines) >= 2:
-                logging.info("Successfully generated two dialogues.")
-                return lines[0], lines[1]
-            elif len(lines) == 1:
-                logging.warning("Only one dialogue received. Using fallback for second line.")
-                return lines[0], "Adhi kaadhu, idhi kaadhu!"
-            else:
-                logging.warning("No dialogues generated. Using default fallback.")
-                return "Emaindhi asalu?", "Adhi kaadhu, idhi kaadhu!"
 
+    def _parse_dialogues(self, response):
+        return self._parse_dialogue_text(response.text)
+
+    def _parse_dialogue_text(self, text):
+        text = text.strip()
+        lines = [line.strip() for line in text.split("\n") if line.strip()]
+
+        if len(lines) >= 2:
+            logging.info("Successfully generated two dialogues.")
+            return lines[0], lines[1]
+        elif len(lines) == 1:
+            logging.warning("Only one dialogue received. Using fallback for second line.")
+            return lines[0], "Adhi kaadhu, idhi kaadhu!"
+        else:
+            logging.warning("No dialogues generated. Using default fallback.")
+            FALLBACKS.inc(kind="dialogues")
+            return self.emotion_analyzer_config.fallback_dialogues
+
+    def generate_meme_dialogues(self, topic, emotion):
+        """Generate two dialogues for the upper and lower parts of a Tenglish meme."""
+        try:
+            logging.info(f"Generating meme dialogues for topic='{topic}', emotion='{emotion}'")
+            response = self.model.generate_content(self._dialogue_prompt(topic, emotion))
+            return self._parse_dialogues(response)
+
+        except LLMUnavailableException as e:
+            logging.warning(f"LLM unavailable, using fallback dialogues: {e}")
+            FALLBACKS.inc(kind="dialogues")
+            return self.emotion_analyzer_config.fallback_dialogues
         except Exception as e:
             logging.error("Error generating meme dialogues", exc_info=True)
             raise CustomException(e, sys)
 
+    async def generate_meme_dialogues_async(self, topic, emotion):
+        """Async variant of `generate_meme_dialogues` that awaits the model call."""
+        try:
+            logging.info(f"Generating meme dialogues for topic='{topic}', emotion='{emotion}'")
+            response = await self.model.generate_content_async(self._dialogue_prompt(topic, emotion))
+            return self._parse_dialogues(response)
+
+        except LLMUnavailableException as e:
+            logging.warning(f"LLM unavailable, using fallback dialogues: {e}")
+            FALLBACKS.inc(kind="dialogues")
+            return self.emotion_analyzer_config.fallback_dialogues
+        except Exception as e:
+            logging.error("Error generating meme dialogues", exc_info=True)
+            raise CustomException(e, sys)
+
+    async def stream_meme_dialogues_async(self, topic, emotion):
+        """
+        Stream the dialogues as the model writes them: yields ("delta", text chunk)
+        tuples, then one ("dialogues", (upper_text, lower_text)) with the parsed result.
+        Falls back like `generate_meme_dialogues` when the model is unavailable.
+        """
+        logging.info(f"Streaming meme dialogues for topic='{topic}', emotion='{emotion}'")
+        text = ""
+        try:
+            response = await self.model.generate_content_async(self._dialogue_prompt(topic, emotion), stream=True)
+            async for chunk in response:
+                delta = getattr(chunk, "text", "")
+                if delta:
+                    text += delta
+                    yield "delta", delta
+        except LLMUnavailableException as e:
+            logging.warning(f"LLM unavailable, using fallback dialogues: {e}")
+        except Exception as e:
+            if not text:
+                raise CustomException(e, sys)
+            # Keep whatever arrived before the stream broke
+            logging.warning(f"Dialogue stream ended early: {e}")
+        yield "dialogues", self._parse_dialogue_text(text)
+
+    def _fused_prompt(self, topic):
+        emotions = ", ".join(self.emotion_analyzer_config.emotion_templates)
+        return f"""
+        You are a hilarious Tenglish (Telugu-English) comedy writer.
+
+        STEP 1: Categorize the emotional tone of the topic "{topic}" into exactly one of: {emotions}.
+        STEP 2: Write two EXTREMELY FUNNY meme dialogues about the topic that match that emotion.
+        - Use natural Tenglish mixing (Telugu words in English script + English)
+        - First dialogue: setup the situation/context
+        - Second dialogue: deliver the punchline/twist/reaction
+        - Each dialogue should be 50-80 characters
+
+        Respond with ONLY a JSON object, no markdown:
+        {{"emotion": "<one of: {emotions}>", "upper": "<first dialogue>", "lower": "<second dialogue>"}}
+        """
+
+    def generate_fused_content(self, topic) -> FusedMemeContentArtifact:
+        """Classify the emotion and write both dialogues in one structured (JSON) Gemini call."""
+        try:
+            logging.info(f"Generating fused emotion + dialogues for topic='{topic}'")
+            response = self.model.generate_content(
+                self._fused_prompt(topic), generation_config={"response_mime_type": "application/json"}
+            )
+            artifact = self._parse_fused_response(getattr(response, "text", ""))
+            logging.info(f"Fused generation succeeded with emotion '{artifact.emotion_name}'.")
+            return artifact
+
+        except Exception as e:
+            logging.warning(f"Fused generation failed: {e}")
+            raise CustomException(e, sys)
+
+    async def generate_fused_content_async(self, topic) -> FusedMemeContentArtifact:
+        """Async variant of `generate_fused_content`."""
+        try:
+            logging.info(f"Generating fused emotion + dialogues for topic='{topic}'")
+            response = await self.model.generate_content_async(
+                self._fused_prompt(topic), generation_config={"response_mime_type": "application/json"}
+            )
+            artifact = self._parse_fused_response(getattr(response, "text", ""))
+            logging.info(f"Fused generation succeeded with emotion '{artifact.emotion_name}'.")
+            return artifact
+
+        except Exception as e:
+            logging.warning(f"Fused generation failed: {e}")
+            raise CustomException(e, sys)
+
+    def _parse_fused_response(self, text) -> FusedMemeContentArtifact:
+        """Validate the fused JSON payload; raises ValueError if anything is missing or off-list."""
+        text = (text or "").strip()
+        if text.startswith("```"):
+            text = text.strip("`")
+            if text.lower().startswith("json"):
+                text = text[4:]
+
+        payload = json.loads(text)
+        if not isinstance(payload, dict):
+            raise ValueError("Fused response is not a JSON object.")
+
+        emotion = str(payload.get("emotion", "")).strip().lower()
+        if emotion not in self.emotion_analyzer_config.emotion_templates:
+            raise ValueError(f"Fused response returned unknown emotion '{emotion}'.")
+
+        upper_text = payload.get("upper")
+        lower_text = payload.get("lower")
+        if not isinstance(upper_text, str) or not isinstance(lower_text, str) \
+                or not upper_text.strip() or not lower_text.strip():
+            raise ValueError("Fused response is missing one of the dialogues.")
+
+        return FusedMemeContentArtifact(
+            emotion_name=emotion,
+            upper_text=upper_text.strip(),
+            lower_text=lower_text.strip(),
+        )
+
     def select_template(self, emotion):
-        """Select a template image for the given emotion using a JSON mapping of emotion -> image URLs."""
+        """Select a template image for the given emotion using the in-memory emotion -> image URL index."""
         try:
             template_dir = self.meme_templates_config.template_dir
-            json_path = os.path.join(self.meme_templates_config.output_dir, self.meme_templates_config.json_file)
-            os.makedirs(template_dir, exist_ok=True)
             logging.info(f"Selecting template for emotion='{emotion}'")
 
-            with open(json_path, 'r') as f:
-                emotion_url_map = json.load(f)
-
-            if emotion in emotion_url_map and emotion_url_map[emotion]:
-                image_url = random.choice(emotion_url_map[emotion])
-                image_filename = os.path.basename(urlparse(image_url).path)
-                template_path = os.path.join(template_dir, image_filename)
+            choice = self.template_index.choose(emotion)
+            if choice is not None:
+                image_url, template_path = choice
 
-                if not os.path.exists(template_path):
+                if not self.template_index.is_local(template_path):
                     logging.info(f"Downloading template image from: {image_url}")
                     try:
-                        response = requests.get(image_url, timeout=10)
-                        response.raise_for_status()
-                        with open(template_path, 'wb') as f:
-                            f.write(response.content)
+                        get_template_prefetcher().download(image_url, template_path)
+                        self.template_index.mark_local(template_path)
                         logging.info(f"Template image saved to {template_path}")
                     except Exception as e:
                         logging.warning(f"Failed to download image: {e}")
@@ -121,13 +257,41 @@ class MemesGenerator:
             logging.error("Error selecting meme template", exc_info=True)
             raise CustomException(e, sys)
 
+    async def select_template_async(self, emotion, http_client):
+        """Async variant of `select_template`; a missing template is fetched with the given httpx.AsyncClient."""
+        try:
+            template_dir = self.meme_templates_config.template_dir
+            logging.info(f"Selecting template for emotion='{emotion}'")
+
+            choice = self.template_index.choose(emotion)
+            if choice is not None:
+                image_url, template_path = choice
+
+                if not self.template_index.is_local(template_path):
+                    logging.info(f"Downloading template image from: {image_url}")
+                    try:
+                        await get_template_prefetcher().download_async(image_url, template_path, http_client)
+                        self.template_index.mark_local(template_path)
+                        logging.info(f"Template image saved to {template_path}")
+                    except Exception as e:
+                        logging.warning(f"Failed to download image: {e}")
+                        return await asyncio.to_thread(self._create_default_template, template_dir)
+                return template_path
+            else:
+                logging.warning(f"No image URLs found for emotion '{emotion}'. Using default template.")
+                return await asyncio.to_thread(self._create_default_template, template_dir)
+        except Exception as e:
+            logging.error("Error selecting meme template", exc_info=True)
+            raise CustomException(e, sys)
+
     def _create_default_template(self, template_dir):
         """Create and return the path to a default template image."""
         try:
             default_path = os.path.join(template_dir, "default_template.jpg")
             if not os.path.exists(default_path):
                 dummy_image = Image.new('RGB', (800, 800), color='white')
-                dummy_image.save(default_path)
+                with atomic_file(default_path, "wb") as f:
+                    dummy_image.save(f, format="JPEG")
                 logging.info(f"Default template created at {default_path}")
             else:
                 logging.info("Using cached default template.")
@@ -136,99 +300,42 @@ class MemesGenerator:
             logging.error("Error creating default template", exc_info=True)
             raise CustomException(e, sys)
 
-    def add_text_to_image(self, image_path, upper_text, lower_text):
-        """Add the given text to the upper and lower parts of the meme template."""
+    def render_meme(self, image_path, upper_text, lower_text, encoding: EncodingOptions = None) -> EncodedImageArtifact:
+        """Draw the captions on the template and encode it (format, quality and size from `encoding`)."""
+        encoding = encoding or self.default_encoding
         try:
             logging.info(f"Adding text to image: {image_path}")
-            img = Image.open(image_path)
-            width, height = img.size
-            draw = ImageDraw.Draw(img)
-
-            try:
-                upper_font_size = min(int(height * 0.06), int(1000 / max(len(upper_text) / 2, 1)))
-                lower_font_size = min(int(height * 0.06), int(1000 / max(len(lower_text) / 2, 1)))
-                upper_font = ImageFont.truetype(self.meme_templates_config.font_path, size=upper_font_size)
-                lower_font = ImageFont.truetype(self.meme_templates_config.font_path, size=lower_font_size)
-            except:
-                logging.warning("Custom font not found, using default font.")
-                upper_font = ImageFont.load_default()
-                lower_font = ImageFont.load_default()
-
-            char_width_est = upper_font_size * 0.6
-            chars_per_line = int(width * 0.8 / char_width_est)
-
-            upper_lines = textwrap.wrap(upper_text, width=chars_per_line)
-            lower_lines = textwrap.wrap(lower_text, width=chars_per_line)
-
-            # Upper text
-            upper_section_height = height * 0.4
-            total_upper_text_height = len(upper_lines) * upper_font.size * 1.2
-            upper_start_y = (upper_section_height - total_upper_text_height) / 2
-            y_position = upper_start_y
-
-            for line in upper_lines:
-                try:
-                    bbox = draw.textbbox((0, 0), line, font=upper_font)
-                    text_width = bbox[2] - bbox[0]
-                except AttributeError:
-                    text_width = draw.textlength(line, font=upper_font)
-                position = ((width - text_width) / 2, y_position)
-                outline_thickness = max(2, int(upper_font_size / 10))
-                for offset_x in range(-outline_thickness, outline_thickness + 1, outline_thickness):
-                    for offset_y in range(-outline_thickness, outline_thickness + 1, outline_thickness):
-                        if offset_x == 0 and offset_y == 0:
-                            continue
-                        draw.text((position[0] + offset_x, position[1] + offset_y), line, font=upper_font, fill="black")
-                draw.text(position, line, font=upper_font, fill="white")
-                y_position += upper_font.size * 1.2
-
-            # Lower text
-            lower_section_top = height * 0.6
-            lower_section_height = height * 0.4
-            total_lower_text_height = len(lower_lines) * lower_font.size * 1.2
-            lower_start_y = lower_section_top + (lower_section_height - total_lower_text_height) / 2
-            y_position = lower_start_y
-
-            for line in lower_lines:
-                try:
-                    bbox = draw.textbbox((0, 0), line, font=lower_font)
-                    text_width = bbox[2] - bbox[0]
-                except AttributeError:
-                    text_width = draw.textlength(line, font=lower_font)
-                position = ((width - text_width) / 2, y_position)
-                outline_thickness = max(2, int(lower_font_size / 10))
-                for offset_x in range(-outline_thickness, outline_thickness + 1, outline_thickness):
-                    for offset_y in range(-outline_thickness, outline_thickness + 1, outline_thickness):
-                        if offset_x == 0 and offset_y == 0:
-                            continue
-                        draw.text((position[0] + offset_x, position[1] + offset_y), line, font=lower_font, fill="black")
-                draw.text(position, line, font=lower_font, fill="white")
-                y_position += lower_font.size * 1.2
-
-            img_byte_array = io.BytesIO()
-            img.save(img_byte_array, format='PNG')
-            img_byte_array.seek(0)
-            logging.info("Meme image with text generated successfully.")
-            return img_byte_array
+            with track_stage("template_load"):
+                img = template_image_cache.get(image_path, encoding.max_dimension)
+            with track_stage("draw"):
+                draw_meme_text(img, upper_text, lower_text, self.meme_templates_config.font_path,
+                               self.layout_index.get(image_path))
+            with track_stage("encode"):
+                encoded = encode_image(img, encoding)
+            logging.info(f"Meme image encoded as {encoded.format}: {encoded.byte_size} bytes in {encoded.encode_ms}ms.")
+            return encoded
 
         except Exception as e:
-            logging.error("Error adding text to image", exc_info=True)
-            error_img = Image.new('RGB', (400, 200), color='red')
-            draw = ImageDraw.Draw(error_img)
-            draw.text((10, 10), f"Error: {str(e)}", fill="white")
-            error_buffer = io.BytesIO()
-            error_img.save(error_buffer, format='PNG')
-            error_buffer.seek(0)
-            return error_buffer
+            # Hot path: the traceback is only formatted when debugging
+            logging.error(f"Error adding text to image {image_path}: {e}",
+                          exc_info=logging.getLogger().isEnabledFor(logging.DEBUG))
+            return render_error(e, encoding)
+
+    def add_text_to_image(self, image_path, upper_text, lower_text):
+        """Add the given text to the upper and lower parts of the meme template."""
+        encoded = self.render_meme(image_path, upper_text, lower_text, self.default_encoding.with_format("png"))
+        return io.BytesIO(encoded.data)
         
 
 
-    def initiate_meme_generator(self, topic_name, emotion) -> BytesIO:
+    def initiate_meme_generator(self, topic_name, emotion, dialogues=None) -> BytesIO:
         try:
             os.makedirs(self.meme_templates_config.memes_dir, exist_ok=True)
 
-            # Generate meme dialogues
-            upper_text, lower_text = self.generate_meme_dialogues(topic_name, emotion)
+            # Generate meme dialogues unless they were already produced (e.g. by fused generation)
+            if dialogues is None:
+                dialogues = self.generate_meme_dialogues(topic_name, emotion)
+            upper_text, lower_text = dialogues
 
             # Select meme template image path
             image_path = self.select_template(emotion)
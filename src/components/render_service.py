@@ -0,0 +1,111 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+from src.utils.template_cache import template_image_cache
+from src.utils.meme_renderer import draw_meme_text, render_error
+from src.utils.image_encoder import EncodingOptions, encode_image
+from src.entity.artifact_entity import EncodedImageArtifact
+from src.utils.font_cache import font_cache
+from src.utils.template_layouts import get_layout_index
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import multiprocessing
+import os
+import sys
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """
+    Compact, picklable description of one render. `template_id` is a file name
+    inside template_dir (or an absolute path for templates stored elsewhere).
+    """
+    template_id: str
+    upper_text: str
+    lower_text: str
+    encoding: EncodingOptions = EncodingOptions()
+
+
+# Per-worker state, populated by _init_worker in each child process
+_worker_font_path = None
+_worker_template_dir = None
+
+
+def _init_worker(font_path, template_dir, warm_templates):
+    """Runs once per worker: load the font and decode templates so jobs start warm."""
+    global _worker_font_path, _worker_template_dir
+    _worker_font_path = font_path
+    _worker_template_dir = template_dir
+
+    font_cache.get(font_path, 32)
+    get_layout_index()
+
+    # Templates in the shared pack need no per-worker decode
+    packed = template_image_cache.pack is not None and len(template_image_cache.pack) > 0
+    if warm_templates and not packed and os.path.isdir(template_dir):
+        for name in os.listdir(template_dir):
+            if name.lower().endswith((".jpg", ".jpeg", ".png")):
+                try:
+                    template_image_cache.get(os.path.join(template_dir, name))
+                except CustomException as e:
+                    logging.warning(f"Render worker skipped template {name}: {e}")
+
+
+def render_job(job: RenderJob) -> EncodedImageArtifact:
+    """Executed inside a worker process; returns the encoded image."""
+    try:
+        template_path = job.template_id
+        if not os.path.isabs(template_path):
+            template_path = os.path.join(_worker_template_dir, template_path)
+        img = template_image_cache.get(template_path, job.encoding.max_dimension)
+        draw_meme_text(img, job.upper_text, job.lower_text, _worker_font_path, get_layout_index().get(template_path))
+        return encode_image(img, job.encoding)
+    except Exception as e:
+        logging.error("Error rendering job in worker", exc_info=True)
+        return render_error(e, job.encoding)
+
+
+class RenderService:
+    """
+    Renders memes on a pool of worker processes so text drawing and PNG
+    encoding scale across cores instead of contending for the GIL.
+
+    Workers are spawned (not forked) and each keeps its own font and
+    decoded-template cache warm; only the RenderJob goes in and only encoded
+    bytes come back.
+    """
+
+    def __init__(self, workers: int, warm_templates: bool = True):
+        try:
+            config = MemeTemplatesEntity(config_entity=ConfigEntity())
+            self.workers = workers
+            self.template_dir = os.path.abspath(config.template_dir)
+            # Spawn, not fork: this process already runs threads (log listener, job workers, prefetch pool)
+            # whose locks a forked child could inherit held. _init_worker rebuilds what a worker needs
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(config.font_path, self.template_dir, warm_templates),
+            )
+            logging.info(f"Render service started with {workers} worker processes.")
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def make_job(self, template_path, upper_text, lower_text, encoding: EncodingOptions = None) -> RenderJob:
+        template_path = os.path.abspath(template_path)
+        if os.path.dirname(template_path) == self.template_dir:
+            template_path = os.path.basename(template_path)
+        return RenderJob(template_id=template_path, upper_text=upper_text, lower_text=lower_text,
+                         encoding=encoding or EncodingOptions())
+
+    def submit(self, template_path, upper_text, lower_text, encoding: EncodingOptions = None):
+        """Queue a render; returns a concurrent.futures.Future resolving to an EncodedImageArtifact."""
+        return self.executor.submit(render_job, self.make_job(template_path, upper_text, lower_text, encoding))
+
+    def render(self, template_path, upper_text, lower_text, encoding: EncodingOptions = None) -> EncodedImageArtifact:
+        return self.submit(template_path, upper_text, lower_text, encoding).result()
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
@@ -24,7 +24,155 @@ EMOTIONS_CSV_PATH = "emotions_rows.csv"
 
 TOPIC_NAME = None
 
+# Pipeline modes
+# When enabled, emotion + dialogues come from a single structured Gemini call
+FUSED_GENERATION = os.getenv("FUSED_GENERATION", "false").lower() == "true"
+
 OUTPUT_DIR = "artifacts"
 TEMPLATES_DIR = "template_dir"
 JSON_FILE = "emotion_image_urls.json"
-MEMES = "memes"
\ No newline at end of file
+MEMES = "memes"
+
+# Memory budget for decoded template images kept in-process (megabytes)
+TEMPLATE_CACHE_MAX_MB = int(os.getenv("TEMPLATE_CACHE_MAX_MB", "256"))
+
+# How often (seconds) the in-memory template index checks emotion_image_urls.json for changes
+TEMPLATE_INDEX_CHECK_SECONDS = float(os.getenv("TEMPLATE_INDEX_CHECK_SECONDS", "5"))
+
+# Template prefetch
+TEMPLATE_MANIFEST_FILE = "template_manifest.json"
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "8"))
+PREFETCH_ON_STARTUP = os.getenv("PREFETCH_ON_STARTUP", "true").lower() == "true"
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", "10"))
+# Workers coordinate downloads and rebuilds in template_dir/ and artifacts/ with file locks;
+# a worker gives up waiting for another one's lock after this many seconds
+FILE_LOCK_TIMEOUT_SECONDS = float(os.getenv("FILE_LOCK_TIMEOUT_SECONDS", "120"))
+
+# Identical concurrent emotion analyses / template downloads share one call;
+# callers stop waiting on someone else's call after this many seconds
+SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", "30"))
+
+# Template catalog sync (/fetch-templates/): rows are read from Supabase in pages of CATALOG_PAGE_SIZE.
+# Incremental refreshes only pull rows whose CATALOG_UPDATED_COLUMN is at or after the last sync
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "1000"))
+CATALOG_INCREMENTAL = os.getenv("CATALOG_INCREMENTAL", "false").lower() == "true"
+CATALOG_UPDATED_COLUMN = os.getenv("CATALOG_UPDATED_COLUMN", "updated_at")
+CATALOG_STATE_FILE = "template_catalog_state.json"
+
+# Per-template caption layouts, profiled after each template prefetch and stored next to JSON_FILE
+TEMPLATE_LAYOUTS = os.getenv("TEMPLATE_LAYOUTS", "true").lower() == "true"
+TEMPLATE_LAYOUTS_FILE = "template_layouts.json"
+LAYOUT_PROFILE_MAX_DIMENSION = int(os.getenv("LAYOUT_PROFILE_MAX_DIMENSION", "128"))
+
+# Async request path and admission control
+ASYNC_PIPELINE = os.getenv("ASYNC_PIPELINE", "true").lower() == "true"
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 2)))
+RENDER_QUEUE_DEPTH = int(os.getenv("RENDER_QUEUE_DEPTH", "32"))
+MAX_INFLIGHT_REQUESTS = int(os.getenv("MAX_INFLIGHT_REQUESTS", "256"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "1"))
+
+# Startup warm-up (model client, template index, fonts) gating /readyz. In the background the server
+# answers /healthz while warming; otherwise it only starts listening once warm
+STARTUP_WARMUP_BACKGROUND = os.getenv("STARTUP_WARMUP_BACKGROUND", "true").lower() == "true"
+
+# `python app.py` server: SERVER_WORKERS processes behind one socket (SIGHUP restarts them one at a time).
+# With SERVER_PRELOAD the templates, layouts and pack are prepared once before the workers start
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+SERVER_PRELOAD = os.getenv("SERVER_PRELOAD", "true").lower() == "true"
+SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("SERVER_GRACEFUL_TIMEOUT_SECONDS", "30"))
+
+# Rendering backend: "thread" renders in-process, "process" uses a pool of RENDER_WORKERS processes
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "thread").lower()
+RENDER_WARM_TEMPLATES = os.getenv("RENDER_WARM_TEMPLATES", "true").lower() == "true"
+
+# Output encoding (format can be overridden per request via ?format= or the Accept header)
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "png").lower()
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "85"))
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "80"))
+WEBP_METHOD = int(os.getenv("WEBP_METHOD", "4"))
+PNG_COMPRESS_LEVEL = int(os.getenv("PNG_COMPRESS_LEVEL", "6"))
+PNG_OPTIMIZE = os.getenv("PNG_OPTIMIZE", "false").lower() == "true"
+# Longest output edge in pixels; 0 keeps the template's full size
+OUTPUT_MAX_DIMENSION = int(os.getenv("OUTPUT_MAX_DIMENSION", "0"))
+
+# Decoded templates packed into one memory-mapped file (rebuilt after each prefetch),
+# pre-resized to TEMPLATE_PACK_MAX_DIMENSION (defaults to the output size)
+TEMPLATE_PACK = os.getenv("TEMPLATE_PACK", "true").lower() == "true"
+TEMPLATE_PACK_FILE = "templates.pack"
+TEMPLATE_PACK_MAX_DIMENSION = int(os.getenv("TEMPLATE_PACK_MAX_DIMENSION", str(OUTPUT_MAX_DIMENSION)))
+
+# Generated meme cache: "off", "emotion" (reuse emotion, fresh dialogues) or "full"
+MEME_CACHE_MODE = os.getenv("MEME_CACHE_MODE", "off").lower()
+MEME_CACHE_TTL_SECONDS = float(os.getenv("MEME_CACHE_TTL_SECONDS", "3600"))
+MEME_CACHE_MAX_TOPICS = int(os.getenv("MEME_CACHE_MAX_TOPICS", "1024"))
+# Where encoded images are kept in "full" mode: "memory" or "disk" (artifacts/memes/cache)
+MEME_IMAGE_CACHE_BACKEND = os.getenv("MEME_IMAGE_CACHE_BACKEND", "memory").lower()
+MEME_IMAGE_CACHE_MAX_MB = int(os.getenv("MEME_IMAGE_CACHE_MAX_MB", "256"))
+MEME_CACHE_DIR = "cache"
+
+# Batch generation (/generate-memes/batch and src/pipeline/run_batch_meme_pipeline.py)
+BATCH_MAX_TOPICS = int(os.getenv("BATCH_MAX_TOPICS", "500"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+# Topics classified per model call
+EMOTION_BATCH_SIZE = int(os.getenv("EMOTION_BATCH_SIZE", "50"))
+
+# Background jobs (POST /jobs): JOB_WORKERS threads per server process run queued memes, highest priority first.
+# JOB_STORE_BACKEND "sqlite" keeps the queue in artifacts/jobs.sqlite3, shared by every server worker; "memory" is per process
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "sqlite").lower()
+JOB_DB_FILE = "jobs.sqlite3"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "1000"))    # new jobs get 503 beyond this many queued
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))         # idle workers look for jobs queued elsewhere
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))         # a running job not renewed for this long is requeued
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))  # finished jobs and their images are then deleted; 0 keeps them
+JOB_CALLBACK_TIMEOUT_SECONDS = float(os.getenv("JOB_CALLBACK_TIMEOUT_SECONDS", "10"))
+# Comma-separated hosts a job's callback_url may point at; callbacks are disabled while this is empty
+JOB_CALLBACK_ALLOWED_HOSTS = tuple(
+    host.strip().lower() for host in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+)
+
+# Resilient LLM client (src/utils/llm_client.py)
+LLM_RESILIENT = os.getenv("LLM_RESILIENT", "true").lower() == "true"
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "15"))      # per attempt
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "30"))    # whole call, retries included
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "4"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# Hedged requests: duplicate an attempt still running after the observed LLM_HEDGE_PERCENTILE latency
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_CLIENT_THREADS = int(os.getenv("LLM_CLIENT_THREADS", "64"))
+
+# Used when the LLM is unavailable
+FALLBACK_EMOTION = "neutral"
+FALLBACK_DIALOGUES = ("Emaindhi asalu?", "Adhi kaadhu, idhi kaadhu!")
+
+# Local emotion classifier tier: answer in-process when confident, otherwise ask Gemini
+LOCAL_EMOTION_CLASSIFIER = os.getenv("LOCAL_EMOTION_CLASSIFIER", "false").lower() == "true"
+LOCAL_EMOTION_THRESHOLD = float(os.getenv("LOCAL_EMOTION_THRESHOLD", "0.8"))
+# Trained by src/pipeline/train_emotion_classifier.py from EMOTIONS_CSV_PATH (stored under artifacts/)
+EMOTION_MODEL_FILE = "emotion_model.npz"
+
+# Observability: Prometheus metrics at /metrics, optional Server-Timing response header
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() == "true"
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Logging (src/logger): records go through a queue to a background thread that owns the handlers
+LOG_DIR = "logs"
+LOG_FILE_NAME = "meme_generator.log"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()     # "text" or "json" (one object per line)
+LOG_MAX_MB = float(os.getenv("LOG_MAX_MB", "20"))         # rotate the file at this size
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records beyond this are dropped, never waited on
+# Keep 1 in round(1 / rate) INFO/DEBUG records per call site; warnings and errors are always kept
+LOG_INFO_SAMPLE_RATE = float(os.getenv("LOG_INFO_SAMPLE_RATE", "1.0"))
+LOG_TO_STDERR = os.getenv("LOG_TO_STDERR", "false").lower() == "true"
+# Give every process its own file (meme_generator.<pid>.log); child processes always do
+LOG_FILE_PER_PROCESS = os.getenv("LOG_FILE_PER_PROCESS", "false").lower() == "true"
@@ -16,9 +16,95 @@ class EmotionAnalyzerArtifact:
     """
     emotion_name:str
 
+@dataclass
+class LocalEmotionPredictionArtifact:
+    """
+    Represents a local (non-LLM) emotion prediction and how confident it is.
+    """
+    emotion_name: str
+    confidence: float
+    source: str
+
 @dataclass
 class MemesDialogsGeneratorArtifact:
     """
     Represents the artifact for memes dialogs generation.
     """
-    generated_dialogs: str
\ No newline at end of file
+    generated_dialogs: str
+
+@dataclass
+class FusedMemeContentArtifact:
+    """
+    Represents the emotion and both dialogues produced by a single fused LLM call.
+    """
+    emotion_name: str
+    upper_text: str
+    lower_text: str
+
+@dataclass
+class EncodedImageArtifact:
+    """
+    Represents a rendered meme encoded for the response.
+    """
+    data: bytes
+    format: str
+    media_type: str
+    width: int
+    height: int
+    encode_ms: float
+    is_error: bool = False
+
+    @property
+    def byte_size(self) -> int:
+        return len(self.data)
+
+@dataclass
+class BatchMemeItemArtifact:
+    """
+    Represents the outcome of one topic in a batch run; `error` is set instead of `encoded` on failure.
+    """
+    index: int
+    topic: str
+    status: str
+    emotion_name: str = None
+    encoded: EncodedImageArtifact = None
+    saved_path: str = None
+    error: str = None
+    elapsed_ms: float = 0.0
+
+@dataclass
+class TemplateCatalogArtifact:
+    """
+    Represents one sync of the emotion -> template URL catalog and what it cost.
+    """
+    mode: str
+    rows_fetched: int
+    pages: int
+    emotions: int
+    urls: int
+    fetch_ms: float
+    build_ms: float
+    frame_bytes: int
+
+@dataclass
+class MemeJobArtifact:
+    """
+    Represents a background meme job: its place in the queue and, once finished, where the image was written.
+    """
+    job_id: str
+    topic: str
+    status: str
+    priority: int = 0
+    format: str = None
+    callback_url: str = None
+    created_at: float = None
+    started_at: float = None
+    finished_at: float = None
+    worker: str = None
+    lease_expires: float = None
+    cancel_requested: bool = False
+    emotion_name: str = None
+    output_path: str = None
+    media_type: str = None
+    byte_size: int = None
+    error: str = None
@@ -2,6 +2,7 @@ from src.exceptions import CustomException
 from src.logger import logging
 from src.constants import *
 
+import os
 import sys
 
 class ConfigEntity:
@@ -19,6 +20,84 @@ class ConfigEntity:
         self.json_file = JSON_FILE
         self.output_dir = OUTPUT_DIR
         self.memes_dir = MEMES
+        self.fused_generation = FUSED_GENERATION
+        self.template_cache_max_bytes = TEMPLATE_CACHE_MAX_MB * 1024 * 1024
+        self.template_index_check_seconds = TEMPLATE_INDEX_CHECK_SECONDS
+        self.manifest_file = TEMPLATE_MANIFEST_FILE
+        self.prefetch_workers = PREFETCH_WORKERS
+        self.prefetch_on_startup = PREFETCH_ON_STARTUP
+        self.download_timeout = DOWNLOAD_TIMEOUT
+        self.file_lock_timeout = FILE_LOCK_TIMEOUT_SECONDS
+        self.single_flight_timeout = SINGLE_FLIGHT_TIMEOUT_SECONDS
+        self.catalog_page_size = CATALOG_PAGE_SIZE
+        self.catalog_incremental = CATALOG_INCREMENTAL
+        self.catalog_updated_column = CATALOG_UPDATED_COLUMN
+        self.catalog_state_file = CATALOG_STATE_FILE
+        self.template_layouts = TEMPLATE_LAYOUTS
+        self.template_layouts_file = TEMPLATE_LAYOUTS_FILE
+        self.layout_profile_max_dimension = LAYOUT_PROFILE_MAX_DIMENSION
+        self.template_pack = TEMPLATE_PACK
+        self.template_pack_file = TEMPLATE_PACK_FILE
+        self.template_pack_max_dimension = TEMPLATE_PACK_MAX_DIMENSION
+        self.async_pipeline = ASYNC_PIPELINE
+        self.render_workers = RENDER_WORKERS
+        self.render_queue_depth = RENDER_QUEUE_DEPTH
+        self.max_inflight_requests = MAX_INFLIGHT_REQUESTS
+        self.retry_after_seconds = RETRY_AFTER_SECONDS
+        self.startup_warmup_background = STARTUP_WARMUP_BACKGROUND
+        self.server_host = SERVER_HOST
+        self.server_port = SERVER_PORT
+        self.server_workers = SERVER_WORKERS
+        self.server_preload = SERVER_PRELOAD
+        self.server_graceful_timeout = SERVER_GRACEFUL_TIMEOUT_SECONDS
+        self.render_backend = RENDER_BACKEND
+        self.render_warm_templates = RENDER_WARM_TEMPLATES
+        self.output_format = OUTPUT_FORMAT
+        self.jpeg_quality = JPEG_QUALITY
+        self.webp_quality = WEBP_QUALITY
+        self.webp_method = WEBP_METHOD
+        self.png_compress_level = PNG_COMPRESS_LEVEL
+        self.png_optimize = PNG_OPTIMIZE
+        self.output_max_dimension = OUTPUT_MAX_DIMENSION
+        self.meme_cache_mode = MEME_CACHE_MODE
+        self.meme_cache_ttl_seconds = MEME_CACHE_TTL_SECONDS
+        self.meme_cache_max_topics = MEME_CACHE_MAX_TOPICS
+        self.meme_image_cache_backend = MEME_IMAGE_CACHE_BACKEND
+        self.meme_image_cache_max_bytes = MEME_IMAGE_CACHE_MAX_MB * 1024 * 1024
+        self.meme_cache_dir = MEME_CACHE_DIR
+        self.batch_max_topics = BATCH_MAX_TOPICS
+        self.batch_workers = BATCH_WORKERS
+        self.emotion_batch_size = EMOTION_BATCH_SIZE
+        self.job_store_backend = JOB_STORE_BACKEND
+        self.job_db_file = JOB_DB_FILE
+        self.job_workers = JOB_WORKERS
+        self.job_queue_max_depth = JOB_QUEUE_MAX_DEPTH
+        self.job_poll_seconds = JOB_POLL_SECONDS
+        self.job_lease_seconds = JOB_LEASE_SECONDS
+        self.job_result_ttl = JOB_RESULT_TTL_SECONDS
+        self.job_callback_timeout = JOB_CALLBACK_TIMEOUT_SECONDS
+        self.job_callback_allowed_hosts = JOB_CALLBACK_ALLOWED_HOSTS
+        self.llm_resilient = LLM_RESILIENT
+        self.llm_timeout_seconds = LLM_TIMEOUT_SECONDS
+        self.llm_deadline_seconds = LLM_DEADLINE_SECONDS
+        self.llm_max_retries = LLM_MAX_RETRIES
+        self.llm_backoff_base_seconds = LLM_BACKOFF_BASE_SECONDS
+        self.llm_backoff_max_seconds = LLM_BACKOFF_MAX_SECONDS
+        self.llm_breaker_failures = LLM_BREAKER_FAILURES
+        self.llm_breaker_reset_seconds = LLM_BREAKER_RESET_SECONDS
+        self.llm_hedge = LLM_HEDGE
+        self.llm_hedge_percentile = LLM_HEDGE_PERCENTILE
+        self.llm_hedge_min_samples = LLM_HEDGE_MIN_SAMPLES
+        self.llm_client_threads = LLM_CLIENT_THREADS
+        self.fallback_emotion = FALLBACK_EMOTION
+        self.fallback_dialogues = FALLBACK_DIALOGUES
+        self.local_emotion_classifier = LOCAL_EMOTION_CLASSIFIER
+        self.local_emotion_threshold = LOCAL_EMOTION_THRESHOLD
+        self.emotion_model_file = EMOTION_MODEL_FILE
+        self.emotions_csv_path = EMOTIONS_CSV_PATH
+        self.metrics_enabled = METRICS_ENABLED
+        self.server_timing = SERVER_TIMING
+        self.metrics_latency_buckets = METRICS_LATENCY_BUCKETS
 
 class TopicIngestionConfigEntity:
     def __init__(self, config_entity: ConfigEntity):  # ← FIXED: __init__
@@ -31,6 +110,33 @@ class EmotionAnalyzerConfigEntity:
         self.gemini_model_name = config_entity.model_name
         self.gemini_api_key = config_entity.gemini_api_key
         self.emotion_templates = config_entity.emotion_templates
+        self.single_flight_timeout = config_entity.single_flight_timeout
+        self.emotion_batch_size = config_entity.emotion_batch_size
+        self.local_emotion_classifier = config_entity.local_emotion_classifier
+        self.llm_resilient = config_entity.llm_resilient
+        self.fallback_emotion = config_entity.fallback_emotion
+        self.fallback_dialogues = config_entity.fallback_dialogues
+
+class LLMClientConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.timeout_seconds = config_entity.llm_timeout_seconds
+        self.deadline_seconds = config_entity.llm_deadline_seconds
+        self.max_retries = config_entity.llm_max_retries
+        self.backoff_base_seconds = config_entity.llm_backoff_base_seconds
+        self.backoff_max_seconds = config_entity.llm_backoff_max_seconds
+        self.breaker_failures = config_entity.llm_breaker_failures
+        self.breaker_reset_seconds = config_entity.llm_breaker_reset_seconds
+        self.hedge = config_entity.llm_hedge
+        self.hedge_percentile = config_entity.llm_hedge_percentile
+        self.hedge_min_samples = config_entity.llm_hedge_min_samples
+        self.client_threads = config_entity.llm_client_threads
+
+class LocalEmotionClassifierConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.emotion_templates = config_entity.emotion_templates
+        self.confidence_threshold = config_entity.local_emotion_threshold
+        self.model_path = os.path.join(config_entity.output_dir, config_entity.emotion_model_file)
+        self.training_csv = config_entity.emotions_csv_path
 
 class MemeTemplatesEntity:
     def __init__(self, config_entity: ConfigEntity):
@@ -42,3 +148,86 @@ class MemeTemplatesEntity:
         self.json_file = config_entity.json_file
         self.output_dir = config_entity.output_dir
         self.memes_dir = config_entity.memes_dir
+        self.template_cache_max_bytes = config_entity.template_cache_max_bytes
+        self.template_index_check_seconds = config_entity.template_index_check_seconds
+        self.manifest_file = config_entity.manifest_file
+        self.prefetch_workers = config_entity.prefetch_workers
+        self.download_timeout = config_entity.download_timeout
+        self.file_lock_timeout = config_entity.file_lock_timeout
+        self.single_flight_timeout = config_entity.single_flight_timeout
+        self.catalog_page_size = config_entity.catalog_page_size
+        self.catalog_incremental = config_entity.catalog_incremental
+        self.catalog_updated_column = config_entity.catalog_updated_column
+        self.catalog_state_file = config_entity.catalog_state_file
+        self.template_layouts = config_entity.template_layouts
+        self.template_layouts_file = config_entity.template_layouts_file
+        self.layout_profile_max_dimension = config_entity.layout_profile_max_dimension
+        self.template_pack = config_entity.template_pack
+        self.template_pack_file = config_entity.template_pack_file
+        self.template_pack_max_dimension = config_entity.template_pack_max_dimension
+
+class PipelineConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.fused_generation = config_entity.fused_generation
+        self.prefetch_on_startup = config_entity.prefetch_on_startup
+        self.async_pipeline = config_entity.async_pipeline
+        self.render_workers = config_entity.render_workers
+        self.render_queue_depth = config_entity.render_queue_depth
+        self.max_inflight_requests = config_entity.max_inflight_requests
+        self.retry_after_seconds = config_entity.retry_after_seconds
+        self.startup_warmup_background = config_entity.startup_warmup_background
+        self.render_backend = config_entity.render_backend
+        self.render_warm_templates = config_entity.render_warm_templates
+        self.batch_max_topics = config_entity.batch_max_topics
+        self.batch_workers = config_entity.batch_workers
+        self.output_dir = config_entity.output_dir
+        self.memes_dir = config_entity.memes_dir
+
+class ImageEncoderConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.output_format = config_entity.output_format
+        self.jpeg_quality = config_entity.jpeg_quality
+        self.webp_quality = config_entity.webp_quality
+        self.webp_method = config_entity.webp_method
+        self.png_compress_level = config_entity.png_compress_level
+        self.png_optimize = config_entity.png_optimize
+        self.output_max_dimension = config_entity.output_max_dimension
+
+class MemeCacheConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.mode = config_entity.meme_cache_mode
+        self.ttl_seconds = config_entity.meme_cache_ttl_seconds
+        self.max_topics = config_entity.meme_cache_max_topics
+        self.image_backend = config_entity.meme_image_cache_backend
+        self.image_max_bytes = config_entity.meme_image_cache_max_bytes
+        self.disk_dir = os.path.join(config_entity.output_dir, config_entity.memes_dir, config_entity.meme_cache_dir)
+        self.fallback_dialogues = config_entity.fallback_dialogues
+
+class JobQueueConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.store_backend = config_entity.job_store_backend
+        self.db_path = os.path.join(config_entity.output_dir, config_entity.job_db_file)
+        self.output_dir = os.path.join(config_entity.output_dir, config_entity.memes_dir)
+        self.workers = config_entity.job_workers
+        self.max_depth = config_entity.job_queue_max_depth
+        self.poll_seconds = config_entity.job_poll_seconds
+        self.lease_seconds = config_entity.job_lease_seconds
+        self.result_ttl = config_entity.job_result_ttl
+        self.callback_timeout = config_entity.job_callback_timeout
+        self.callback_allowed_hosts = config_entity.job_callback_allowed_hosts
+        self.lock_timeout = config_entity.file_lock_timeout
+        self.retry_after_seconds = config_entity.retry_after_seconds
+
+class ServerConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.host = config_entity.server_host
+        self.port = config_entity.server_port
+        self.workers = config_entity.server_workers
+        self.preload = config_entity.server_preload
+        self.graceful_timeout = config_entity.server_graceful_timeout
+
+class MetricsConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.enabled = config_entity.metrics_enabled
+        self.server_timing = config_entity.server_timing
+        self.latency_buckets = config_entity.metrics_latency_buckets
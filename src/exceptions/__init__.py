@@ -16,4 +16,14 @@ class CustomException(Exception):
    
     def __str__(self):
         return self.error_message
-   
\ No newline at end of file
+
+
+class ServiceOverloadedException(Exception):
+    """Raised when admission control rejects work; `retry_after` is the suggested wait in seconds."""
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMUnavailableException(Exception):
+    """Raised by the resilient LLM client when a call can't succeed (retries exhausted, deadline hit or circuit open)."""
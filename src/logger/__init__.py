@@ -1,15 +1,159 @@
 import logging
+import logging.handlers
+import multiprocessing
+import itertools
+import atexit
+import queue
+import json
 import os
-from datetime import datetime
- 
-LOG_FILE=f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
-logs_path=os.path.join(os.getcwd(),"logs",LOG_FILE)
-os.makedirs(logs_path,exist_ok=True)
- 
-LOG_FILE_PATH=os.path.join(logs_path,LOG_FILE)
- 
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
-)
\ No newline at end of file
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from src.constants import (
+    LOG_DIR, LOG_FILE_NAME, LOG_LEVEL, LOG_FORMAT, LOG_MAX_MB, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE,
+    LOG_INFO_SAMPLE_RATE, LOG_TO_STDERR, LOG_FILE_PER_PROCESS,
+)
+
+TEXT_FORMAT = "[ %(asctime)s ] %(request_id)s %(lineno)d %(name)s - %(levelname)s - %(message)s"
+
+# Set per request by the HTTP middleware; attached to every record logged while handling it
+request_id_var = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not `extra=` fields
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id"}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps the current request ID on the record (runs in the calling thread, before queuing)."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class InfoSampler(logging.Filter):
+    """
+    Keeps one in `every` INFO/DEBUG records per call site (the first always
+    passes); WARNING and above are never sampled out.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counters = {}
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        if self.every == 0:
+            self.sampled_out += 1
+            return False
+        key = (record.pathname, record.lineno)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters.setdefault(key, itertools.count())
+        if next(counter) % self.every == 0:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of blocking or raising."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request ID and any `extra=` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "pid": record.process,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for name, value in record.__dict__.items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class LazyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that creates the log directory on first write instead of at import."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+def log_file_path(per_process: bool = False) -> str:
+    name = LOG_FILE_NAME
+    # Rotation is not safe across processes, so render/worker child processes write their own file
+    if per_process or LOG_FILE_PER_PROCESS or multiprocessing.parent_process() is not None:
+        base, ext = os.path.splitext(name)
+        name = f"{base}.{os.getpid()}{ext}"
+    return os.path.join(os.getcwd(), LOG_DIR, name)
+
+
+def configure_logging(per_process: bool = False):
+    """
+    Route the root logger through a bounded queue: request threads only
+    enqueue records, and a QueueListener thread does the formatting and
+    file I/O (size-based rotation, optional stderr copy).
+    """
+    global LOG_FILE_PATH, _queue_handler
+    path = LOG_FILE_PATH = log_file_path(per_process)
+
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [LazyRotatingFileHandler(
+        path, maxBytes=int(LOG_MAX_MB * 1024 * 1024), backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True,
+    )]
+    if LOG_TO_STDERR:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_handler.sampler = InfoSampler(LOG_INFO_SAMPLE_RATE)
+    queue_handler.addFilter(queue_handler.sampler)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+
+def logging_stats() -> dict:
+    return {
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+        "sampled_out": _queue_handler.sampler.sampled_out,
+    }
+
+
+configure_logging()
+# A forked child inherits the queue but not the listener thread: give it its own
+os.register_at_fork(after_in_child=lambda: configure_logging(per_process=True))
@@ -0,0 +1,249 @@
+from src.exceptions import CustomException, ServiceOverloadedException
+from src.logger import logging
+from src.pipeline.component_registry import PipelineComponents
+from src.pipeline.run_meme_generator_pipeline import pipeline_result
+from src.components.render_service import RenderService, render_job
+from src.utils.bounded_executor import BoundedExecutor
+from src.utils.image_encoder import EncodingOptions
+from src.utils.metrics import track_stage, FALLBACKS
+from src.utils.meme_cache import CACHE_RESULTS
+from src.entity.artifact_entity import EncodedImageArtifact
+
+import asyncio
+import base64
+import time
+import sys
+import os
+
+import httpx
+
+
+class AdmissionSlot:
+    """A request's place in the runner's in-flight count; `release` may be called more than once."""
+
+    def __init__(self, runner):
+        self._runner = runner
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._runner._inflight -= 1
+
+
+class AsyncPipelineRunner:
+    """
+    Event-loop native version of `run_pipeline_with_components`.
+
+    Model calls and template downloads are awaited directly; only the
+    CPU-bound Pillow rendering is sent to a dedicated render executor
+    (threads, or worker processes when RENDER_BACKEND=process).
+    Admission happens up front: requests beyond MAX_INFLIGHT_REQUESTS, or
+    arriving while the render backlog exceeds RENDER_WORKERS +
+    RENDER_QUEUE_DEPTH, are rejected with ServiceOverloadedException before
+    any model call is made.
+    """
+
+    def __init__(self, components: PipelineComponents, render_executor=None):
+        config = components.pipeline_config
+        self.components = components
+        self.max_inflight = config.max_inflight_requests
+        self.retry_after = config.retry_after_seconds
+        self.render_service = None
+        if render_executor is None:
+            executor = None
+            if config.render_backend == "process":
+                self.render_service = RenderService(
+                    workers=config.render_workers, warm_templates=config.render_warm_templates
+                )
+                executor = self.render_service.executor
+            render_executor = BoundedExecutor(
+                max_workers=config.render_workers,
+                max_queue=config.render_queue_depth,
+                executor=executor,
+            )
+        self.render_executor = render_executor
+        self.http_client = httpx.AsyncClient(follow_redirects=True)
+        self._inflight = 0
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def check_admission(self):
+        if self._inflight >= self.max_inflight or self.render_executor.saturated():
+            raise ServiceOverloadedException(
+                f"Server busy ({self._inflight} requests in flight)", retry_after=self.retry_after
+            )
+
+    def admit(self) -> AdmissionSlot:
+        """Check admission and take an in-flight slot in the same step, with no await in between."""
+        self.check_admission()
+        self._inflight += 1
+        return AdmissionSlot(self)
+
+    async def run(self, topic_name: str, fused: bool = None, encoding: EncodingOptions = None):
+        slot = self.admit()
+        try:
+            return await self._run(topic_name, fused, encoding)
+        finally:
+            slot.release()
+
+    async def _run(self, topic_name: str, fused: bool, encoding: EncodingOptions):
+        try:
+            components = self.components
+            memes_generator = components.memes_generator
+            meme_cache = components.meme_cache
+            encoding = encoding or memes_generator.default_encoding
+            with track_stage("ingest"):
+                text = components.topic_ingestion.initiate_topic_ingestion(topic_name).topic_name
+
+            cached = meme_cache.lookup(text)
+            encoded = meme_cache.get_image(cached, encoding)
+            if encoded is not None:
+                meme_cache.record("hit")
+                return pipeline_result(cached.emotion_name, encoded, cache_status="hit")
+
+            if cached is not None and cached.dialogues is not None:
+                emotion, dialogues, template_path, status = (
+                    cached.emotion_name, cached.dialogues, cached.template_path, "content"
+                )
+            elif cached is not None:
+                emotion, status = cached.emotion_name, "emotion"
+                with track_stage("dialogues"):
+                    dialogues = await memes_generator.generate_meme_dialogues_async(text, emotion)
+                with track_stage("template"):
+                    template_path = await memes_generator.select_template_async(emotion, self.http_client)
+            else:
+                if fused is None:
+                    fused = components.pipeline_config.fused_generation
+                emotion, dialogues = await self.generate_meme_content(text, fused)
+                with track_stage("template"):
+                    template_path = await memes_generator.select_template_async(emotion, self.http_client)
+                status = "miss"
+                meme_cache.store(text, emotion, dialogues, template_path)
+
+            encoded = await self.render(template_path, dialogues[0], dialogues[1], encoding)
+            meme_cache.put_image(dialogues, template_path, encoding, encoded)
+            meme_cache.record(status)
+            logging.info("Meme generated in-memory successfully.")
+
+            return pipeline_result(emotion, encoded, cache_status=CACHE_RESULTS[status])
+        except ServiceOverloadedException:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    async def stream(self, topic_name: str, encoding: EncodingOptions = None):
+        """
+        Run the pipeline and yield an event dict as each stage completes:
+        emotion, dialogue_delta (as the model streams), dialogues, template,
+        image (base64) and done - or a single error event. Every event carries
+        `elapsed_ms`. Take a slot with `admit` before returning the response and
+        release it once the response is done; the stream itself doesn't count
+        towards the in-flight limit, so its body may start later.
+        """
+        started = time.perf_counter()
+
+        def event(name, **data):
+            return {"event": name, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1), **data}
+
+        template_task = None
+        try:
+            components = self.components
+            memes_generator = components.memes_generator
+            meme_cache = components.meme_cache
+            encoding = encoding or memes_generator.default_encoding
+            with track_stage("ingest"):
+                text = components.topic_ingestion.initiate_topic_ingestion(topic_name).topic_name
+
+            cached = meme_cache.lookup(text)
+            encoded = meme_cache.get_image(cached, encoding)
+            if encoded is not None:
+                status = "hit"
+            elif cached is not None and cached.dialogues is None:
+                status = "emotion"
+            elif cached is not None:
+                status = "content"
+            else:
+                status = "miss"
+
+            if cached is not None:
+                emotion = cached.emotion_name
+            else:
+                with track_stage("emotion"):
+                    emotion = (await components.emotion_analyzer.analyze_emotion_async(text)).emotion_name
+            yield event("emotion", emotion=emotion)
+
+            if cached is not None and cached.dialogues is not None:
+                dialogues, template_path = cached.dialogues, cached.template_path
+            else:
+                # Template selection (and any download) overlaps with the dialogue stream
+                template_task = asyncio.ensure_future(self._select_template(emotion))
+                with track_stage("dialogues"):
+                    async for kind, value in memes_generator.stream_meme_dialogues_async(text, emotion):
+                        if kind == "delta":
+                            yield event("dialogue_delta", text=value)
+                        else:
+                            dialogues = value
+                template_path = await template_task
+                if cached is None:
+                    meme_cache.store(text, emotion, dialogues, template_path)
+            yield event("dialogues", upper=dialogues[0], lower=dialogues[1])
+            yield event("template", template_id=os.path.basename(template_path))
+
+            if encoded is None:
+                encoded = await self.render(template_path, dialogues[0], dialogues[1], encoding)
+                meme_cache.put_image(dialogues, template_path, encoding, encoded)
+            meme_cache.record(status)
+            yield event(
+                "image",
+                media_type=encoded.media_type,
+                format=encoded.format,
+                byte_size=encoded.byte_size,
+                image_base64=base64.b64encode(encoded.data).decode("ascii"),
+            )
+            yield event("done", cache=CACHE_RESULTS[status])
+        except Exception as e:
+            logging.error(f"Streaming pipeline failed: {e}")
+            yield event("error", detail=str(e))
+        finally:
+            if template_task is not None and not template_task.done():
+                template_task.cancel()
+
+    async def _select_template(self, emotion: str) -> str:
+        with track_stage("template"):
+            return await self.components.memes_generator.select_template_async(emotion, self.http_client)
+
+    async def render(self, template_path, upper_text, lower_text, encoding: EncodingOptions = None) -> EncodedImageArtifact:
+        encoding = encoding or self.components.memes_generator.default_encoding
+        # Includes time spent queued for a render worker
+        with track_stage("render"):
+            if self.render_service is not None:
+                job = self.render_service.make_job(template_path, upper_text, lower_text, encoding)
+                return await self.render_executor.run(render_job, job)
+            return await self.render_executor.run(
+                self.components.memes_generator.render_meme, template_path, upper_text, lower_text, encoding
+            )
+
+    async def generate_meme_content(self, text: str, fused: bool):
+        """Async counterpart of `generate_meme_content` in run_meme_generator_pipeline."""
+        components = self.components
+        if fused:
+            try:
+                with track_stage("fused"):
+                    content = await components.memes_generator.generate_fused_content_async(text)
+                return content.emotion_name, (content.upper_text, content.lower_text)
+            except CustomException as e:
+                FALLBACKS.inc(kind="fused")
+                logging.warning(f"Falling back to two-call generation: {e}")
+
+        with track_stage("emotion"):
+            emotion = (await components.emotion_analyzer.analyze_emotion_async(text)).emotion_name
+        with track_stage("dialogues"):
+            dialogues = await components.memes_generator.generate_meme_dialogues_async(text, emotion)
+        return emotion, dialogues
+
+    async def aclose(self):
+        await self.http_client.aclose()
+        self.render_executor.shutdown(wait=False)
@@ -0,0 +1,87 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, EmotionAnalyzerConfigEntity, PipelineConfigEntity, MemeCacheConfigEntity
+from src.components.topic_ingestion import TopicIngestion
+from src.components.emotion_analyzer import EmotionAnalyzer
+from src.components.memes_generator import MemesGenerator
+from src.utils.meme_cache import MemeResultCache
+from src.utils.llm_client import ResilientModel
+
+from dataclasses import dataclass
+import threading
+import sys
+
+
+@dataclass
+class PipelineComponents:
+    """
+    Prebuilt pipeline components shared by every request in the process.
+    """
+    topic_ingestion: TopicIngestion
+    emotion_analyzer: EmotionAnalyzer
+    memes_generator: MemesGenerator
+    pipeline_config: PipelineConfigEntity
+    meme_cache: MemeResultCache
+
+
+def build_generative_model():
+    """Configure Gemini once and return a single (resilient) GenerativeModel for the whole process."""
+    try:
+        # Imported here so importing the app stays cheap; the startup warm-up pays for it
+        import google.generativeai as genai
+
+        config = EmotionAnalyzerConfigEntity(config_entity=ConfigEntity())
+        genai.configure(api_key=config.gemini_api_key)
+        model = genai.GenerativeModel(config.gemini_model_name)
+        # Timeouts, retries, circuit breaker and optional hedging around every call
+        return ResilientModel(model) if config.llm_resilient else model
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class ComponentRegistry:
+    """
+    Builds the pipeline components once and hands the same instances to every caller.
+
+    The components hold no per-request state, so they are shared across worker
+    threads as-is; the lock only guards the one-time construction.
+    """
+
+    def __init__(self, model_factory=build_generative_model):
+        self._model_factory = model_factory
+        self._components = None
+        self._lock = threading.Lock()
+
+    def get(self) -> PipelineComponents:
+        components = self._components
+        if components is not None:
+            return components
+
+        with self._lock:
+            if self._components is None:
+                self._components = self._build()
+            return self._components
+
+    def _build(self) -> PipelineComponents:
+        try:
+            logging.info("Building shared pipeline components...")
+            model = self._model_factory()
+            components = PipelineComponents(
+                topic_ingestion=TopicIngestion(),
+                emotion_analyzer=EmotionAnalyzer(model=model),
+                memes_generator=MemesGenerator(model=model),
+                pipeline_config=PipelineConfigEntity(config_entity=ConfigEntity()),
+                meme_cache=MemeResultCache(MemeCacheConfigEntity(config_entity=ConfigEntity())),
+            )
+            logging.info("Shared pipeline components ready.")
+            return components
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def reset(self):
+        """Drop the cached components so the next `get()` rebuilds them."""
+        with self._lock:
+            self._components = None
+
+
+component_registry = ComponentRegistry()
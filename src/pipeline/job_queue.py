@@ -0,0 +1,292 @@
+from src.exceptions import CustomException, ServiceOverloadedException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, JobQueueConfigEntity
+from src.entity.artifact_entity import MemeJobArtifact
+from src.pipeline.component_registry import component_registry
+from src.pipeline.run_meme_generator_pipeline import run_pipeline_with_components
+from src.utils import generate_unique_filename
+from src.utils.image_encoder import EncodingOptions, normalize_format
+from src.utils.job_store import build_job_store
+from src.utils.metrics import JOB_WAIT_SECONDS, JOB_RUN_SECONDS, JOBS_FINISHED, JOB_CALLBACKS
+from src.utils.shared_files import atomic_file
+
+from urllib.parse import urlsplit
+import ipaddress
+import threading
+import socket
+import uuid
+import time
+import os
+
+import httpx
+
+
+def job_record(job: MemeJobArtifact) -> dict:
+    """What GET /jobs/{id} (and the completion callback) reports about a job."""
+    record = {
+        "job_id": job.job_id,
+        "status": job.status,
+        "topic": job.topic,
+        "priority": job.priority,
+        "format": job.format,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "wait_ms": round((job.started_at - job.created_at) * 1000, 1) if job.started_at else None,
+        "run_ms": round((job.finished_at - job.started_at) * 1000, 1) if job.finished_at and job.started_at else None,
+        "cancel_requested": job.cancel_requested,
+    }
+    if job.status == "succeeded":
+        record.update(emotion=job.emotion_name, output_path=job.output_path, media_type=job.media_type,
+                      byte_size=job.byte_size, image_url=f"/jobs/{job.job_id}/image")
+    if job.error:
+        record["error"] = job.error
+    return record
+
+
+def callback_url_error(url: str, allowed_hosts):
+    """
+    Why job callbacks may not be POSTed to `url`, or None if they may. The
+    host must be in `allowed_hosts` and resolve to public addresses only, so
+    a client can't make the server call loopback, private or cloud metadata
+    addresses.
+    """
+    parsed = urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return "callback_url must be an http(s) URL."
+    if not allowed_hosts:
+        return "Job callbacks are disabled (JOB_CALLBACK_ALLOWED_HOSTS is not set)."
+    host = parsed.hostname.lower()
+    if host not in allowed_hosts:
+        return f"callback_url host '{host}' is not allowed."
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    except ValueError:
+        return "callback_url has an invalid port."
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError as e:
+        return f"callback_url host '{host}' can't be resolved: {e}"
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            return f"callback_url host '{host}' resolves to a non-public address ({address})."
+    return None
+
+
+class JobQueue:
+    """
+    Background meme generation, for clients that shouldn't hold a connection
+    open for the whole model + render latency.
+
+    `submit` stores a queued job and returns at once. `workers` threads claim
+    jobs from the store (highest priority first, then oldest), run the shared
+    pipeline and write the image under artifacts/memes. Jobs queued by other
+    server processes are picked up within `poll_seconds`. A queued job can be
+    cancelled outright; a running one finishes its model calls but is
+    dropped before its image is saved. On shutdown, jobs still running here
+    go back to the queue. A heartbeat thread renews the leases of the jobs
+    running here every third of `lease_seconds` and requeues jobs whose lease
+    lapsed, e.g. because the process that claimed them crashed. It also
+    deletes jobs finished more than `result_ttl` seconds ago, with their
+    images.
+    """
+
+    def __init__(self, store=None, config: JobQueueConfigEntity = None, components_factory=None,
+                 encoding: EncodingOptions = None):
+        self.config = config or JobQueueConfigEntity(config_entity=ConfigEntity())
+        self.store = store if store is not None else build_job_store(self.config)
+        self.components_factory = components_factory or component_registry.get
+        self.encoding = encoding or EncodingOptions.from_config()
+        self._wakeup = threading.Semaphore(0)
+        self._stop = threading.Event()
+        self._threads = []
+        self._heartbeat = None
+        # Unique per queue instance: a restarted container can reuse the PID of the process before it
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def start(self):
+        self._requeue_expired()
+        self._purge_finished()
+        for i in range(self.config.workers):
+            thread = threading.Thread(target=self._work, args=(f"{self._worker_prefix}/job-worker-{i}",),
+                                      name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._heartbeat = threading.Thread(target=self._housekeeping, name="job-heartbeat", daemon=True)
+        self._heartbeat.start()
+        logging.info(f"Job queue started with {self.config.workers} worker(s)")
+
+    def close(self, timeout: float = 5):
+        """Stop the workers; jobs they can't finish within `timeout` seconds are requeued."""
+        self._stop.set()
+        for _ in self._threads:
+            self._wakeup.release()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        stuck = {f"{self._worker_prefix}/{thread.name}" for thread in self._threads if thread.is_alive()}
+        if stuck:
+            logging.warning(f"Requeued {self.store.requeue(stuck)} unfinished job(s) on shutdown")
+        if self._heartbeat is not None:
+            self._heartbeat.join(max(0.0, deadline - time.monotonic()))
+            self._heartbeat = None
+        self._threads = []
+
+    def submit(self, topic: str, priority: int = 0, format: str = None, callback_url: str = None) -> MemeJobArtifact:
+        if self.store.stats()["queued"] >= self.config.max_depth:
+            raise ServiceOverloadedException(
+                f"Job queue full ({self.config.max_depth} jobs queued)", retry_after=self.config.retry_after_seconds
+            )
+        job = self.store.add(MemeJobArtifact(
+            job_id=uuid.uuid4().hex, topic=topic, status="queued", priority=priority, format=normalize_format(format),
+            callback_url=callback_url, created_at=time.time(),
+        ))
+        self._wakeup.release()
+        return job
+
+    def callback_url_error(self, url: str):
+        return callback_url_error(url, self.config.callback_allowed_hosts)
+
+    def get(self, job_id: str):
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str):
+        return self.store.cancel(job_id)
+
+    def stats(self) -> dict:
+        stats = self.store.stats()
+        oldest = stats.pop("oldest_queued_at")
+        stats["oldest_queued_seconds"] = round(time.time() - oldest, 3) if oldest is not None else 0.0
+        stats["workers"] = len(self._threads)
+        return stats
+
+    def _housekeeping(self):
+        workers = [f"{self._worker_prefix}/{thread.name}" for thread in self._threads]
+        while not self._stop.wait(self.config.lease_seconds / 3):
+            try:
+                self.store.renew(workers)
+            except CustomException as e:
+                logging.error(f"Could not renew job leases: {e}")
+            self._requeue_expired()
+            self._purge_finished()
+
+    def _requeue_expired(self):
+        try:
+            requeued = self.store.requeue_expired()
+        except CustomException as e:
+            logging.error(f"Could not requeue expired jobs: {e}")
+            return
+        if requeued:
+            logging.warning(f"Requeued {requeued} job(s) whose worker stopped renewing its lease")
+            for _ in range(requeued):
+                self._wakeup.release()
+
+    def _purge_finished(self):
+        if self.config.result_ttl <= 0:
+            return
+        try:
+            output_paths = self.store.purge(time.time() - self.config.result_ttl)
+        except CustomException as e:
+            logging.error(f"Could not delete expired jobs: {e}")
+            return
+        for output_path in output_paths:
+            self._remove_image(output_path)
+        if output_paths:
+            logging.info(f"Deleted {len(output_paths)} expired job image(s)")
+
+    @staticmethod
+    def _remove_image(output_path: str):
+        try:
+            os.remove(output_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"Could not delete job image {output_path}: {e}")
+
+    def _work(self, worker: str):
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim(worker)
+            except CustomException as e:
+                logging.error(f"Could not claim a job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.acquire(timeout=self.config.poll_seconds)
+                continue
+            self._process(job, worker)
+
+    def _process(self, job: MemeJobArtifact, worker: str):
+        JOB_WAIT_SECONDS.observe(max(0.0, job.started_at - job.created_at))
+        started = time.perf_counter()
+        output_path = None
+        try:
+            encoding = self.encoding.with_format(job.format) if job.format else self.encoding
+            result = run_pipeline_with_components(job.topic, self.components_factory(), None, encoding)
+            if self.store.cancel_requested(job.job_id):
+                finished = self.store.finish(job.job_id, worker, "cancelled")
+            else:
+                os.makedirs(self.config.output_dir, exist_ok=True)
+                output_path = os.path.join(
+                    self.config.output_dir, generate_unique_filename(job.topic, extension=result["format"])
+                )
+                with atomic_file(output_path, "wb") as f:
+                    f.write(result["image_bytes"].getvalue())
+                finished = self.store.finish(
+                    job.job_id, worker, "succeeded", emotion_name=result["emotion"], output_path=output_path,
+                    media_type=result["media_type"], byte_size=result["byte_size"],
+                )
+        except Exception as e:
+            logging.error(f"Job {job.job_id} ('{job.topic}') failed: {e}")
+            try:
+                finished = self.store.finish(job.job_id, worker, "failed", error=str(e))
+            except CustomException as store_error:
+                logging.error(f"Could not record the failure of job {job.job_id}: {store_error}")
+                if output_path:
+                    self._remove_image(output_path)
+                return
+        finally:
+            JOB_RUN_SECONDS.observe(time.perf_counter() - started)
+
+        if output_path and (finished is None or finished.output_path != output_path):
+            # No job row points at this image (reassigned, or saving the result failed), so no purge would delete it
+            self._remove_image(output_path)
+        if finished is None:
+            # Requeued (shutdown timeout) and handed to another worker in the meantime
+            logging.warning(f"Job {job.job_id} was reassigned before it finished here")
+            return
+        JOBS_FINISHED.inc(status=finished.status)
+        if finished.callback_url:
+            self._callback(finished)
+
+    def _callback(self, job: MemeJobArtifact):
+        # Checked again at send time: the allowlist may have changed, or the host now resolves elsewhere
+        error = self.callback_url_error(job.callback_url)
+        if error:
+            JOB_CALLBACKS.inc(result="rejected")
+            logging.warning(f"Skipped the callback for job {job.job_id}: {error}")
+            return
+        try:
+            # Redirects are not followed (httpx default), so the checked host is the one called
+            response = httpx.post(job.callback_url, json=job_record(job), timeout=self.config.callback_timeout)
+            response.raise_for_status()
+            JOB_CALLBACKS.inc(result="ok")
+        except Exception as e:
+            JOB_CALLBACKS.inc(result="error")
+            logging.warning(f"Callback for job {job.job_id} to {job.callback_url} failed: {e}")
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue over the configured store (workers start with `start()`)."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,226 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.pipeline.component_registry import PipelineComponents, component_registry
+from src.entity.artifact_entity import BatchMemeItemArtifact
+from src.utils import generate_unique_filename
+from src.utils.shared_files import atomic_file
+from src.utils.image_encoder import EncodingOptions, MEDIA_TYPES, normalize_format
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import zipfile
+import base64
+import json
+import time
+import io
+import os
+import sys
+
+
+def read_topics(path: str) -> list:
+    """Topics from a file: a JSON list, or one topic per line (blank lines and '#' comments skipped)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        if path.endswith(".json"):
+            return [str(topic) for topic in json.loads(content)]
+        return [line.strip() for line in content.splitlines() if line.strip() and not line.startswith("#")]
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def _generate_item(index: int, text: str, emotion: str, components: PipelineComponents,
+                   encoding: EncodingOptions, save_dir: str, render_service, started: float):
+    memes_generator = components.memes_generator
+    try:
+        upper_text, lower_text = memes_generator.generate_meme_dialogues(text, emotion)
+        template_path = memes_generator.select_template(emotion)
+        if render_service is not None:
+            encoded = render_service.render(template_path, upper_text, lower_text, encoding)
+        else:
+            encoded = memes_generator.render_meme(template_path, upper_text, lower_text, encoding)
+        if encoded.is_error:
+            raise RuntimeError(f"Rendering failed for template {template_path}")
+
+        saved_path = None
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+            saved_path = os.path.join(save_dir, generate_unique_filename(text, extension=encoded.format))
+            with atomic_file(saved_path, "wb") as f:
+                f.write(encoded.data)
+
+        return BatchMemeItemArtifact(
+            index=index, topic=text, status="ok", emotion_name=emotion, encoded=encoded, saved_path=saved_path,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+    except Exception as e:
+        logging.warning(f"Batch item {index} ('{text}') failed: {e}")
+        return BatchMemeItemArtifact(
+            index=index, topic=text, status="error", emotion_name=emotion, error=str(e),
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+
+
+def generate_meme_batch(topics: list, components: PipelineComponents, encoding: EncodingOptions = None,
+                        save_dir: str = None, workers: int = None, render_service=None):
+    """
+    Generate memes for many topics, yielding a BatchMemeItemArtifact per topic as each finishes.
+
+    Emotions are classified up front in as few model calls as possible
+    (EmotionAnalyzer.analyze_emotions_batch); dialogues, template selection and
+    rendering then run concurrently on `workers` threads, with rendering sent
+    to `render_service` worker processes when one is given. A failing topic
+    yields an item with status "error" instead of stopping the batch.
+    """
+    encoding = encoding or components.memes_generator.default_encoding
+    workers = workers or components.pipeline_config.batch_workers
+    started = time.perf_counter()
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="meme-batch")
+    try:
+        texts = {}
+        for index, topic in enumerate(topics):
+            try:
+                texts[index] = components.topic_ingestion.initiate_topic_ingestion(topic).topic_name
+            except Exception as e:
+                yield BatchMemeItemArtifact(index=index, topic=topic, status="error", error=str(e))
+
+        emotions = components.emotion_analyzer.analyze_emotions_batch(list(texts.values()), executor)
+        futures = []
+        for (index, text), emotion in zip(texts.items(), emotions):
+            if isinstance(emotion, Exception):
+                yield BatchMemeItemArtifact(index=index, topic=text, status="error", error=str(emotion))
+                continue
+            futures.append(executor.submit(
+                _generate_item, index, text, emotion.emotion_name, components, encoding, save_dir,
+                render_service, started,
+            ))
+
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Also reached when a consumer stops early (e.g. a client disconnects mid-stream)
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def batch_summary(items: list, seconds: float) -> dict:
+    succeeded = sum(1 for item in items if item.status == "ok")
+    return {
+        "total": len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "seconds": round(seconds, 3),
+        "memes_per_sec": round(succeeded / seconds, 2) if seconds > 0 else 0.0,
+    }
+
+
+def batch_item_record(item: BatchMemeItemArtifact, include_image: bool = True) -> dict:
+    """JSON-serializable view of a batch item (the image is base64-encoded unless it was saved to disk)."""
+    record = {"index": item.index, "topic": item.topic, "status": item.status, "emotion": item.emotion_name,
+              "elapsed_ms": item.elapsed_ms}
+    if item.status != "ok":
+        record["error"] = item.error
+        return record
+    record.update(format=item.encoded.format, media_type=item.encoded.media_type, byte_size=item.encoded.byte_size)
+    if item.saved_path:
+        record["path"] = item.saved_path
+    elif include_image:
+        record["image_base64"] = base64.b64encode(item.encoded.data).decode("ascii")
+    return record
+
+
+def iter_batch_ndjson(items):
+    """NDJSON lines: one record per item as it completes, then a final {"summary": ...} line."""
+    started = time.perf_counter()
+    finished = []
+    for item in items:
+        finished.append(item)
+        yield json.dumps(batch_item_record(item)) + "\n"
+    summary = batch_summary(finished, time.perf_counter() - started)
+    logging.info(f"Batch finished: {summary}")
+    yield json.dumps({"summary": summary}) + "\n"
+
+
+def build_batch_zip(items) -> tuple:
+    """Zip every generated image plus a results.json with per-item outcomes; returns (zip bytes, summary)."""
+    started = time.perf_counter()
+    finished = []
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for item in items:
+            finished.append(item)
+            if item.status == "ok":
+                name = f"{item.index:04d}_{generate_unique_filename(item.topic, extension=item.encoded.format)}"
+                archive.writestr(name, item.encoded.data)
+        summary = batch_summary(finished, time.perf_counter() - started)
+        results = [batch_item_record(item, include_image=False) for item in sorted(finished, key=lambda i: i.index)]
+        archive.writestr("results.json", json.dumps({"summary": summary, "results": results}, indent=2))
+    logging.info(f"Batch finished: {summary}")
+    return buffer.getvalue(), summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate memes for a list of topics.")
+    parser.add_argument("topics_file", nargs="?", help="text file with one topic per line, or a JSON list")
+    parser.add_argument("--topic", action="append", default=[], help="a topic (repeatable)")
+    parser.add_argument("--format", help="png, jpeg or webp (default: OUTPUT_FORMAT)")
+    parser.add_argument("--workers", type=int, help="concurrent topics (default: BATCH_WORKERS)")
+    parser.add_argument("--output-dir", help="where images are written (default: artifacts/memes)")
+    parser.add_argument("--zip", help="write a zip archive here instead of individual files")
+    parser.add_argument("--ndjson", help="write NDJSON results (images base64-encoded) here instead of files")
+    args = parser.parse_args(argv)
+
+    try:
+        topics = (read_topics(args.topics_file) if args.topics_file else []) + args.topic
+        if not topics:
+            parser.error("no topics given")
+        if args.format and not normalize_format(args.format):
+            parser.error(f"unsupported format '{args.format}' (supported: {', '.join(MEDIA_TYPES)})")
+
+        components = component_registry.get()
+        encoding = components.memes_generator.default_encoding.with_format(args.format)
+        config = components.pipeline_config
+        render_service = None
+        if config.render_backend == "process":
+            from src.components.render_service import RenderService
+            render_service = RenderService(workers=config.render_workers, warm_templates=config.render_warm_templates)
+
+        try:
+            if args.zip:
+                data, summary = build_batch_zip(generate_meme_batch(
+                    topics, components, encoding, workers=args.workers, render_service=render_service
+                ))
+                with atomic_file(args.zip, "wb") as f:
+                    f.write(data)
+            elif args.ndjson:
+                with atomic_file(args.ndjson, "w", encoding="utf-8") as f:
+                    for line in iter_batch_ndjson(generate_meme_batch(
+                        topics, components, encoding, workers=args.workers, render_service=render_service
+                    )):
+                        f.write(line)
+                summary = json.loads(line)["summary"]
+            else:
+                save_dir = args.output_dir or os.path.join(config.output_dir, config.memes_dir)
+                started = time.perf_counter()
+                items = []
+                for item in generate_meme_batch(
+                    topics, components, encoding, save_dir=save_dir, workers=args.workers,
+                    render_service=render_service,
+                ):
+                    items.append(item)
+                    print(json.dumps(batch_item_record(item, include_image=False)))
+                summary = batch_summary(items, time.perf_counter() - started)
+        finally:
+            if render_service is not None:
+                render_service.shutdown()
+
+        print(json.dumps({"summary": summary}))
+        return 0 if summary["failed"] == 0 else 1
+    except CustomException as e:
+        logging.error(f"Batch pipeline failed: {e}")
+        print(f"Batch pipeline failed: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,16 @@ from src.logger import logging
 from src.components.topic_ingestion import TopicIngestion
 from src.components.emotion_analyzer import EmotionAnalyzer
 from src.components.memes_generator import MemesGenerator
-from src.utils.image_templates import MemeTemplates
+from src.utils.template_index import get_template_index
+from src.utils.template_prefetcher import get_template_prefetcher
+from src.utils.template_layouts import get_layout_index
+from src.utils.template_cache import rebuild_template_pack
+from src.pipeline.component_registry import PipelineComponents
+from src.utils.image_encoder import EncodingOptions
+from src.utils.metrics import track_stage, FALLBACKS
+from src.utils.meme_cache import CACHE_RESULTS
+from src.entity.artifact_entity import EncodedImageArtifact
+from dataclasses import asdict
 from io import BytesIO
 
 import sys
@@ -23,11 +32,30 @@ def analyze_emotion(text: str):
     except Exception as e:
         raise CustomException(e, sys)
 
-def fetch_image_templates():
+def fetch_image_templates(incremental: bool = None):
     try:
+        # pandas and the Supabase client are only needed here: import them on first sync, not at startup
+        from src.utils.image_templates import MemeTemplates
+
         meme_temp = MemeTemplates()
-        meme_temp.get_emotion_images()
-        return {"status": "success", "message": "Templates fetched successfully"}
+        catalog = meme_temp.get_emotion_images(incremental=incremental)
+        get_template_index().reload()
+        response = {"status": "success", "message": "Templates fetched successfully"}
+        if catalog is not None:
+            response["catalog"] = asdict(catalog)
+        return response
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def prefetch_templates():
+    """Download every template in the current emotion map and refresh the index's view of local files."""
+    try:
+        template_index = get_template_index()
+        manifest = get_template_prefetcher().prefetch(template_index.emotion_url_map())
+        template_index.reload()
+        get_layout_index().profile_dir()
+        rebuild_template_pack()
+        return manifest["summary"]
     except Exception as e:
         raise CustomException(e, sys)
 
@@ -52,6 +80,87 @@ def run_pipeline(topic_name: str):
         }
     except Exception as e:
         raise CustomException(e, sys)
+
+
+def generate_meme_content(text: str, components: PipelineComponents, fused: bool):
+    """
+    Produce (emotion, (upper_text, lower_text)) for a topic.
+    The fused path uses one structured model call and falls back to the
+    two-call path (emotion, then dialogues) if that response can't be used.
+    """
+    if fused:
+        try:
+            with track_stage("fused"):
+                content = components.memes_generator.generate_fused_content(text)
+            return content.emotion_name, (content.upper_text, content.lower_text)
+        except CustomException as e:
+            FALLBACKS.inc(kind="fused")
+            logging.warning(f"Falling back to two-call generation: {e}")
+
+    with track_stage("emotion"):
+        emotion = components.emotion_analyzer.analyze_emotion(text).emotion_name
+    with track_stage("dialogues"):
+        dialogues = components.memes_generator.generate_meme_dialogues(text, emotion)
+    return emotion, dialogues
+
+
+def pipeline_result(emotion: str, encoded: EncodedImageArtifact, cache_status: str = "miss") -> dict:
+    return {
+        "image_bytes": BytesIO(encoded.data),
+        "emotion": emotion,
+        "media_type": encoded.media_type,
+        "format": encoded.format,
+        "encode_ms": encoded.encode_ms,
+        "byte_size": encoded.byte_size,
+        "cache": cache_status,
+    }
+
+
+def run_pipeline_with_components(topic_name: str, components: PipelineComponents, fused: bool = None,
+                                 encoding: EncodingOptions = None):
+    """
+    Same as `run_pipeline`, but reuses prebuilt components instead of constructing them per call.
+    `fused` overrides the FUSED_GENERATION setting and `encoding` the output encoding for this call.
+    Consults the meme result cache first when MEME_CACHE_MODE is enabled.
+    """
+    try:
+        with track_stage("ingest"):
+            text = components.topic_ingestion.initiate_topic_ingestion(topic_name).topic_name
+        memes_generator = components.memes_generator
+        meme_cache = components.meme_cache
+        encoding = encoding or memes_generator.default_encoding
+
+        cached = meme_cache.lookup(text)
+        encoded = meme_cache.get_image(cached, encoding)
+        if encoded is not None:
+            meme_cache.record("hit")
+            return pipeline_result(cached.emotion_name, encoded, cache_status="hit")
+
+        if cached is not None and cached.dialogues is not None:
+            # Content is cached but the image was evicted (or encoded differently): re-render only
+            emotion, dialogues, image_path, status = cached.emotion_name, cached.dialogues, cached.template_path, "content"
+        elif cached is not None:
+            emotion, status = cached.emotion_name, "emotion"
+            with track_stage("dialogues"):
+                dialogues = memes_generator.generate_meme_dialogues(text, emotion)
+            with track_stage("template"):
+                image_path = memes_generator.select_template(emotion)
+        else:
+            if fused is None:
+                fused = components.pipeline_config.fused_generation
+            emotion, dialogues = generate_meme_content(text, components, fused)
+            with track_stage("template"):
+                image_path = memes_generator.select_template(emotion)
+            status = "miss"
+            meme_cache.store(text, emotion, dialogues, image_path)
+
+        with track_stage("render"):
+            encoded = memes_generator.render_meme(image_path, dialogues[0], dialogues[1], encoding)
+        meme_cache.put_image(dialogues, image_path, encoding, encoded)
+        meme_cache.record(status)
+        return pipeline_result(emotion, encoded, cache_status=CACHE_RESULTS[status])
+    except Exception as e:
+        raise CustomException(e, sys)
     
 if __name__ == "__main__":
     try:
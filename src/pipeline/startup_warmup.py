@@ -0,0 +1,142 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+from src.pipeline.component_registry import component_registry
+from src.utils.template_index import get_template_index
+from src.utils.template_layouts import get_layout_index
+from src.utils.template_cache import template_image_cache
+from src.utils.meme_renderer import draw_meme_text
+from src.utils.image_encoder import EncodingOptions, encode_image, fit_within
+
+import threading
+import asyncio
+import time
+import os
+import sys
+
+from PIL import Image
+
+
+TEMPLATE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Long enough to wrap, so text fitting tries several font sizes
+SAMPLE_CAPTION = "Warm-up caption that is long enough to wrap onto a second line"
+
+
+def warm_model_client():
+    """Import the model SDK, build the shared client and the pipeline components."""
+    component_registry.get()
+
+
+def warm_template_index():
+    """Load the emotion -> template map, the caption layouts and the template pack mapping."""
+    get_template_index().emotions()
+    get_layout_index().stats()
+    template_image_cache.stats()
+
+
+def warm_rendering():
+    """
+    Draw one sample meme and encode a thumbnail of it in every output format,
+    so the first request doesn't pay for loading the caption font or Pillow's
+    decoder and encoder plugins. Uses the first template in template_dir, or
+    a blank image when there is none yet. Goes through the shared caches
+    directly rather than `render_meme`, so the sample stays out of the
+    request metrics.
+    """
+    config = MemeTemplatesEntity(config_entity=ConfigEntity())
+    encoding = EncodingOptions.from_config()
+    names = sorted(
+        name for name in (os.listdir(config.template_dir) if os.path.isdir(config.template_dir) else ())
+        if name.lower().endswith(TEMPLATE_EXTENSIONS)
+    )
+    if names:
+        img = template_image_cache.get(os.path.join(config.template_dir, names[0]), encoding.max_dimension)
+    else:
+        img = Image.new("RGB", (512, 512), color=(128, 128, 128))
+    draw_meme_text(img, SAMPLE_CAPTION, SAMPLE_CAPTION, config.font_path)
+    # Encoding cost scales with the pixels; loading the plugin is what is worth warming
+    thumbnail = fit_within(img, 64)
+    for format in ("png", "jpeg", "webp"):
+        encode_image(thumbnail, encoding.with_format(format))
+
+
+def default_warmup_steps() -> list:
+    return [
+        ("model_client", warm_model_client),
+        ("template_index", warm_template_index),
+        ("rendering", warm_rendering),
+    ]
+
+
+class StartupWarmup:
+    """
+    Runs the startup warm-up steps once, in order, and tracks readiness.
+
+    `ready` only turns true after every step has succeeded; a failing step
+    stops the warm-up and is reported by `status()` (the process stays up so
+    /healthz can say why). Steps run on a worker thread via `start()`, or
+    inline via `run()`.
+    """
+
+    def __init__(self, steps: list = None):
+        self.steps = list(steps) if steps is not None else default_warmup_steps()
+        self.state = "pending"
+        self.error = None
+        self.step_ms = {}
+        self.elapsed_ms = None
+        self._started = None
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    @property
+    def failed(self) -> bool:
+        return self.state == "failed"
+
+    def run(self) -> bool:
+        """Run every step; returns True once warm."""
+        self.state = "warming"
+        self._started = time.perf_counter()
+        logging.info(f"Startup warm-up: {', '.join(name for name, _ in self.steps)}")
+        try:
+            for name, step in self.steps:
+                step_started = time.perf_counter()
+                step()
+                self.step_ms[name] = round((time.perf_counter() - step_started) * 1000, 1)
+            self.state = "ready"
+            logging.info(f"Startup warm-up finished: {self.step_ms}")
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(CustomException(e, sys))
+            logging.error(f"Startup warm-up failed: {self.error}")
+        finally:
+            self.elapsed_ms = round((time.perf_counter() - self._started) * 1000, 1)
+            self._done.set()
+        return self.ready
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, name="startup-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the warm-up finished (or `timeout`); returns whether it is ready."""
+        self._done.wait(timeout)
+        return self.ready
+
+    async def wait_async(self, timeout: float = None) -> bool:
+        return await asyncio.to_thread(self.wait, timeout)
+
+    def status(self) -> dict:
+        elapsed_ms = self.elapsed_ms
+        if elapsed_ms is None and self._started is not None:
+            elapsed_ms = round((time.perf_counter() - self._started) * 1000, 1)
+        return {
+            "status": self.state,
+            "elapsed_ms": elapsed_ms,
+            "steps_ms": dict(self.step_ms),
+            "error": self.error,
+        }
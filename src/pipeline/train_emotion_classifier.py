@@ -0,0 +1,94 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, LocalEmotionClassifierConfigEntity
+from src.components.local_emotion_classifier import BagOfWordsLogisticModel
+
+import argparse
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+TEXT_COLUMNS = ("text", "topic", "topic_name", "dialog", "dialogue", "dialog_text")
+LABEL_COLUMNS = ("emotion", "emotion_label", "emotion_name", "label", "llm_emotion")
+
+
+def pick_column(df: pd.DataFrame, candidates, override: str = None) -> str:
+    if override:
+        if override not in df.columns:
+            raise ValueError(f"Column '{override}' not found; available: {list(df.columns)}")
+        return override
+    for name in candidates:
+        if name in df.columns:
+            return name
+    raise ValueError(f"None of {candidates} found in CSV columns {list(df.columns)}")
+
+
+def load_labeled_csv(path: str, labels, text_column: str = None, label_column: str = None):
+    """(texts, labels) from a CSV, keeping only rows whose label is one of `labels`."""
+    df = pd.read_csv(path)
+    text_column = pick_column(df, TEXT_COLUMNS, text_column)
+    label_column = pick_column(df, LABEL_COLUMNS, label_column)
+
+    df = df[[text_column, label_column]].dropna()
+    df[label_column] = df[label_column].astype(str).str.strip().str.lower()
+    unknown = df[~df[label_column].isin(labels)]
+    if len(unknown):
+        logging.warning(f"Skipping {len(unknown)} rows with labels outside {list(labels)}")
+    df = df[df[label_column].isin(labels)]
+    return df[text_column].astype(str).tolist(), df[label_column].tolist()
+
+
+def train_emotion_classifier(csv_path: str = None, output_path: str = None, holdout: float = 0.2,
+                             epochs: int = 300, text_column: str = None, label_column: str = None) -> dict:
+    """Train the local bag-of-words model, report holdout accuracy and save it where the classifier loads it."""
+    try:
+        config = LocalEmotionClassifierConfigEntity(config_entity=ConfigEntity())
+        csv_path = csv_path or config.training_csv
+        output_path = output_path or config.model_path
+
+        texts, labels = load_labeled_csv(csv_path, config.emotion_templates, text_column, label_column)
+        if len(texts) < 2:
+            raise ValueError(f"Need at least 2 labeled rows in {csv_path}, found {len(texts)}")
+
+        order = np.random.default_rng(0).permutation(len(texts))
+        split = int(len(texts) * (1 - holdout)) if holdout else len(texts)
+        train_idx, test_idx = order[:split], order[split:]
+
+        model = BagOfWordsLogisticModel(config.emotion_templates)
+        model.fit([texts[i] for i in train_idx], [labels[i] for i in train_idx], epochs=epochs)
+
+        report = {"rows": len(texts), "train_rows": len(train_idx), "holdout_rows": len(test_idx)}
+        if len(test_idx):
+            probs = model.predict_proba([texts[i] for i in test_idx])
+            predicted = [model.labels[j] for j in probs.argmax(axis=1)]
+            report["holdout_accuracy"] = round(
+                float(np.mean([p == labels[i] for p, i in zip(predicted, test_idx)])), 4
+            )
+
+        model.save(output_path)
+        report["model_path"] = output_path
+        logging.info(f"Local emotion model trained: {report}")
+        return report
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local emotion classifier from a labeled CSV.")
+    parser.add_argument("--csv", help="labeled CSV (default: EMOTIONS_CSV_PATH)")
+    parser.add_argument("--output", help="model file (default: artifacts/emotion_model.npz)")
+    parser.add_argument("--text-column")
+    parser.add_argument("--label-column")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--epochs", type=int, default=300)
+    args = parser.parse_args()
+    try:
+        print(json.dumps(train_emotion_classifier(
+            args.csv, args.output, args.holdout, args.epochs, args.text_column, args.label_column
+        ), indent=2))
+    except CustomException as e:
+        logging.error(f"Training failed: {e}")
+        sys.exit(1)
@@ -2,9 +2,13 @@ import uuid
 from datetime import datetime
 import re
 
-def generate_unique_filename(topic_name: str, extension="png") -> str:
+def slugify_topic(topic_name: str) -> str:
     # Slugify the topic (remove special characters and spaces)
-    topic_slug = re.sub(r'[^a-zA-Z0-9]+', '_', topic_name.strip().lower())
+    return re.sub(r'[^a-zA-Z0-9]+', '_', topic_name.strip().lower())
+
+
+def generate_unique_filename(topic_name: str, extension="png") -> str:
+    topic_slug = slugify_topic(topic_name)
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     random_id = uuid.uuid4().hex[:6]  # 6-char unique suffix
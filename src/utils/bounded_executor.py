@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import asyncio
+
+
+class BoundedExecutor:
+    """
+    Executor wrapper that tracks how many jobs are waiting or running.
+
+    Jobs are awaited from the event loop via `run()`. Callers check
+    `saturated()` before starting new work, so load is shed at admission
+    instead of after the expensive model calls have already been made.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, executor=None, name: str = "render"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.name = name
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        # Our own threads run jobs in the caller's context (request ID, stage timings); a process pool can't
+        self._copy_context = executor is None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def saturated(self) -> bool:
+        return self._pending >= self.max_workers + self.max_queue
+
+    async def run(self, fn, *args):
+        # Only the event loop thread touches _pending, so no lock is needed
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self._copy_context:
+                return await loop.run_in_executor(self._executor, contextvars.copy_context().run, fn, *args)
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,83 @@
+from src.logger import logging
+
+from collections import OrderedDict
+from io import BytesIO
+import threading
+
+from PIL import ImageFont
+
+
+class FontCache:
+    """
+    Process-wide cache of loaded fonts and measured word widths.
+
+    Font files are read from disk once per path; FreeTypeFont objects are kept
+    in an LRU keyed by (path, size), and word advance widths are memoized per
+    (path, size, word) so steady-state layout does no font I/O or re-measuring.
+    """
+
+    def __init__(self, max_fonts: int = 64, max_widths: int = 20000):
+        self.max_fonts = max_fonts
+        self.max_widths = max_widths
+        self._font_bytes = {}
+        self._fonts = OrderedDict()
+        self._widths = OrderedDict()
+        self._lock = threading.Lock()
+        self.font_hits = 0
+        self.font_misses = 0
+
+    def _load_bytes(self, font_path):
+        data = self._font_bytes.get(font_path)
+        if data is None:
+            with open(font_path, "rb") as f:
+                data = f.read()
+            self._font_bytes[font_path] = data
+        return data
+
+    def get(self, font_path: str, size: int):
+        key = (font_path, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.font_hits += 1
+                return font
+            self.font_misses += 1
+
+            try:
+                font = ImageFont.truetype(BytesIO(self._load_bytes(font_path)), size=size)
+            except OSError:
+                logging.warning("Custom font not found, using default font.")
+                font = ImageFont.load_default(size=size)
+
+            self._fonts[key] = font
+            if len(self._fonts) > self.max_fonts:
+                self._fonts.popitem(last=False)
+            return font
+
+    def word_width(self, font_path: str, size: int, word: str) -> float:
+        key = (font_path, size, word)
+        with self._lock:
+            width = self._widths.get(key)
+            if width is not None:
+                self._widths.move_to_end(key)
+                return width
+
+        width = self.get(font_path, size).getlength(word)
+        with self._lock:
+            self._widths[key] = width
+            if len(self._widths) > self.max_widths:
+                self._widths.popitem(last=False)
+        return width
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "fonts": len(self._fonts),
+                "font_hits": self.font_hits,
+                "font_misses": self.font_misses,
+                "memoized_widths": len(self._widths),
+            }
+
+
+font_cache = FontCache()
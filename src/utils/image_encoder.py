@@ -0,0 +1,110 @@
+from src.entity.config_entity import ConfigEntity, ImageEncoderConfigEntity
+from src.entity.artifact_entity import EncodedImageArtifact
+
+from dataclasses import dataclass, replace
+import io
+import time
+
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+FORMAT_ALIASES = {"jpg": "jpeg"}
+
+
+@dataclass(frozen=True)
+class EncodingOptions:
+    """How a rendered meme is encoded. Frozen so it can travel in render jobs."""
+    format: str = "png"
+    jpeg_quality: int = 85
+    webp_quality: int = 80
+    webp_method: int = 4
+    png_compress_level: int = 6
+    png_optimize: bool = False
+    max_dimension: int = 0
+
+    @classmethod
+    def from_config(cls, config: ImageEncoderConfigEntity = None, format: str = None):
+        config = config or ImageEncoderConfigEntity(config_entity=ConfigEntity())
+        return cls(
+            format=normalize_format(format or config.output_format) or "png",
+            jpeg_quality=config.jpeg_quality,
+            webp_quality=config.webp_quality,
+            webp_method=config.webp_method,
+            png_compress_level=config.png_compress_level,
+            png_optimize=config.png_optimize,
+            max_dimension=config.output_max_dimension,
+        )
+
+    def with_format(self, format: str):
+        return replace(self, format=normalize_format(format) or self.format)
+
+
+def normalize_format(format: str):
+    """Map user input like 'JPG' or 'image/webp' to a supported format name, or None."""
+    if not format:
+        return None
+    format = format.strip().lower()
+    if format.startswith("image/"):
+        format = format[len("image/"):]
+    format = FORMAT_ALIASES.get(format, format)
+    return format if format in MEDIA_TYPES else None
+
+
+def negotiate_format(accept_header: str = None, requested_format: str = None, default: str = "png") -> str:
+    """
+    Pick the output format: an explicit `?format=` wins, otherwise the
+    highest-q supported type in the Accept header, otherwise `default`.
+    Wildcards (`*/*`, `image/*`) resolve to `default`.
+    """
+    explicit = normalize_format(requested_format)
+    if explicit:
+        return explicit
+    if not accept_header:
+        return default
+
+    best_format, best_q = None, 0.0
+    for position, part in enumerate(accept_header.split(",")):
+        fields = [field.strip() for field in part.split(";")]
+        media_range, q = fields[0].lower(), 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        format = default if media_range in ("*/*", "image/*") else normalize_format(media_range)
+        if format and q > best_q:
+            best_format, best_q = format, q
+    return best_format or default
+
+
+def fit_within(img, max_dimension: int):
+    """Downscale (never upscale) so the longest edge is at most `max_dimension`."""
+    if not max_dimension or max(img.size) <= max_dimension:
+        return img
+    scale = max_dimension / max(img.size)
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, reducing_gap=2.0)
+
+
+def encode_image(img, options: EncodingOptions) -> EncodedImageArtifact:
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    if options.format == "jpeg":
+        img.convert("RGB").save(buffer, format="JPEG", quality=options.jpeg_quality, optimize=False)
+    elif options.format == "webp":
+        img.save(buffer, format="WEBP", quality=options.webp_quality, method=options.webp_method)
+    else:
+        img.save(buffer, format="PNG", compress_level=options.png_compress_level, optimize=options.png_optimize)
+
+    return EncodedImageArtifact(
+        data=buffer.getvalue(),
+        format=options.format,
+        media_type=MEDIA_TYPES[options.format],
+        width=img.width,
+        height=img.height,
+        encode_ms=round((time.perf_counter() - start) * 1000, 3),
+    )
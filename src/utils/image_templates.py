@@ -2,16 +2,31 @@ from src.exceptions import CustomException
 from src.logger import logging
 import sys
 from src.entity.config_entity import ConfigEntity,MemeTemplatesEntity
+from src.entity.artifact_entity import TemplateCatalogArtifact
+from src.utils.template_prefetcher import get_template_prefetcher
+from src.utils.template_layouts import get_layout_index
+from src.utils.template_cache import rebuild_template_pack
+from src.utils.shared_files import FileLock, atomic_file, lock_path
 
 import pandas as pd
 import json
-from collections import defaultdict
+import time
 import os
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Join keys each catalog table is read by (dialogs link a meme to an emotion), and the value it contributes
+CATALOG_COLUMNS = {
+    "dialogs": ("meme_id", "emotion_id"),
+    "memes_dc": ("meme_id",),
+    "emotions": ("emotion_id",),
+}
+CATALOG_VALUE_COLUMNS = {"memes_dc": "image_path", "emotions": "emotion_label"}
+# Primary keys the incremental state is kept by, so a changed row replaces its previous version
+CATALOG_PRIMARY_KEYS = {"dialogs": ("dialog_id",), "memes_dc": ("meme_id",), "emotions": ("emotion_id",)}
+
 class MemeTemplates:
     def __init__(self):
         try:
@@ -22,86 +37,227 @@ class MemeTemplates:
         except Exception as e:
             raise CustomException(e, sys)
         
-    def fetch_table_data(self,table_name, schema="dc"):
-        """Fetch all data from a Supabase table and return as DataFrame"""
+    def fetch_table_data(self, table_name, schema="dc", columns=None, order=(), since=None, keys=None):
+        """
+        Fetch a Supabase table as a DataFrame, `catalog_page_size` rows per request.
+
+        `columns` limits the projection (default: every column) and `order` keeps
+        the paging stable. With `since`, only rows whose updated column is at or
+        after it are read. With `keys`, rows are deduplicated on those columns as
+        each page arrives (keeping the most recently updated row), so memory
+        follows the number of distinct keys rather than the table size.
+        """
         try:
-            # Use the schema() method to specify the schema, then table() for the table name
-            if schema != "public":
-                response = self.supabase.schema(schema).table(table_name).select("*").execute()
-            else:
-                response = self.supabase.table(table_name).select("*").execute()
-                
-            if response.data:
-                return pd.DataFrame(response.data)
-            else:
-                logging.info(f"No data found in table: {schema}.{table_name}")
-                return pd.DataFrame()
+            page_size = self.meme_templates_config.catalog_page_size
+            updated_column = self.meme_templates_config.catalog_updated_column
+            source = self.supabase.schema(schema) if schema != "public" else self.supabase
+            data, distinct, start = [], {}, 0
+            while True:
+                query = source.table(table_name).select(",".join(columns) if columns else "*")
+                if since is not None:
+                    query = query.gte(updated_column, since)
+                for column in order:
+                    query = query.order(column)
+                rows = query.range(start, start + page_size - 1).execute().data or []
+                self.fetch_stats["pages"] += 1
+                self.fetch_stats["rows"] += len(rows)
+                if not keys:
+                    data.extend(rows)
+                elif rows and updated_column in rows[0]:
+                    for row in rows:
+                        key = tuple([row[k] for k in keys])
+                        seen = distinct.get(key)
+                        if seen is None or row[updated_column] >= seen[updated_column]:
+                            distinct[key] = row
+                else:
+                    for row in rows:
+                        distinct[tuple([row[k] for k in keys])] = row
+                if len(rows) < page_size:
+                    break
+                start += page_size
+
+            if keys:
+                data = list(distinct.values())
+            if not data:
+                if since is None:
+                    logging.info(f"No data found in table: {schema}.{table_name}")
+                return pd.DataFrame(columns=list(columns or ()))
+            return pd.DataFrame(data)
         except Exception as e:
             logging.error(f"Error fetching data from {schema}.{table_name}: {e}")
-            return pd.DataFrame()
+            self.fetch_stats["errors"] += 1
+            return pd.DataFrame(columns=list(columns or ()))
 
-    def get_emotion_images(self):
-        logging.info("Fetching data from Supabase...")
-        
-        dialogs = self.fetch_table_data("dialogs")
-        emotions = self.fetch_table_data("emotions")
-        memes = self.fetch_table_data("memes_dc")
-        
-        if dialogs.empty or emotions.empty or memes.empty:
+    def _state_path(self):
+        return os.path.join(self.meme_templates_config.output_dir, self.meme_templates_config.catalog_state_file)
+
+    def _load_state(self):
+        """Catalog tables and per-table watermarks saved by the last sync, or None if there is none."""
+        try:
+            with open(self._state_path(), "r", encoding="utf-8") as f:
+                state = json.load(f)
+            for table, primary_key in CATALOG_PRIMARY_KEYS.items():
+                if not set(primary_key) <= set(state["tables"].get(table, {})):
+                    logging.info(f"Catalog state has no {primary_key} for {table}; running a full sync")
+                    return None
+            return {
+                "watermarks": state["watermarks"],
+                "tables": {table: pd.DataFrame(columns) for table, columns in state["tables"].items()},
+            }
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable catalog state {self._state_path()}: {e}")
+            return None
+
+    def _save_state(self, tables, watermarks):
+        with atomic_file(self._state_path(), "w", encoding="utf-8") as f:
+            json.dump({
+                "watermarks": watermarks,
+                "tables": {table: frame.to_dict("list") for table, frame in tables.items()},
+            }, f, default=str)
+
+    def build_emotion_url_map(self, dialogs, memes, emotions) -> dict:
+        """Join the catalog tables and build the emotion -> template URLs map with vectorized string ops."""
+        merged = dialogs[["meme_id", "emotion_id"]].drop_duplicates().merge(
+            memes[["meme_id", "image_path"]], on="meme_id"
+        ).merge(emotions[["emotion_id", "emotion_label"]], on="emotion_id")
+        emotion_images = merged[["emotion_label", "image_path"]].dropna().drop_duplicates()
+        if emotion_images.empty:
+            return {}
+
+        logging.info(f"Found {len(emotion_images)} unique emotion-image pairs")
+        prefix = (
+            f"{self.meme_templates_config.supabase_url}/storage/v1/object/public/"
+            f"{self.meme_templates_config.bucket_path}/"
+        )
+        urls = prefix + emotion_images["image_path"].astype(str).str.rsplit("/", n=1).str[-1]
+        return urls.groupby(emotion_images["emotion_label"], sort=False).agg(list).to_dict()
+
+    def get_emotion_images(self, incremental: bool = None):
+        """
+        Sync the emotion -> template URL map from Supabase into `json_file` and
+        prefetch the templates. Returns a TemplateCatalogArtifact, or None when
+        the tables give no usable pairs.
+
+        Only the join columns are read, page by page. In incremental mode (also
+        needs CATALOG_UPDATED_COLUMN on the three tables) the tables are kept in
+        `catalog_state_file` by primary key and only rows changed since the last
+        sync are read; a changed row replaces its previous version, so a dialog
+        moved to another meme or emotion drops its old pair. Rows deleted
+        upstream are only dropped by a full refresh. Syncs from
+        several worker processes run one at a time (file lock in `output_dir`).
+        """
+        config = self.meme_templates_config
+        with FileLock(lock_path(config.output_dir, config.catalog_state_file), config.file_lock_timeout):
+            return self._sync_catalog(incremental)
+
+    def _sync_catalog(self, incremental: bool = None):
+        config = self.meme_templates_config
+        incremental = config.catalog_incremental if incremental is None else incremental
+        updated_column = config.catalog_updated_column
+        state = self._load_state() if incremental else None
+        mode = "incremental" if state else "full"
+        logging.info(f"Fetching data from Supabase ({mode})...")
+
+        self.fetch_stats = {"pages": 0, "rows": 0, "errors": 0}
+        fetch_started = time.perf_counter()
+        tables, fetched, watermarks = {}, {}, dict(state["watermarks"]) if state else {}
+        for table, keys in CATALOG_COLUMNS.items():
+            # Incremental syncs keep one row per primary key (not per join key) so that
+            # a row whose join keys changed replaces its old pair instead of adding to it
+            row_keys = CATALOG_PRIMARY_KEYS[table] if incremental else keys
+            columns = tuple(dict.fromkeys(row_keys + keys))
+            if table in CATALOG_VALUE_COLUMNS:
+                columns += (CATALOG_VALUE_COLUMNS[table],)
+            if incremental:
+                columns += (updated_column,)
+            frame = self.fetch_table_data(
+                table, columns=columns, order=row_keys, since=watermarks.get(table) if state else None,
+                keys=list(row_keys),
+            )
+            fetched[table] = len(frame)
+            if state:
+                frame = pd.concat([state["tables"][table], frame], ignore_index=True)
+                frame = frame.drop_duplicates(list(row_keys), keep="last").reset_index(drop=True)
+            if incremental and not frame.empty:
+                watermarks[table] = str(frame[updated_column].max())
+            tables[table] = frame
+        fetch_ms = (time.perf_counter() - fetch_started) * 1000
+
+        if self.fetch_stats["errors"]:
+            logging.error("Template catalog fetch failed; keeping the current template map.")
+            return
+        if any(frame.empty for frame in tables.values()):
             logging.error("One or more tables are empty. Please check your table names and data.")
             return
-        
-        logging.info(f"Data fetched successfully:")
-        logging.info(f"  • Dialogs: {len(dialogs)} rows")
-        logging.info(f"  • Emotions: {len(emotions)} rows") 
-        logging.info(f"  • Memes: {len(memes)} rows")
-        
+        if state and not any(fetched.values()):
+            logging.info("Template catalog is up to date; nothing changed since the last sync.")
+
+        logging.info(f"Data fetched in {fetch_ms:.0f}ms ({self.fetch_stats['pages']} pages, {self.fetch_stats['rows']} rows):")
+        logging.info(f"  • Dialogs: {len(tables['dialogs'])} {'rows' if incremental else 'distinct meme/emotion pairs'}")
+        logging.info(f"  • Emotions: {len(tables['emotions'])} rows")
+        logging.info(f"  • Memes: {len(tables['memes_dc'])} rows")
+
         logging.info("🔄 Merging data...")
+        build_started = time.perf_counter()
         try:
-            merged = dialogs.merge(memes, on="meme_id").merge(emotions, on="emotion_id")
-            emotion_images = merged[["emotion_label", "image_path"]].dropna().drop_duplicates()
-
-            if emotion_images.empty:
+            emotion_to_urls = self.build_emotion_url_map(tables["dialogs"], tables["memes_dc"], tables["emotions"])
+            if not emotion_to_urls:
                 logging.error("No valid emotion-image pairs found after merging.")
                 return
-
-            logging.info(f"Found {len(emotion_images)} unique emotion-image pairs")
-
         except KeyError as e:
             logging.error(f" Column not found during merge: {e}")
-            logging.debug(f"  • Dialogs columns: {list(dialogs.columns)}")
-            logging.debug(f"  • Emotions columns: {list(emotions.columns)}")
-            logging.debug(f"  • Memes columns: {list(memes.columns)}")
+            for table, frame in tables.items():
+                logging.debug(f"  • {table} columns: {list(frame.columns)}")
             return
-
-        emotion_to_urls = defaultdict(list)
-        for _, row in emotion_images.iterrows():
-            emotion = row["emotion_label"]
-            filename = os.path.basename(row["image_path"])
-            full_url = f"{self.meme_templates_config.supabase_url}/storage/v1/object/public/{self.meme_templates_config.bucket_path}/{filename}"
-            emotion_to_urls[emotion].append(full_url)
-
-        emotion_to_urls = dict(emotion_to_urls)
+        build_ms = (time.perf_counter() - build_started) * 1000
+        frame_bytes = int(sum(frame.memory_usage(deep=True).sum() for frame in tables.values()))
 
         # Ensure 'artifacts' directory exists
-    
         os.makedirs(self.meme_templates_config.output_dir, exist_ok=True)
         output_file = os.path.join(self.meme_templates_config.output_dir, self.meme_templates_config.json_file)
 
         try:
-            with open(output_file, "w", encoding="utf-8") as f:
+            # Write to a temp file and rename so readers (the template index) never see a partial file
+            with atomic_file(output_file, "w", encoding="utf-8") as f:
                 json.dump(emotion_to_urls, f, indent=2, ensure_ascii=False)
             logging.info(f"Image URLs successfully saved to: {output_file}")
         except Exception as e:
             logging.error(f"Failed to write JSON to {output_file}: {e}")
             return
 
+        if incremental:
+            try:
+                self._save_state(tables, watermarks)
+            except Exception as e:
+                # The next incremental sync falls back to a full one
+                logging.warning(f"Failed to save catalog state {self._state_path()}: {e}")
+
         total_urls = sum(len(urls) for urls in emotion_to_urls.values())
-        logging.info(f"Summary: {len(emotion_to_urls)} emotions with {total_urls} total image URLs")
+        logging.info(f"Summary: {len(emotion_to_urls)} emotions with {total_urls} total image URLs "
+                     f"(fetch {fetch_ms:.0f}ms, build {build_ms:.0f}ms, {frame_bytes / 1024 / 1024:.1f}MB in frames)")
         logging.info("Sample emotions and URL counts:")
         for emotion, urls in list(emotion_to_urls.items())[:5]:
             logging.info(f"  • {emotion}: {len(urls)} images")
 
+        # Download everything now so requests never wait on a template download,
+        # then lay out captions and re-pack any new or changed template
+        get_template_prefetcher().prefetch(emotion_to_urls)
+        get_layout_index().profile_dir()
+        rebuild_template_pack()
+
+        return TemplateCatalogArtifact(
+            mode=mode,
+            rows_fetched=self.fetch_stats["rows"],
+            pages=self.fetch_stats["pages"],
+            emotions=len(emotion_to_urls),
+            urls=total_urls,
+            fetch_ms=round(fetch_ms, 1),
+            build_ms=round(build_ms, 1),
+            frame_bytes=frame_bytes,
+        )
+
 # if __name__ == "__main__":
 #     meme_temp = MemeTemplates()
 #     meme_temp.get_emotion_images()
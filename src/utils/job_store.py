@@ -0,0 +1,346 @@
+from src.exceptions import CustomException
+from src.entity.config_entity import JobQueueConfigEntity
+from src.entity.artifact_entity import MemeJobArtifact
+
+from contextlib import contextmanager
+from dataclasses import fields, replace
+import threading
+import sqlite3
+import heapq
+import time
+import os
+import sys
+
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+_COLUMNS = tuple(f.name for f in fields(MemeJobArtifact))
+# Result fields `finish` may set
+_RESULT_COLUMNS = ("emotion_name", "output_path", "media_type", "byte_size", "error")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL UNIQUE,
+    topic TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    format TEXT,
+    callback_url TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker TEXT,
+    lease_expires REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    emotion_name TEXT,
+    output_path TEXT,
+    media_type TEXT,
+    byte_size INTEGER,
+    error TEXT
+);
+-- Claim order within a status, and the queued/running counts without scanning finished jobs
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority DESC, seq);
+"""
+
+# Columns added after the first release, created on databases that predate them
+_ADDED_COLUMNS = {"lease_expires": "REAL"}
+
+
+class SQLiteJobStore:
+    """
+    Job queue in a local SQLite database (WAL mode), shared by every server
+    worker process on the host. Claiming selects and marks the
+    highest-priority, oldest queued row in one write transaction, so each job
+    goes to exactly one worker thread in one process. A claimed job holds a lease of
+    `lease_seconds` that its worker keeps renewing; once it lapses (the
+    process crashed, hung or was killed) `requeue_expired` puts the job back.
+    Each thread keeps its own connection.
+    """
+
+    def __init__(self, path: str, timeout: float = 30, lease_seconds: float = 60):
+        self.path = path
+        self.timeout = timeout
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            connection = self._connection()
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            existing = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+            for name, kind in _ADDED_COLUMNS.items():
+                if name not in existing:
+                    connection.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit: each statement is its own transaction unless run inside `_transaction`
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, sql: str, params=()) -> list:
+        try:
+            return self._connection().execute(sql, params).fetchall()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _update(self, sql: str, params=()) -> int:
+        """Run a write statement; returns how many rows it changed."""
+        try:
+            return self._connection().execute(sql, params).rowcount
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Statements that read and then write as one step. BEGIN IMMEDIATE takes
+        the write lock up front, so no other process changes the rows in between
+        (plain UPDATE/DELETE ... RETURNING needs SQLite 3.35, newer than some
+        base images ship).
+        """
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            raise CustomException(e, sys)
+        try:
+            yield
+            connection.execute("COMMIT")
+        except Exception as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise e if isinstance(e, CustomException) else CustomException(e, sys)
+
+    @staticmethod
+    def _artifact(row) -> MemeJobArtifact:
+        values = {name: row[name] for name in _COLUMNS}
+        values["cancel_requested"] = bool(values["cancel_requested"])
+        return MemeJobArtifact(**values)
+
+    def add(self, job: MemeJobArtifact) -> MemeJobArtifact:
+        self._update(
+            f"INSERT INTO jobs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+            [getattr(job, name) for name in _COLUMNS],
+        )
+        return job
+
+    def get(self, job_id: str):
+        rows = self._execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        return self._artifact(rows[0]) if rows else None
+
+    def claim(self, worker: str):
+        """Mark the next queued job running for `worker` and return it, or None when nothing is queued."""
+        with self._transaction():
+            rows = self._execute("SELECT seq FROM jobs WHERE status = 'queued' ORDER BY priority DESC, seq LIMIT 1")
+            if not rows:
+                return None
+            now = time.time()
+            self._update(
+                "UPDATE jobs SET status = 'running', started_at = ?, worker = ?, lease_expires = ? WHERE seq = ?",
+                (now, worker, now + self.lease_seconds, rows[0][0]),
+            )
+            rows = self._execute("SELECT * FROM jobs WHERE seq = ?", (rows[0][0],))
+        return self._artifact(rows[0])
+
+    def renew(self, workers) -> int:
+        """Extend the leases of the jobs `workers` are running; returns how many."""
+        workers = list(workers)
+        if not workers:
+            return 0
+        return self._update(
+            f"UPDATE jobs SET lease_expires = ? WHERE status = 'running' AND worker IN ({', '.join('?' * len(workers))})",
+            (time.time() + self.lease_seconds, *workers),
+        )
+
+    def finish(self, job_id: str, worker: str, status: str, **result):
+        """Record the outcome; ignored if the job was handed to another worker meanwhile."""
+        unknown = set(result) - set(_RESULT_COLUMNS)
+        if unknown:
+            raise CustomException(ValueError(f"Unknown job fields: {sorted(unknown)}"), sys)
+        assignments = "".join(f", {name} = ?" for name in result)
+        with self._transaction():
+            finished = self._update(
+                f"UPDATE jobs SET status = ?, finished_at = ?{assignments} "
+                "WHERE job_id = ? AND worker = ? AND status = 'running'",
+                (status, time.time(), *result.values(), job_id, worker),
+            )
+            return self.get(job_id) if finished else None
+
+    def cancel(self, job_id: str):
+        """Cancel a queued job at once; a running job is only flagged and stops before its image is saved."""
+        with self._transaction():
+            self._update(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, cancel_requested = 1 "
+                "WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            ) or self._update("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'", (job_id,))
+            return self.get(job_id)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        rows = self._execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,))
+        return bool(rows and rows[0][0])
+
+    def requeue(self, workers) -> int:
+        """Put the running jobs of `workers` back in the queue, in their original order; returns how many."""
+        workers = list(workers)
+        if not workers:
+            return 0
+        return self._update(
+            "UPDATE jobs SET status = 'queued', started_at = NULL, worker = NULL, lease_expires = NULL "
+            f"WHERE status = 'running' AND worker IN ({', '.join('?' * len(workers))})",
+            workers,
+        )
+
+    def requeue_expired(self) -> int:
+        """Put running jobs whose lease lapsed back in the queue; returns how many."""
+        return self._update(
+            "UPDATE jobs SET status = 'queued', started_at = NULL, worker = NULL, lease_expires = NULL "
+            "WHERE status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)",
+            (time.time(),),
+        )
+
+    def purge(self, before: float) -> list:
+        """Delete jobs that finished before `before`; returns their output paths."""
+        condition = f"status IN ({', '.join('?' * len(FINISHED_STATUSES))}) AND finished_at < ?"
+        with self._transaction():
+            rows = self._execute(f"SELECT output_path FROM jobs WHERE {condition}", (*FINISHED_STATUSES, before))
+            self._update(f"DELETE FROM jobs WHERE {condition}", (*FINISHED_STATUSES, before))
+        return [row[0] for row in rows if row[0]]
+
+    def stats(self) -> dict:
+        rows = self._execute(
+            "SELECT status, COUNT(*), MIN(created_at) FROM jobs "
+            "WHERE status IN ('queued', 'running') GROUP BY status"
+        )
+        counts = {row[0]: (row[1], row[2]) for row in rows}
+        return {
+            "queued": counts.get("queued", (0, None))[0],
+            "running": counts.get("running", (0, None))[0],
+            "oldest_queued_at": counts.get("queued", (0, None))[1],
+        }
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class MemoryJobStore:
+    """Same interface as SQLiteJobStore, kept in this process only (jobs are lost on restart)."""
+
+    def __init__(self, lease_seconds: float = 60):
+        self.lease_seconds = lease_seconds
+        self._jobs = {}
+        self._queue = []  # (-priority, seq, job_id); cancelled entries are skipped when popped
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def add(self, job: MemeJobArtifact) -> MemeJobArtifact:
+        with self._lock:
+            self._jobs[job.job_id] = replace(job)
+            self._seq += 1
+            heapq.heappush(self._queue, (-job.priority, self._seq, job.job_id))
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return replace(job) if job is not None else None
+
+    def claim(self, worker: str):
+        with self._lock:
+            while self._queue:
+                _, _, job_id = heapq.heappop(self._queue)
+                job = self._jobs.get(job_id)
+                if job is not None and job.status == "queued":
+                    job.status, job.started_at, job.worker = "running", time.time(), worker
+                    job.lease_expires = job.started_at + self.lease_seconds
+                    return replace(job)
+            return None
+
+    def renew(self, workers) -> int:
+        workers = set(workers)
+        with self._lock:
+            running = [job for job in self._jobs.values() if job.status == "running" and job.worker in workers]
+            for job in running:
+                job.lease_expires = time.time() + self.lease_seconds
+            return len(running)
+
+    def finish(self, job_id: str, worker: str, status: str, **result):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.worker != worker or job.status != "running":
+                return None
+            for name, value in result.items():
+                if name not in _RESULT_COLUMNS:
+                    raise CustomException(ValueError(f"Unknown job field: {name}"), sys)
+                setattr(job, name, value)
+            job.status, job.finished_at = status, time.time()
+            return replace(job)
+
+    def cancel(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status == "queued":
+                job.status, job.finished_at = "cancelled", time.time()
+            if job.status in ("cancelled", "running"):
+                job.cancel_requested = True
+            return replace(job)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and job.cancel_requested
+
+    def requeue(self, workers) -> int:
+        workers = set(workers)
+        return self._requeue(lambda job: job.worker in workers)
+
+    def requeue_expired(self) -> int:
+        now = time.time()
+        return self._requeue(lambda job: job.lease_expires is None or job.lease_expires < now)
+
+    def _requeue(self, predicate) -> int:
+        with self._lock:
+            requeued = 0
+            for job in self._jobs.values():
+                if job.status == "running" and predicate(job):
+                    job.status, job.started_at, job.worker, job.lease_expires = "queued", None, None, None
+                    self._seq += 1
+                    heapq.heappush(self._queue, (-job.priority, self._seq, job.job_id))
+                    requeued += 1
+            return requeued
+
+    def purge(self, before: float) -> list:
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.status in FINISHED_STATUSES and job.finished_at is not None and job.finished_at < before]
+            for job in expired:
+                del self._jobs[job.job_id]
+        return [job.output_path for job in expired if job.output_path]
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued = [job.created_at for job in self._jobs.values() if job.status == "queued"]
+            running = sum(1 for job in self._jobs.values() if job.status == "running")
+        return {"queued": len(queued), "running": running, "oldest_queued_at": min(queued, default=None)}
+
+    def close(self):
+        pass
+
+
+def build_job_store(config: JobQueueConfigEntity):
+    if config.store_backend == "memory":
+        return MemoryJobStore(lease_seconds=config.lease_seconds)
+    return SQLiteJobStore(config.db_path, timeout=config.lock_timeout, lease_seconds=config.lease_seconds)
@@ -0,0 +1,272 @@
+from src.exceptions import LLMUnavailableException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, LLMClientConfigEntity
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from collections import deque
+import threading
+import asyncio
+import random
+import time
+
+
+# Client errors that will fail the same way on every attempt
+NON_RETRYABLE_STATUS = {400, 401, 403, 404}
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (ValueError, TypeError)):
+        return False
+    # Only loaded once a model call has failed, so importing the client stays cheap
+    try:
+        from google.api_core import exceptions as google_exceptions
+    except ImportError:  # pragma: no cover - google-generativeai always ships api_core
+        google_exceptions = None
+    if google_exceptions is not None and isinstance(error, google_exceptions.GoogleAPICallError):
+        return error.code not in NON_RETRYABLE_STATUS
+    return True
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls and rejects calls
+    for `reset_seconds`; then lets one trial call through (half-open) and
+    closes again if it succeeds. A trial that never reports back is replaced
+    after another `reset_seconds`.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                # Open long enough, or the previous trial went missing: let one call through
+                self.state = "half_open"
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    logging.warning(f"LLM circuit breaker opened after {self.consecutive_failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class ResilientModel:
+    """
+    Wraps a `genai.GenerativeModel` (or anything with the same two methods)
+    with the same `generate_content` / `generate_content_async` interface.
+
+    Each attempt gets LLM_TIMEOUT_SECONDS and the whole call LLM_DEADLINE_SECONDS.
+    Retryable failures are retried up to LLM_MAX_RETRIES times with full-jitter
+    exponential backoff. A circuit breaker turns sustained failure into an
+    immediate LLMUnavailableException so callers can use their fallback
+    without waiting. With LLM_HEDGE enabled, an attempt still running after
+    the observed p95 latency gets a duplicate request and the first answer wins.
+    """
+
+    def __init__(self, model, config: LLMClientConfigEntity = None):
+        self.model = model
+        config = config or LLMClientConfigEntity(config_entity=ConfigEntity())
+        self.timeout = config.timeout_seconds
+        self.deadline = config.deadline_seconds
+        self.max_retries = config.max_retries
+        self.backoff_base = config.backoff_base_seconds
+        self.backoff_max = config.backoff_max_seconds
+        self.hedge = config.hedge
+        self.hedge_percentile = config.hedge_percentile
+        self.hedge_min_samples = config.hedge_min_samples
+        self.breaker = CircuitBreaker(config.breaker_failures, config.breaker_reset_seconds)
+        self._executor = ThreadPoolExecutor(max_workers=config.client_threads, thread_name_prefix="llm")
+        self._latencies = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(
+            ("calls", "successes", "failures", "retries", "timeouts", "hedges", "hedge_wins", "short_circuited"), 0
+        )
+
+    def __getattr__(self, name):
+        # Anything else (model_name, count_tokens, ...) goes to the wrapped model
+        return getattr(self.model, name)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _hedge_delay(self):
+        if not self.hedge:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile))]
+
+    def _backoff(self, attempt: int, remaining: float) -> float:
+        return min(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)), max(remaining, 0))
+
+    def _request_kwargs(self, kwargs: dict, attempt_timeout: float) -> dict:
+        # Let the SDK abandon the HTTP request too, not just stop waiting for it
+        if type(self.model).__module__.startswith("google.generativeai") and "request_options" not in kwargs:
+            return {**kwargs, "request_options": {"timeout": attempt_timeout}}
+        return kwargs
+
+    def _reject(self):
+        self._count("short_circuited")
+        raise LLMUnavailableException("LLM circuit breaker is open; using fallback")
+
+    def _observe(self, started: float):
+        # Per-attempt latency of successful responses; the hedge delay is taken from these
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+
+    def _finish(self, error: BaseException = None):
+        if error is None:
+            self.breaker.record_success()
+            self._count("successes")
+        else:
+            self.breaker.record_failure()
+            self._count("failures")
+
+    # --- threads -------------------------------------------------------
+
+    def _attempt(self, prompt, kwargs, attempt_timeout: float):
+        kwargs = self._request_kwargs(kwargs, attempt_timeout)
+        primary = self._executor.submit(self.model.generate_content, prompt, **kwargs)
+        pending = {primary}
+        hedge_delay = self._hedge_delay()
+        started = time.monotonic()
+
+        if hedge_delay is not None and hedge_delay < attempt_timeout:
+            done, _ = wait(pending, timeout=hedge_delay)
+            if not done:
+                self._count("hedges")
+                pending.add(self._executor.submit(self.model.generate_content, prompt, **kwargs))
+
+        error = None
+        while pending:
+            remaining = attempt_timeout - (time.monotonic() - started)
+            done, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self._count("hedge_wins")
+                    self._observe(started)
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        self._count("timeouts")
+        raise TimeoutError(f"LLM call exceeded {attempt_timeout:.1f}s")
+
+    def generate_content(self, prompt, **kwargs):
+        if not self.breaker.allow():
+            self._reject()
+        self._count("calls")
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            remaining = self.deadline - (time.monotonic() - started)
+            try:
+                response = self._attempt(prompt, kwargs, min(self.timeout, remaining))
+                self._finish()
+                return response
+            except Exception as e:
+                remaining = self.deadline - (time.monotonic() - started)
+                if attempt == self.max_retries or not is_retryable(e) or remaining <= 0:
+                    self._finish(e)
+                    raise LLMUnavailableException(f"LLM call failed after {attempt + 1} attempt(s): {e}") from e
+                logging.warning(f"LLM attempt {attempt + 1} failed ({e}); retrying")
+                self._count("retries")
+                time.sleep(self._backoff(attempt, remaining))
+
+    # --- asyncio -------------------------------------------------------
+
+    async def _attempt_async(self, prompt, kwargs, attempt_timeout: float):
+        kwargs = self._request_kwargs(kwargs, attempt_timeout)
+        primary = asyncio.ensure_future(self.model.generate_content_async(prompt, **kwargs))
+        pending = {primary}
+        hedge_delay = self._hedge_delay()
+        started = time.monotonic()
+        try:
+            if hedge_delay is not None and hedge_delay < attempt_timeout:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done:
+                    self._count("hedges")
+                    pending.add(asyncio.ensure_future(self.model.generate_content_async(prompt, **kwargs)))
+
+            error = None
+            while pending:
+                remaining = attempt_timeout - (time.monotonic() - started)
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(remaining, 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedge_wins")
+                        self._observe(started)
+                        return task.result()
+                    error = task.exception()
+            if error is not None and not pending:
+                raise error
+            self._count("timeouts")
+            raise TimeoutError(f"LLM call exceeded {attempt_timeout:.1f}s")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate_content_async(self, prompt, **kwargs):
+        if not self.breaker.allow():
+            self._reject()
+        self._count("calls")
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            remaining = self.deadline - (time.monotonic() - started)
+            try:
+                response = await self._attempt_async(prompt, kwargs, min(self.timeout, remaining))
+                self._finish()
+                return response
+            except Exception as e:
+                remaining = self.deadline - (time.monotonic() - started)
+                if attempt == self.max_retries or not is_retryable(e) or remaining <= 0:
+                    self._finish(e)
+                    raise LLMUnavailableException(f"LLM call failed after {attempt + 1} attempt(s): {e}") from e
+                logging.warning(f"LLM attempt {attempt + 1} failed ({e}); retrying")
+                self._count("retries")
+                await asyncio.sleep(self._backoff(attempt, remaining))
+
+    def stats(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._latencies)
+            counters = dict(self.counters)
+
+        def percentile(p):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 1) if ordered else None
+
+        return {
+            **counters,
+            "breaker_state": self.breaker.state,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "hedge_delay_ms": round(self._hedge_delay() * 1000, 1) if self._hedge_delay() is not None else None,
+        }
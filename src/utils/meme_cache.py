@@ -0,0 +1,278 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import MemeCacheConfigEntity
+from src.entity.artifact_entity import EncodedImageArtifact
+from src.utils.image_encoder import EncodingOptions, MEDIA_TYPES
+from src.utils.shared_files import atomic_file
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import unicodedata
+import threading
+import hashlib
+import time
+import os
+import sys
+
+
+CACHE_MODES = ("off", "emotion", "full")
+
+# Lookup outcome -> what the response reports (X-Cache, the stream's done event):
+# "emotion" reused only the classification, "content" reused everything but the evicted image
+CACHE_RESULTS = {"hit": "hit", "emotion": "emotion-hit", "content": "content-hit", "miss": "miss"}
+
+
+@dataclass
+class CachedContent:
+    """What is remembered for a normalized topic. `dialogues`/`template_path` are None in emotion-only mode."""
+    emotion_name: str
+    dialogues: tuple = None
+    template_path: str = None
+
+
+class _TTLCache:
+    """Small thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MemoryImageStore:
+    """Encoded images in memory, evicted least-recently-used once over `max_bytes`."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            artifact = self._entries.get(key)
+            if artifact is not None:
+                self._entries.move_to_end(key)
+            return artifact
+
+    def put(self, key: str, artifact: EncodedImageArtifact):
+        if artifact.byte_size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.byte_size
+            self._entries[key] = artifact
+            self.current_bytes += artifact.byte_size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.byte_size
+
+
+class DiskImageStore:
+    """
+    Encoded images as files in `directory` (under artifacts/memes), written
+    atomically and evicted least-recently-used once over `max_bytes`. Worker
+    processes share the directory: a key missing from this process's index
+    is looked up on disk before it counts as a miss.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._files = OrderedDict()  # key -> (path, size)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        existing = []
+        for name in os.listdir(directory):
+            key, _, extension = name.partition(".")
+            if extension in MEDIA_TYPES:
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                existing.append((stat.st_mtime, key, path, stat.st_size))
+        for _, key, path, size in sorted(existing):
+            self._files[key] = (path, size)
+            self.current_bytes += size
+
+    def _find_shared(self, key: str):
+        """Entry for a file another worker process wrote after this index was built, or None."""
+        for extension in MEDIA_TYPES:
+            path = os.path.join(self.directory, f"{key}.{extension}")
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                if key not in self._files:
+                    self._files[key] = (path, size)
+                    self.current_bytes += size
+                return self._files[key]
+        return None
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is not None:
+                self._files.move_to_end(key)
+        if entry is None:
+            entry = self._find_shared(key)
+            if entry is None:
+                return None
+        path, _ = entry
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._files.pop(key, None)
+            return None
+        format = path.rsplit(".", 1)[1]
+        return EncodedImageArtifact(
+            data=data, format=format, media_type=MEDIA_TYPES[format], width=0, height=0, encode_ms=0.0
+        )
+
+    def put(self, key: str, artifact: EncodedImageArtifact):
+        if artifact.byte_size > self.max_bytes:
+            return
+        path = os.path.join(self.directory, f"{key}.{artifact.format}")
+        with atomic_file(path, "wb") as f:
+            f.write(artifact.data)
+
+        evicted = []
+        with self._lock:
+            previous = self._files.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._files[key] = (path, artifact.byte_size)
+            self.current_bytes += artifact.byte_size
+            while self.current_bytes > self.max_bytes:
+                _, (evicted_path, size) = self._files.popitem(last=False)
+                self.current_bytes -= size
+                evicted.append(evicted_path)
+        for evicted_path in evicted:
+            try:
+                os.remove(evicted_path)
+            except FileNotFoundError:
+                pass
+
+
+class MemeResultCache:
+    """
+    Opt-in cache of generated memes, keyed by the slugified topic.
+
+    MEME_CACHE_MODE:
+      off      - nothing is cached
+      emotion  - reuse the emotion classification, write fresh dialogues every request
+      full     - reuse emotion, dialogues and template; the encoded image is served
+                 from the image store keyed by (dialogue hash, template, encoding)
+    Topic entries expire after MEME_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, config: MemeCacheConfigEntity):
+        try:
+            if config.mode not in CACHE_MODES:
+                raise ValueError(f"MEME_CACHE_MODE must be one of {CACHE_MODES}, got '{config.mode}'")
+            self.mode = config.mode
+            self.fallback_dialogues = tuple(config.fallback_dialogues)
+            self._topics = _TTLCache(config.max_topics, config.ttl_seconds)
+            if config.image_backend == "disk":
+                self._images = DiskImageStore(config.disk_dir, config.image_max_bytes)
+            else:
+                self._images = MemoryImageStore(config.image_max_bytes)
+            self.hits = 0
+            self.emotion_hits = 0
+            self.misses = 0
+            self._stats_lock = threading.Lock()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @staticmethod
+    def topic_key(topic_name: str) -> str:
+        """Case- and whitespace-insensitive key that keeps every script (Telugu, emoji, ...); '' if blank."""
+        return " ".join(unicodedata.normalize("NFKC", topic_name or "").casefold().split())
+
+    @staticmethod
+    def image_key(dialogues, template_path: str, encoding: EncodingOptions) -> str:
+        material = "\n".join([*dialogues, os.path.basename(template_path), repr(encoding)])
+        return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+    def lookup(self, topic_name: str):
+        """Cached content for the topic (respecting the mode), or None."""
+        key = self.topic_key(topic_name)
+        if not self.enabled or not key:
+            return None
+        content = self._topics.get(key)
+        if content is None:
+            return None
+        if self.mode == "emotion":
+            return CachedContent(emotion_name=content.emotion_name)
+        return content
+
+    def store(self, topic_name: str, emotion_name: str, dialogues, template_path: str):
+        # Fallback content means the LLM was unavailable; don't pin it for the TTL
+        key = self.topic_key(topic_name)
+        if self.enabled and key and tuple(dialogues) != self.fallback_dialogues:
+            self._topics.put(key, CachedContent(emotion_name, tuple(dialogues), template_path))
+
+    def get_image(self, content: CachedContent, encoding: EncodingOptions):
+        if self.mode != "full" or content is None or content.dialogues is None:
+            return None
+        return self._images.get(self.image_key(content.dialogues, content.template_path, encoding))
+
+    def put_image(self, dialogues, template_path: str, encoding: EncodingOptions, artifact: EncodedImageArtifact):
+        if self.mode == "full" and not artifact.is_error and tuple(dialogues) != self.fallback_dialogues:
+            try:
+                self._images.put(self.image_key(dialogues, template_path, encoding), artifact)
+            except OSError as e:
+                logging.warning(f"Could not store cached meme image: {e}")
+
+    def record(self, status: str):
+        # Called from request threads; a re-render of cached content counts as a miss
+        with self._stats_lock:
+            if status == "hit":
+                self.hits += 1
+            elif status == "emotion":
+                self.emotion_hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            hits, emotion_hits, misses = self.hits, self.emotion_hits, self.misses
+        return {
+            "mode": self.mode,
+            "topics": len(self._topics),
+            "image_bytes": self._images.current_bytes,
+            "hits": hits,
+            "emotion_hits": emotion_hits,
+            "misses": misses,
+        }
@@ -0,0 +1,56 @@
+from src.utils.text_layout import draw_text_block, fit_text, outline_width
+from src.utils.template_layouts import CLASSIC_LAYOUT, TemplateLayout
+from src.utils.image_encoder import EncodingOptions, encode_image
+
+import io
+
+from PIL import Image, ImageDraw
+
+
+def _draw_caption(draw, text, box, font_path, width, height):
+    # The box's font cap (the classic `height * 0.06`) and the caption-length
+    # heuristic are the upper bound; the caption then gets the largest size up
+    # to it that fits the box, wrapped on measured widths.
+    max_size = min(int(height * box.max_font_ratio), int(1000 / max(len(text) / 2, 1)))
+    box_width = width * box.width
+    font, lines = fit_text(text, font_path, box_width, height * box.height, max_size)
+    draw_text_block(draw, lines, font, box_width, height * box.top, height * box.height,
+                    stroke_width=outline_width(font.size), fill=box.fill, stroke_fill=box.stroke,
+                    section_left=width * box.left)
+
+
+def draw_meme_text(img, upper_text, lower_text, font_path, layout: TemplateLayout = CLASSIC_LAYOUT):
+    """
+    Draw the outlined upper and lower captions onto `img` in place, in the
+    boxes of the template's precomputed `layout` (by default the top and
+    bottom 40% bands).
+    """
+    width, height = img.size
+    draw = ImageDraw.Draw(img)
+    _draw_caption(draw, upper_text, layout.upper, font_path, width, height)
+    _draw_caption(draw, lower_text, layout.lower, font_path, width, height)
+    return img
+
+
+def encode_png(img) -> bytes:
+    img_byte_array = io.BytesIO()
+    img.save(img_byte_array, format='PNG')
+    return img_byte_array.getvalue()
+
+
+def error_image(error):
+    """Small red placeholder image describing a rendering failure."""
+    error_img = Image.new('RGB', (400, 200), color='red')
+    draw = ImageDraw.Draw(error_img)
+    draw.text((10, 10), f"Error: {str(error)}", fill="white")
+    return error_img
+
+
+def render_error_png(error) -> bytes:
+    return encode_png(error_image(error))
+
+
+def render_error(error, options: EncodingOptions):
+    encoded = encode_image(error_image(error), options)
+    encoded.is_error = True
+    return encoded
@@ -0,0 +1,267 @@
+from src.logger import logging, request_id_var
+from src.entity.config_entity import ConfigEntity, MetricsConfigEntity
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from bisect import bisect_left
+import threading
+import uuid
+import time
+import re
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    kind = "counter"
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple([labels[name] for name in self.labelnames])
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple([labels[name] for name in self.labelnames])
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name + "_total", dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative `le` buckets, `_sum` and `_count`), optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=(), buckets=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple([labels[name] for name in self.labelnames])
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        samples = []
+        for key, counts, total in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((self.name + "_sum", labels, total))
+            samples.append((self.name + "_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics in the Prometheus text exposition format.
+
+    Hot-path metrics (counters, histograms) are updated in place under a
+    per-metric lock. Numbers other components already keep (cache hit
+    counters, breaker state, ...) are read at scrape time by collectors
+    registered with `register_collector`, so they cost nothing per request.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        metric = Counter(self, name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=()) -> Histogram:
+        metric = Histogram(self, name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """`collector()` returns (name, type, help, [(labels, value), ...]) tuples, read on every scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_config = MetricsConfigEntity(config_entity=ConfigEntity())
+metrics = MetricsRegistry(enabled=metrics_config.enabled)
+
+STAGE_SECONDS = metrics.histogram(
+    "meme_stage_duration_seconds", "Time spent in each pipeline stage.", ("stage",), metrics_config.latency_buckets
+)
+STAGE_ERRORS = metrics.counter("meme_stage_errors", "Pipeline stages that raised.", ("stage",))
+FALLBACKS = metrics.counter("meme_fallbacks", "Fallback values used instead of a model answer.", ("kind",))
+HTTP_REQUESTS = metrics.counter("meme_http_requests", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_SECONDS = metrics.histogram(
+    "meme_http_request_duration_seconds", "Time to the response headers, by route.", ("route",),
+    metrics_config.latency_buckets,
+)
+
+# Background jobs wait in the queue far longer than a request takes
+JOB_BUCKETS = metrics_config.latency_buckets + (60.0, 300.0, 900.0, 3600.0)
+JOB_WAIT_SECONDS = metrics.histogram(
+    "meme_job_wait_seconds", "Time background jobs spent queued before a worker picked them up.", (), JOB_BUCKETS
+)
+JOB_RUN_SECONDS = metrics.histogram(
+    "meme_job_run_seconds", "Time background jobs spent running.", (), JOB_BUCKETS
+)
+JOBS_FINISHED = metrics.counter("meme_jobs_finished", "Background jobs finished by a worker, by outcome.", ("status",))
+JOB_CALLBACKS = metrics.counter("meme_job_callbacks", "Job completion callbacks, by outcome.", ("result",))
+
+
+# Stage timings of the current request, for the Server-Timing header
+_request_timings = ContextVar("request_timings", default=None)
+
+
+def record_stage(name: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def track_stage(name: str):
+    """Time the enclosed block as pipeline stage `name`; exceptions also count as a stage error."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def server_timing_header(timings) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings)
+
+
+# Inbound X-Request-ID values are reused only if they look like an ID
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def _request_id(scope) -> str:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-request-id":
+            candidate = value.decode("latin-1")
+            if _REQUEST_ID_PATTERN.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex[:16]
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware for per-request observability:
+    - assigns a request ID (reusing a well-formed inbound X-Request-ID),
+      echoes it in the response and attaches it to every log record;
+    - counts requests and times them by route template;
+    - writes one access log line with the request's stage timings;
+    - with SERVER_TIMING=true, adds a Server-Timing header listing the stages.
+    Stages finished after the headers are sent (streaming responses) are in
+    the histograms and the access log, but not in Server-Timing.
+    """
+
+    def __init__(self, app, server_timing: bool = None):
+        self.app = app
+        self.server_timing = metrics_config.server_timing if server_timing is None else server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_id = _request_id(scope)
+        timings = []
+        request_token = request_id_var.set(request_id)
+        timings_token = _request_timings.set(timings)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                HTTP_SECONDS.observe(time.perf_counter() - started, route=getattr(scope.get("route"), "path", "unmatched"))
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                if self.server_timing and timings:
+                    headers.append((b"server-timing", server_timing_header(timings).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=str(status[0]))
+            logging.info(
+                f"{scope['method']} {scope['path']} {status[0]} in {duration_ms}ms",
+                extra={"route": route, "status": status[0], "duration_ms": duration_ms,
+                       "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in timings}},
+            )
+            _request_timings.reset(timings_token)
+            request_id_var.reset(request_token)
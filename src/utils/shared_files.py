@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+import tempfile
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+LOCK_DIR = ".locks"
+LOCK_POLL_SECONDS = 0.02
+
+
+def lock_path(directory: str, name: str) -> str:
+    """Lock file for `name` (a file in, or a task on, `directory`)."""
+    return os.path.join(directory, LOCK_DIR, f"{os.path.basename(name)}.lock")
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on `path` (created if missing), for work on
+    template_dir/ and artifacts/ that several worker processes share. Each
+    acquire opens its own descriptor, so threads of one process exclude each
+    other too. Waits at most `timeout` seconds (None waits forever), then
+    raises TimeoutError.
+    """
+
+    def __init__(self, path: str, timeout: float = None):
+        self.path = path
+        self.timeout = timeout
+        self._fd = None
+
+    def _try_lock(self, fd) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                raise TimeoutError(f"Timed out after {self.timeout}s waiting for {self.path}")
+            time.sleep(LOCK_POLL_SECONDS)
+        self._fd = fd
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+@contextmanager
+def atomic_file(path: str, mode: str = "w", encoding: str = None):
+    """
+    Open a unique temp file next to `path` for writing; it replaces `path`
+    when the block exits cleanly and is removed if the block raises. Readers
+    never see a partial file, and concurrent writers never share a temp file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".part")
+    try:
+        # mkstemp creates the file owner-only; shared files get the usual permissions
+        os.chmod(tmp_path, 0o644)
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
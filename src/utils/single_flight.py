@@ -0,0 +1,118 @@
+from src.logger import logging
+
+import threading
+import asyncio
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution (threads).
+
+    The first caller for a key runs `fn`; callers arriving while it is still
+    running wait for it and receive the same result, or the same exception.
+    Waiters give up after `timeout` seconds with a TimeoutError; the running
+    call itself is not interrupted. Nothing is remembered once a call finishes.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f"Timed out after {self.timeout}s waiting for in-flight call {key!r}")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+            }
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of `SingleFlight`.
+
+    The shared call runs as its own task, so a caller that is cancelled or
+    times out (including the one that started it) does not cancel the work
+    for the others.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._tasks = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda finished: self._forget(key, finished))
+        else:
+            self.coalesced += 1
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise TimeoutError(f"Timed out after {self.timeout}s waiting for in-flight call {key!r}")
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled() and task.exception() is not None:
+            # Retrieved here so an error nobody is still awaiting isn't reported as unhandled
+            logging.debug(f"In-flight call {key!r} failed: {task.exception()}")
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._tasks),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,145 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+from src.utils.image_encoder import fit_within
+from src.utils.template_pack import TemplatePack, template_pack_path, build_configured_pack
+
+from collections import OrderedDict
+import threading
+import os
+import sys
+
+from PIL import Image
+
+
+class TemplateImageCache:
+    """
+    Bounded LRU of decoded, RGB-converted template images.
+
+    Entries are keyed by (path, max_dimension) and invalidated when the file's
+    mtime changes; a non-zero max_dimension caches the downscaled variant.
+    Callers always receive a copy, so drawing on it never touches the cached pixels.
+
+    With a TemplatePack, templates it holds a current copy of are served from
+    the memory-mapped pack instead: no decode, and no LRU memory, since the
+    pages are shared by every process mapping the pack.
+    """
+
+    def __init__(self, max_bytes: int, pack: TemplatePack = None):
+        self.max_bytes = max_bytes
+        self.pack = pack
+        self._entries = OrderedDict()  # (path, max_dimension) -> (mtime_ns, image, nbytes)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pack_hits = 0
+
+    def _from_pack(self, image_path: str, max_dimension: int):
+        """Copy of the packed template, or None if the pack has no current copy at this size."""
+        packed = self.pack.get(image_path)
+        if packed is None:
+            return None
+        image, entry = packed
+        try:
+            stat = os.stat(image_path)
+        except FileNotFoundError:
+            # The pack is the only copy: use it, at whatever size it has
+            self.pack_hits += 1
+            return fit_within(image, max_dimension)
+        if stat.st_mtime_ns != entry["mtime_ns"] or stat.st_size != entry["size"]:
+            return None
+
+        pack_dimension = entry["max_dimension"]
+        if pack_dimension != max_dimension:
+            # A pack built for another size still serves templates neither size would downscale
+            longest = max(image.size)
+            if (pack_dimension and longest >= pack_dimension) or (max_dimension and longest > max_dimension):
+                return None
+        self.pack_hits += 1
+        return image
+
+    def get(self, image_path: str, max_dimension: int = 0) -> Image.Image:
+        try:
+            if self.pack is not None:
+                image = self._from_pack(image_path, max_dimension)
+                if image is not None:
+                    return image
+
+            key = (image_path, max_dimension)
+            mtime_ns = os.stat(image_path).st_mtime_ns
+
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == mtime_ns:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1].copy()
+                self.misses += 1
+
+            # Decode outside the lock so a slow JPEG never blocks cache hits
+            with Image.open(image_path) as opened:
+                if max_dimension:
+                    # Let the JPEG decoder do most of the downscaling
+                    opened.draft("RGB", (max_dimension, max_dimension))
+                image = fit_within(opened.convert("RGB"), max_dimension)
+            image.load()
+            self._put(key, mtime_ns, image)
+            return image.copy()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _put(self, key, mtime_ns, image):
+        width, height = image.size
+        nbytes = width * height * len(image.getbands())
+        if nbytes > self.max_bytes:
+            logging.info(f"Template {key[0]} ({nbytes} bytes) exceeds cache budget; not cached.")
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[2]
+
+            self._entries[key] = (mtime_ns, image, nbytes)
+            self.current_bytes += nbytes
+
+            while self.current_bytes > self.max_bytes:
+                _, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "pack_hits": self.pack_hits,
+                "pack": self.pack.stats() if self.pack is not None else None,
+            }
+
+
+_config = MemeTemplatesEntity(config_entity=ConfigEntity())
+template_image_cache = TemplateImageCache(
+    max_bytes=_config.template_cache_max_bytes,
+    pack=TemplatePack(template_pack_path(), _config.template_index_check_seconds) if _config.template_pack else None,
+)
+
+
+def rebuild_template_pack():
+    """Re-pack template_dir (e.g. after a prefetch) and map the new pack in this process; None if packing is off."""
+    if template_image_cache.pack is None:
+        return None
+    summary = build_configured_pack()
+    template_image_cache.pack.reload()
+    return summary
@@ -0,0 +1,136 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+
+from urllib.parse import urlparse
+import threading
+import random
+import json
+import time
+import os
+import sys
+
+
+class _IndexSnapshot:
+    """Immutable view of the emotion map; replaced wholesale on reload."""
+
+    def __init__(self, mtime_ns, templates_by_emotion):
+        self.mtime_ns = mtime_ns
+        self.templates_by_emotion = templates_by_emotion  # emotion -> tuple of (url, local_path)
+
+
+class TemplateIndex:
+    """
+    In-memory index of emotion -> template URLs with each URL pre-resolved to
+    its file under `template_dir`.
+
+    The JSON file is re-read only when its mtime changes (checked at most every
+    `check_interval` seconds; <= 0 disables watching) or when `reload()` is
+    called explicitly, e.g. after /fetch-templates/ rewrites it. Lookups only
+    touch memory.
+    """
+
+    def __init__(self, json_path: str, template_dir: str, check_interval: float):
+        try:
+            self.json_path = json_path
+            self.template_dir = template_dir
+            self.check_interval = check_interval
+            os.makedirs(self.template_dir, exist_ok=True)
+
+            self._lock = threading.Lock()
+            self._snapshot = _IndexSnapshot(None, {})
+            self._local_files = set()
+            self._next_check = 0.0
+            self.reload()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def reload(self):
+        """Re-read the JSON map and local template listing, then swap them in atomically."""
+        try:
+            with self._lock:
+                try:
+                    mtime_ns = os.stat(self.json_path).st_mtime_ns
+                    with open(self.json_path, "r") as f:
+                        emotion_url_map = json.load(f)
+                except FileNotFoundError:
+                    logging.warning(f"Template map {self.json_path} not found; index is empty.")
+                    mtime_ns, emotion_url_map = None, {}
+
+                templates_by_emotion = {
+                    emotion: tuple((url, self.resolve_path(url)) for url in urls)
+                    for emotion, urls in emotion_url_map.items()
+                    if urls
+                }
+                self._local_files = set(os.listdir(self.template_dir))
+                self._snapshot = _IndexSnapshot(mtime_ns, templates_by_emotion)
+                self._next_check = time.monotonic() + self.check_interval
+
+            total = sum(len(t) for t in templates_by_emotion.values())
+            logging.info(f"Template index loaded: {len(templates_by_emotion)} emotions, {total} templates.")
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def resolve_path(self, image_url: str) -> str:
+        return os.path.join(self.template_dir, os.path.basename(urlparse(image_url).path))
+
+    def _maybe_reload(self):
+        if self.check_interval <= 0 or time.monotonic() < self._next_check:
+            return
+        self._next_check = time.monotonic() + self.check_interval
+        try:
+            mtime_ns = os.stat(self.json_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns != self._snapshot.mtime_ns:
+            logging.info("Template map changed on disk; reloading index.")
+            self.reload()
+
+    def choose(self, emotion: str):
+        """Return a random (image_url, template_path) for the emotion, or None if it has no templates."""
+        self._maybe_reload()
+        templates = self._snapshot.templates_by_emotion.get(emotion)
+        if not templates:
+            return None
+        return random.choice(templates)
+
+    def is_local(self, template_path: str) -> bool:
+        name = os.path.basename(template_path)
+        if name in self._local_files:
+            return True
+        # Another worker process may have downloaded it since the directory was last listed
+        if os.path.exists(os.path.join(self.template_dir, name)):
+            self._local_files.add(name)
+            return True
+        return False
+
+    def mark_local(self, template_path: str):
+        self._local_files.add(os.path.basename(template_path))
+
+    def emotion_url_map(self) -> dict:
+        return {
+            emotion: [url for url, _ in templates]
+            for emotion, templates in self._snapshot.templates_by_emotion.items()
+        }
+
+    def emotions(self):
+        return list(self._snapshot.templates_by_emotion)
+
+
+_template_index = None
+_template_index_lock = threading.Lock()
+
+
+def get_template_index() -> TemplateIndex:
+    """Process-wide TemplateIndex, built on first use."""
+    global _template_index
+    if _template_index is None:
+        with _template_index_lock:
+            if _template_index is None:
+                config = MemeTemplatesEntity(config_entity=ConfigEntity())
+                _template_index = TemplateIndex(
+                    json_path=os.path.join(config.output_dir, config.json_file),
+                    template_dir=config.template_dir,
+                    check_interval=config.template_index_check_seconds,
+                )
+    return _template_index
@@ -0,0 +1,296 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+from src.utils.shared_files import FileLock, atomic_file, lock_path
+
+from dataclasses import dataclass, asdict
+import threading
+import json
+import time
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+
+TEMPLATE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Candidate caption boxes, as fractions of the image. Upper boxes live in the top
+# half and lower boxes in the bottom half, so the two captions never overlap.
+BOX_HEIGHTS = (0.25, 0.3, 0.35, 0.4)
+BOX_WIDTHS = (0.6, 0.7, 0.8)
+BOX_STEP = 0.05
+
+# Score = relative detail under the box + EDGE_WEIGHT * distance from the image
+# edge + SIZE_WEIGHT * how much smaller than the classic 0.8 x 0.4 box it is
+# + CENTER_WEIGHT * how far off-centre it is. On a featureless template this
+# picks exactly the classic layout.
+EDGE_WEIGHT = 0.5
+SIZE_WEIGHT = 0.25
+CENTER_WEIGHT = 0.25
+
+# Font size cap as a fraction of the image height (the classic `height * 0.06`)
+MAX_FONT_RATIO = 0.06
+# Backgrounds brighter than this (0-255 luminance) get dark text with a light outline
+BRIGHT_BACKGROUND = 170
+
+
+@dataclass(frozen=True)
+class CaptionBox:
+    """Where one caption goes, in fractions of the image size, and how it is drawn."""
+    left: float
+    top: float
+    width: float
+    height: float
+    max_font_ratio: float = MAX_FONT_RATIO
+    fill: str = "white"
+    stroke: str = "black"
+
+
+@dataclass(frozen=True)
+class TemplateLayout:
+    """Precomputed caption placement for one template."""
+    upper: CaptionBox
+    lower: CaptionBox
+    source: str = "classic"
+
+
+# Top and bottom 40% bands with text fitted to the central 80% of the width
+CLASSIC_LAYOUT = TemplateLayout(
+    upper=CaptionBox(left=0.1, top=0.0, width=0.8, height=0.4),
+    lower=CaptionBox(left=0.1, top=0.6, width=0.8, height=0.4),
+)
+
+
+def _candidates(anchor: str):
+    """(left, top, width, height) fractions of every candidate box for the upper or lower caption."""
+    boxes = []
+    for height in BOX_HEIGHTS:
+        offsets = np.arange(0.0, 0.5 - height + 1e-9, BOX_STEP)
+        for width in BOX_WIDTHS:
+            for left in np.arange(0.0, 1.0 - width + 1e-9, BOX_STEP):
+                for offset in offsets:
+                    top = offset if anchor == "top" else 1.0 - height - offset
+                    boxes.append((left, top, width, height, offset))
+    return np.array(boxes)
+
+
+_CANDIDATES = {anchor: _candidates(anchor) for anchor in ("top", "bottom")}
+
+
+def _box_means(integral, boxes, rows, cols):
+    """Mean of the summed-area table's source over each box (vectorized over boxes)."""
+    top = np.round(boxes[:, 1] * rows).astype(int)
+    bottom = np.maximum(np.round((boxes[:, 1] + boxes[:, 3]) * rows).astype(int), top + 1)
+    left = np.round(boxes[:, 0] * cols).astype(int)
+    right = np.maximum(np.round((boxes[:, 0] + boxes[:, 2]) * cols).astype(int), left + 1)
+    totals = integral[bottom, right] - integral[top, right] - integral[bottom, left] + integral[top, left]
+    return totals / ((bottom - top) * (right - left))
+
+
+def _summed_area(values):
+    integral = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.float64)
+    integral[1:, 1:] = values.cumsum(axis=0).cumsum(axis=1)
+    return integral
+
+
+def profile_image(img: Image.Image, max_dimension: int = 128) -> TemplateLayout:
+    """
+    Choose caption boxes over the low-detail parts of a template.
+
+    Works on a grayscale copy downscaled to `max_dimension`: detail is the
+    local gradient magnitude, every candidate box is scored from summed-area
+    tables, and the outline colour follows the mean luminance under the box.
+    """
+    small = img.convert("L")
+    small.thumbnail((max_dimension, max_dimension))
+    pixels = np.asarray(small, dtype=np.float32)
+    rows, cols = pixels.shape
+
+    detail = np.zeros_like(pixels)
+    detail[:, 1:] += np.abs(np.diff(pixels, axis=1))
+    detail[1:, :] += np.abs(np.diff(pixels, axis=0))
+    detail_integral = _summed_area(detail)
+    luminance_integral = _summed_area(pixels)
+    mean_detail = float(detail.mean()) + 1.0
+
+    boxes = {}
+    for name, anchor in (("upper", "top"), ("lower", "bottom")):
+        candidates = _CANDIDATES[anchor]
+        scores = (
+            _box_means(detail_integral, candidates, rows, cols) / mean_detail
+            + EDGE_WEIGHT * candidates[:, 4]
+            + SIZE_WEIGHT * (1.0 - candidates[:, 2] * candidates[:, 3] / 0.32)
+            + CENTER_WEIGHT * np.abs(candidates[:, 0] + candidates[:, 2] / 2 - 0.5)
+        )
+        best = candidates[int(np.argmin(scores))]
+        left, top, width, height = (round(float(v), 4) for v in best[:4])
+        luminance = float(_box_means(luminance_integral, best[None, :], rows, cols)[0])
+        bright = luminance > BRIGHT_BACKGROUND
+        boxes[name] = CaptionBox(
+            left=left, top=top, width=width, height=height,
+            max_font_ratio=round(MAX_FONT_RATIO * min(1.0, height / 0.3), 4),
+            fill="black" if bright else "white",
+            stroke="white" if bright else "black",
+        )
+    return TemplateLayout(upper=boxes["upper"], lower=boxes["lower"], source="profiled")
+
+
+def _layout_from_dict(entry: dict) -> TemplateLayout:
+    return TemplateLayout(
+        upper=CaptionBox(**entry["upper"]), lower=CaptionBox(**entry["lower"]), source="profiled"
+    )
+
+
+class TemplateLayoutIndex:
+    """
+    Sidecar index of per-template layouts (`template_layouts.json`, next to the
+    emotion map), keyed by template file name.
+
+    `profile_dir` is the offline pass: it profiles every template in
+    `template_dir` whose file changed since it was last profiled and rewrites
+    the sidecar. `get` is the request-time lookup: a dict access, falling back
+    to CLASSIC_LAYOUT for unknown templates. The sidecar is re-read when its
+    mtime changes (checked at most every `check_interval` seconds).
+    Worker processes take turns on `profile_dir` through a file lock, and each
+    starts from the sidecar the previous one wrote.
+    """
+
+    def __init__(self, index_path: str, template_dir: str, check_interval: float,
+                 max_dimension: int = 128, enabled: bool = True, lock_timeout: float = None):
+        self.index_path = index_path
+        self.template_dir = template_dir
+        self.check_interval = check_interval
+        self.max_dimension = max_dimension
+        self.enabled = enabled
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._layouts = {}
+        self._mtime_ns = None
+        self._next_check = 0.0
+        self.reload()
+
+    def reload(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+                entries = json.load(f).get("templates", {})
+        except FileNotFoundError:
+            mtime_ns, entries = None, {}
+        except ValueError as e:
+            logging.warning(f"Ignoring unreadable layout index {self.index_path}: {e}")
+            mtime_ns, entries = None, {}
+
+        layouts = {}
+        for name, entry in entries.items():
+            try:
+                layouts[name] = _layout_from_dict(entry)
+            except (KeyError, TypeError):
+                logging.warning(f"Ignoring malformed layout profile for {name}")
+        self._entries, self._layouts, self._mtime_ns = entries, layouts, mtime_ns
+        self._next_check = time.monotonic() + self.check_interval
+
+    def _maybe_reload(self):
+        if self.check_interval <= 0 or time.monotonic() < self._next_check:
+            return
+        self._next_check = time.monotonic() + self.check_interval
+        try:
+            mtime_ns = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns != self._mtime_ns:
+            self.reload()
+
+    def get(self, template_path: str) -> TemplateLayout:
+        """Layout for the template, or CLASSIC_LAYOUT if it was never profiled (or layouts are disabled)."""
+        if not self.enabled:
+            return CLASSIC_LAYOUT
+        self._maybe_reload()
+        return self._layouts.get(os.path.basename(template_path), CLASSIC_LAYOUT)
+
+    def profile_dir(self, force: bool = False) -> dict:
+        """Profile new or changed templates in `template_dir` and rewrite the sidecar; returns a summary."""
+        try:
+            started = time.perf_counter()
+            index_lock = FileLock(lock_path(os.path.dirname(self.index_path) or ".", self.index_path), self.lock_timeout)
+            with self._lock, index_lock:
+                self.reload()
+                previous = dict(self._entries)
+                entries, summary = {}, {"profiled": 0, "unchanged": 0, "failed": 0}
+                names = sorted(
+                    name for name in (os.listdir(self.template_dir) if os.path.isdir(self.template_dir) else ())
+                    if name.lower().endswith(TEMPLATE_EXTENSIONS)
+                )
+                for name in names:
+                    path = os.path.join(self.template_dir, name)
+                    try:
+                        stat = os.stat(path)
+                        entry = previous.get(name)
+                        if not force and entry and entry.get("mtime_ns") == stat.st_mtime_ns \
+                                and entry.get("size") == stat.st_size:
+                            entries[name] = entry
+                            summary["unchanged"] += 1
+                            continue
+                        with Image.open(path) as opened:
+                            # Let the JPEG decoder do most of the downscaling
+                            opened.draft("L", (self.max_dimension * 2, self.max_dimension * 2))
+                            layout = profile_image(opened, self.max_dimension)
+                        entries[name] = {
+                            "mtime_ns": stat.st_mtime_ns,
+                            "size": stat.st_size,
+                            "upper": asdict(layout.upper),
+                            "lower": asdict(layout.lower),
+                        }
+                        summary["profiled"] += 1
+                    except Exception as e:
+                        logging.warning(f"Failed to profile template layout for {name}: {e}")
+                        summary["failed"] += 1
+
+                self._write(entries)
+                self.reload()
+            summary["templates"] = len(entries)
+            summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            logging.info(f"Template layouts profiled: {summary}")
+            return summary
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _write(self, entries: dict):
+        with atomic_file(self.index_path, "w", encoding="utf-8") as f:
+            json.dump({"max_dimension": self.max_dimension, "templates": entries}, f, indent=2)
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "profiles": len(self._layouts)}
+
+
+_layout_index = None
+_layout_index_lock = threading.Lock()
+
+
+def get_layout_index() -> TemplateLayoutIndex:
+    """Process-wide TemplateLayoutIndex, loaded on first use."""
+    global _layout_index
+    if _layout_index is None:
+        with _layout_index_lock:
+            if _layout_index is None:
+                config = MemeTemplatesEntity(config_entity=ConfigEntity())
+                _layout_index = TemplateLayoutIndex(
+                    index_path=os.path.join(config.output_dir, config.template_layouts_file),
+                    template_dir=config.template_dir,
+                    check_interval=config.template_index_check_seconds,
+                    max_dimension=config.layout_profile_max_dimension,
+                    enabled=config.template_layouts,
+                    lock_timeout=config.file_lock_timeout,
+                )
+    return _layout_index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile caption layouts for every template in template_dir.")
+    parser.add_argument("--force", action="store_true", help="re-profile templates that have not changed")
+    args = parser.parse_args()
+    print(json.dumps(get_layout_index().profile_dir(force=args.force), indent=2))
@@ -0,0 +1,234 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+from src.utils.image_encoder import fit_within
+from src.utils.shared_files import FileLock, atomic_file, lock_path
+
+import threading
+import struct
+import mmap
+import json
+import time
+import os
+import sys
+
+from PIL import Image
+
+
+TEMPLATE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# File layout: header (magic, index offset, index length), page-aligned raw RGBX
+# pixel blobs, then the JSON index {name: {offset, width, height, ...}}.
+# RGBX rather than RGB because it matches Pillow's in-memory layout, so a
+# template is unpacked straight from the mapped pages with a plain copy.
+PACK_MAGIC = b"MEMEPAK1"
+PACK_HEADER = struct.Struct("<8sQQ")
+PAGE_SIZE = mmap.PAGESIZE
+
+
+def _align(offset: int) -> int:
+    return (offset + PAGE_SIZE - 1) // PAGE_SIZE * PAGE_SIZE
+
+
+def _read_index(pack_path: str) -> dict:
+    try:
+        with open(pack_path, "rb") as f:
+            magic, index_offset, index_length = PACK_HEADER.unpack(f.read(PACK_HEADER.size))
+            if magic != PACK_MAGIC:
+                return {}
+            f.seek(index_offset)
+            return json.loads(f.read(index_length))
+    except (OSError, ValueError, struct.error):
+        return {}
+
+
+def build_template_pack(template_dir: str, pack_path: str, max_dimension: int = 0, force: bool = False,
+                        lock_timeout: float = None) -> dict:
+    """
+    Decode every template in `template_dir` (downscaled to `max_dimension`
+    when set) and write them as raw RGBX pixels into one pack file with an
+    offset index. The pack is written to a temp file and renamed into place,
+    so processes that have the old pack mapped keep reading it safely.
+    Unless `force`, nothing is rewritten when the existing pack already holds
+    every template, unchanged, at this size. Concurrent builds (other worker
+    processes) wait on a file lock, then usually find the pack up to date.
+    """
+    try:
+        started = time.perf_counter()
+        with FileLock(lock_path(os.path.dirname(pack_path) or ".", pack_path), lock_timeout):
+            names = sorted(
+                name for name in (os.listdir(template_dir) if os.path.isdir(template_dir) else ())
+                if name.lower().endswith(TEMPLATE_EXTENSIONS)
+            )
+            if not force:
+                existing = _read_index(pack_path)
+                current = existing.get("max_dimension") == max_dimension and sorted(existing.get("templates", {})) == names
+                for name in names if current else ():
+                    stat = os.stat(os.path.join(template_dir, name))
+                    entry = existing["templates"][name]
+                    if (entry["mtime_ns"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+                        current = False
+                        break
+                if current:
+                    logging.info(f"Template pack {pack_path} is up to date.")
+                    return {"templates": len(names), "failed": 0, "bytes": os.path.getsize(pack_path),
+                            "max_dimension": max_dimension, "unchanged": True,
+                            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+            index, failed = {}, 0
+            with atomic_file(pack_path, "wb") as f:
+                f.write(PACK_HEADER.pack(PACK_MAGIC, 0, 0))
+                offset = _align(PACK_HEADER.size)
+                for name in names:
+                    path = os.path.join(template_dir, name)
+                    try:
+                        stat = os.stat(path)
+                        with Image.open(path) as opened:
+                            if max_dimension:
+                                opened.draft("RGB", (max_dimension, max_dimension))
+                            image = fit_within(opened.convert("RGB"), max_dimension)
+                        pixels = image.tobytes("raw", "RGBX")
+                    except Exception as e:
+                        logging.warning(f"Skipping template {name} in pack: {e}")
+                        failed += 1
+                        continue
+                    f.seek(offset)
+                    f.write(pixels)
+                    index[name] = {
+                        "offset": offset,
+                        "width": image.width,
+                        "height": image.height,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                        "max_dimension": max_dimension,
+                    }
+                    offset = _align(offset + len(pixels))
+
+                index_bytes = json.dumps({"max_dimension": max_dimension, "templates": index}).encode("utf-8")
+                f.seek(offset)
+                f.write(index_bytes)
+                f.seek(0)
+                f.write(PACK_HEADER.pack(PACK_MAGIC, offset, len(index_bytes)))
+
+        summary = {
+            "templates": len(index),
+            "failed": failed,
+            "bytes": os.path.getsize(pack_path),
+            "max_dimension": max_dimension,
+            "unchanged": False,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        logging.info(f"Template pack written to {pack_path}: {summary}")
+        return summary
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class TemplatePack:
+    """
+    Read-only, memory-mapped view of a template pack.
+
+    Every process that maps the same pack shares one page-cached copy of the
+    pixels. `get` makes the per-request RGB copy to draw on directly from the
+    mapped pages: no JPEG decode and no intermediate buffer. A rebuilt pack
+    is picked up when its mtime changes (checked at most every
+    `check_interval` seconds).
+    """
+
+    def __init__(self, pack_path: str, check_interval: float = 5.0):
+        self.pack_path = pack_path
+        self.check_interval = check_interval
+        self.max_dimension = 0
+        self._lock = threading.Lock()
+        self._snapshot = (None, {})  # (mapping, index), swapped together on reload
+        self._mtime_ns = None
+        self._next_check = 0.0
+        self.reload()
+
+    def reload(self):
+        with self._lock:
+            try:
+                with open(self.pack_path, "rb") as f:
+                    mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, index_offset, index_length = PACK_HEADER.unpack_from(mapped, 0)
+                if magic != PACK_MAGIC:
+                    raise ValueError("not a template pack")
+                header = json.loads(mapped[index_offset:index_offset + index_length])
+            except FileNotFoundError:
+                mapped, mtime_ns, header = None, None, {"max_dimension": 0, "templates": {}}
+            except (ValueError, struct.error) as e:
+                logging.warning(f"Ignoring unreadable template pack {self.pack_path}: {e}")
+                mapped, mtime_ns, header = None, None, {"max_dimension": 0, "templates": {}}
+
+            # The previous mapping is left to the garbage collector: images handed
+            # out earlier may still reference its pages
+            self._snapshot = (mapped, header["templates"])
+            self.max_dimension = header["max_dimension"]
+            self._mtime_ns = mtime_ns
+            self._next_check = time.monotonic() + self.check_interval
+        if mapped is not None:
+            logging.info(f"Template pack mapped: {len(header['templates'])} templates from {self.pack_path}")
+
+    def _maybe_reload(self):
+        if self.check_interval <= 0 or time.monotonic() < self._next_check:
+            return
+        self._next_check = time.monotonic() + self.check_interval
+        try:
+            mtime_ns = os.stat(self.pack_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns != self._mtime_ns:
+            self.reload()
+
+    def get(self, template_path: str):
+        """
+        (image, entry) for the template, or None if it is not in the pack. The
+        image is a fresh RGB copy; the entry records the source file's mtime
+        and size when the pack was built.
+        """
+        self._maybe_reload()
+        mapped, index = self._snapshot
+        entry = index.get(os.path.basename(template_path))
+        if entry is None:
+            return None
+        size = (entry["width"], entry["height"])
+        pixels = memoryview(mapped)[entry["offset"]:entry["offset"] + size[0] * size[1] * 4]
+        return Image.frombytes("RGB", size, pixels, "raw", "RGBX"), entry
+
+    def __len__(self):
+        return len(self._snapshot[1])
+
+    def stats(self) -> dict:
+        mapped, index = self._snapshot
+        return {
+            "path": self.pack_path,
+            "templates": len(index),
+            "bytes": len(mapped) if mapped is not None else 0,
+            "max_dimension": self.max_dimension,
+        }
+
+
+def template_pack_path() -> str:
+    config = MemeTemplatesEntity(config_entity=ConfigEntity())
+    return os.path.join(config.output_dir, config.template_pack_file)
+
+
+def build_configured_pack() -> dict:
+    """Build the pack from `template_dir` with the configured path and max dimension."""
+    config = MemeTemplatesEntity(config_entity=ConfigEntity())
+    return build_template_pack(config.template_dir, template_pack_path(), config.template_pack_max_dimension,
+                               lock_timeout=config.file_lock_timeout)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    config = MemeTemplatesEntity(config_entity=ConfigEntity())
+    parser = argparse.ArgumentParser(description="Pack the decoded templates in template_dir into one mmap-able file.")
+    parser.add_argument("--template-dir", default=config.template_dir)
+    parser.add_argument("--output", default=template_pack_path())
+    parser.add_argument("--max-dimension", type=int, default=config.template_pack_max_dimension,
+                        help="downscale templates so the longest edge is at most this (0 keeps full size)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the pack is up to date")
+    args = parser.parse_args()
+    print(json.dumps(build_template_pack(args.template_dir, args.output, args.max_dimension, args.force), indent=2))
@@ -0,0 +1,190 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+from src.utils.single_flight import SingleFlight, AsyncSingleFlight
+from src.utils.shared_files import FileLock, atomic_file, lock_path
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from datetime import datetime
+import threading
+import asyncio
+import json
+import os
+import sys
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TemplatePrefetcher:
+    """
+    Downloads template images into `template_dir` ahead of time.
+
+    One pooled `requests.Session` is shared by a bounded thread pool, every
+    file is written to a temp file and renamed into place, and files that are
+    already current (same ETag, or same size when no ETag is known) are skipped.
+    Each run writes a manifest describing what is cached. Concurrent
+    downloads of the same file are collapsed into one request, in this
+    process by single-flight and across worker processes by a file lock per
+    template: a worker that waited on the lock finds the file in place and
+    skips its own download.
+    """
+
+    def __init__(self, template_dir: str, manifest_path: str, max_workers: int, timeout: float,
+                 single_flight_timeout: float = 30, lock_timeout: float = None):
+        self.template_dir = template_dir
+        self.manifest_path = manifest_path
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.inflight = SingleFlight(single_flight_timeout)
+        self.inflight_async = AsyncSingleFlight(single_flight_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def resolve_path(self, image_url: str) -> str:
+        return os.path.join(self.template_dir, os.path.basename(urlparse(image_url).path))
+
+    def download(self, image_url: str, template_path: str, etag: str = None) -> dict:
+        """
+        Fetch one template atomically. With a known `etag` the request is
+        conditional and a 304 leaves the existing file untouched. Callers
+        racing on the same `template_path` share a single request.
+        """
+        return self.inflight.do(template_path, self._download, image_url, template_path, etag)
+
+    def _lock(self, template_path: str) -> FileLock:
+        return FileLock(lock_path(self.template_dir, template_path), self.lock_timeout)
+
+    def _download(self, image_url: str, template_path: str, etag: str = None) -> dict:
+        existed = os.path.exists(template_path)
+        with self._lock(template_path):
+            if not existed and os.path.exists(template_path):
+                # Another worker fetched it while we waited for the lock
+                return self._entry(template_path, "skipped")
+            headers = {"If-None-Match": etag} if etag and existed else {}
+            response = self.session.get(image_url, timeout=self.timeout, headers=headers)
+            if response.status_code == 304:
+                return self._entry(template_path, "skipped", etag)
+            response.raise_for_status()
+
+            self._write_atomic(template_path, response.content)
+        return self._entry(template_path, "downloaded", response.headers.get("ETag"))
+
+    async def download_async(self, image_url: str, template_path: str, http_client) -> dict:
+        """Async variant of `download` using an `httpx.AsyncClient`; the file write runs off the event loop."""
+        return await self.inflight_async.do(
+            template_path, self._download_async, image_url, template_path, http_client
+        )
+
+    async def _download_async(self, image_url: str, template_path: str, http_client) -> dict:
+        existed = os.path.exists(template_path)
+        lock = self._lock(template_path)
+        await asyncio.to_thread(lock.acquire)
+        try:
+            if not existed and os.path.exists(template_path):
+                return self._entry(template_path, "skipped")
+            response = await http_client.get(image_url, timeout=self.timeout)
+            response.raise_for_status()
+
+            await asyncio.to_thread(self._write_atomic, template_path, response.content)
+        finally:
+            lock.release()
+        return self._entry(template_path, "downloaded", response.headers.get("ETag"))
+
+    def _write_atomic(self, template_path: str, content: bytes):
+        with atomic_file(template_path, "wb") as f:
+            f.write(content)
+
+    def _entry(self, template_path, status, etag=None, error=None):
+        return {
+            "path": template_path,
+            "status": status,
+            "size": os.path.getsize(template_path) if os.path.exists(template_path) else None,
+            "etag": etag,
+            "error": error,
+        }
+
+    def _fetch(self, image_url: str, previous: dict) -> dict:
+        template_path = self.resolve_path(image_url)
+        try:
+            if os.path.exists(template_path):
+                etag = (previous or {}).get("etag")
+                if etag:
+                    return self.download(image_url, template_path, etag=etag)
+
+                head = self.session.head(image_url, timeout=self.timeout, allow_redirects=True)
+                if head.ok:
+                    remote_size = head.headers.get("Content-Length")
+                    if remote_size is not None and int(remote_size) == os.path.getsize(template_path):
+                        return self._entry(template_path, "skipped", head.headers.get("ETag"))
+                    if head.headers.get("ETag") is None and remote_size is None:
+                        # Nothing to compare against; keep the file we have
+                        return self._entry(template_path, "skipped")
+            return self.download(image_url, template_path)
+        except Exception as e:
+            logging.warning(f"Failed to prefetch {image_url}: {e}")
+            return self._entry(template_path, "failed", error=str(e))
+
+    def load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def prefetch(self, emotion_url_map: dict) -> dict:
+        """Download every URL in the emotion map and write the manifest; returns the manifest."""
+        try:
+            urls = sorted({url for urls in emotion_url_map.values() for url in urls})
+            previous = self.load_manifest().get("templates", {})
+            logging.info(f"Prefetching {len(urls)} templates with {self.max_workers} workers...")
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                entries = list(executor.map(lambda url: self._fetch(url, previous.get(url)), urls))
+
+            templates = dict(zip(urls, entries))
+            summary = {status: 0 for status in ("downloaded", "skipped", "failed")}
+            for entry in entries:
+                summary[entry["status"]] += 1
+
+            manifest = {
+                "generated_at": datetime.now().isoformat(timespec="seconds"),
+                "summary": summary,
+                "templates": templates,
+            }
+            self._write_manifest(manifest)
+            logging.info(f"Template prefetch finished: {summary}")
+            return manifest
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _write_manifest(self, manifest: dict):
+        with atomic_file(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+_template_prefetcher = None
+_template_prefetcher_lock = threading.Lock()
+
+
+def get_template_prefetcher() -> TemplatePrefetcher:
+    """Process-wide TemplatePrefetcher, so lazy downloads share its connection pool."""
+    global _template_prefetcher
+    if _template_prefetcher is None:
+        with _template_prefetcher_lock:
+            if _template_prefetcher is None:
+                config = MemeTemplatesEntity(config_entity=ConfigEntity())
+                _template_prefetcher = TemplatePrefetcher(
+                    template_dir=config.template_dir,
+                    manifest_path=os.path.join(config.output_dir, config.manifest_file),
+                    max_workers=config.prefetch_workers,
+                    timeout=config.download_timeout,
+                    single_flight_timeout=config.single_flight_timeout,
+                    lock_timeout=config.file_lock_timeout,
+                )
+    return _template_prefetcher
@@ -0,0 +1,100 @@
+from src.utils.font_cache import font_cache
+
+from PIL import ImageDraw
+
+
+LINE_SPACING = 1.2
+MIN_FONT_SIZE = 10
+
+
+def outline_width(font_size: int) -> int:
+    """Outline thickness used for meme captions of the given font size."""
+    return max(2, int(font_size / 10))
+
+
+def line_width(draw: ImageDraw.ImageDraw, line: str, font) -> float:
+    try:
+        bbox = draw.textbbox((0, 0), line, font=font)
+        return bbox[2] - bbox[0]
+    except AttributeError:
+        return draw.textlength(line, font=font)
+
+
+def draw_text_block(draw: ImageDraw.ImageDraw, lines, font, image_width: int,
+                    section_top: float, section_height: float, stroke_width: int,
+                    fill="white", stroke_fill="black", section_left: float = 0):
+    """
+    Draw `lines` centred horizontally and vertically inside a box `image_width`
+    wide starting at `section_left` (by default, a full-width band).
+
+    Each line is rasterized once with Pillow's native stroke, instead of
+    drawing the outline at eight offsets and then the fill on top.
+    """
+    line_height = font.size * LINE_SPACING
+    y_position = section_top + (section_height - len(lines) * line_height) / 2
+
+    for line in lines:
+        x_position = section_left + (image_width - line_width(draw, line, font)) / 2
+        draw.text(
+            (x_position, y_position), line, font=font, fill=fill,
+            stroke_width=stroke_width, stroke_fill=stroke_fill,
+        )
+        y_position += line_height
+
+
+def wrap_text(text: str, font_path: str, size: int, max_width: float):
+    """
+    Greedy word wrap using measured advance widths rather than a per-character
+    estimate. A single word wider than `max_width` gets a line of its own.
+    """
+    space = font_cache.word_width(font_path, size, " ")
+    lines, current, current_width = [], [], 0.0
+
+    for word in text.split():
+        word_width = font_cache.word_width(font_path, size, word)
+        candidate = current_width + (space if current else 0) + word_width
+        if current and candidate > max_width:
+            lines.append(" ".join(current))
+            current, current_width = [word], word_width
+        else:
+            current.append(word)
+            current_width = candidate
+
+    if current:
+        lines.append(" ".join(current))
+    return lines
+
+
+def _fits(text, font_path, size, max_width, max_height):
+    """Wrapped lines at `size` if they fit the box (stroke included), else None."""
+    inner_width = max_width - 2 * outline_width(size)
+    lines = wrap_text(text, font_path, size, inner_width)
+    if len(lines) * size * LINE_SPACING > max_height:
+        return None
+    for line in lines:
+        if " " not in line and font_cache.word_width(font_path, size, line) > inner_width:
+            return None
+    return lines
+
+
+def fit_text(text: str, font_path: str, max_width: float, max_height: float, max_size: int):
+    """
+    Binary search for the largest font size (<= max_size) whose wrapped lines fit
+    the box. Returns (font, lines); falls back to MIN_FONT_SIZE if nothing fits.
+    """
+    low, high = MIN_FONT_SIZE, max(max_size, MIN_FONT_SIZE)
+    best_size, best_lines = None, None
+
+    while low <= high:
+        size = (low + high) // 2
+        lines = _fits(text, font_path, size, max_width, max_height)
+        if lines is not None:
+            best_size, best_lines = size, lines
+            low = size + 1
+        else:
+            high = size - 1
+
+    if best_size is None:
+        best_size = MIN_FONT_SIZE
+        best_lines = wrap_text(text, font_path, best_size, max_width)
+    return font_cache.get(font_path, best_size), best_lines